@@ -3,17 +3,21 @@ A Python-based ground station for collecting telemetry information from the CU-I
 This data is collected using UART and is transmitted to the user interface using WebSockets.
 """
 
-import multiprocessing as mp
 from multiprocessing import Process
 from queue import Queue
 from re import sub
 import logging
 from typing import TypeAlias, Any
 from modules.misc.config import load_config
+from modules.misc.latency import TimestampedPayload
+from modules.misc.metrics import MetricsSnapshot
+from modules.misc.queues import BoundedQueue
 
 from modules.misc.messages import print_cu_rocket
 from modules.serial.serial_manager import SerialManager
 from modules.telemetry.telemetry import Telemetry
+from modules.websocket.relay import RELAY_SUPPORTED, relay_socket_path
+from modules.websocket.relay_worker import RelayWorker
 from modules.websocket.websocket import WebSocketHandler
 from modules.misc.cli import parser
 
@@ -50,19 +54,24 @@ logger = logging.getLogger(__name__)
 
 
 def main():
+    # Load config file
+    config = load_config("config.json")
+
     # Set up queues
-    serial_status: Queue[str] = mp.Queue()  # type: ignore
-    ws_commands: Queue[str] = mp.Queue()  # type: ignore
-    serial_ws_commands: Queue[list[str]] = mp.Queue()  # type: ignore
-    telemetry_ws_commands: Queue[list[str]] = mp.Queue()  # type: ignore
+    # Each queue is bounded, with the overflow policy given in the config file (see DEFAULT_QUEUES for defaults)
+    def make_queue(name: str) -> BoundedQueue[Any]:
+        return BoundedQueue(name, config.queue_parameters(name))
 
-    radio_signal_report: Queue[int] = mp.Queue()  # type: ignore
-    rn2483_radio_input: Queue[str] = mp.Queue()  # type: ignore
-    rn2483_radio_payloads: Queue[str] = mp.Queue()  # type: ignore
-    telemetry_json_output: Queue[JSON] = mp.Queue()  # type: ignore
+    serial_status: Queue[str] = make_queue("serial_status")  # type: ignore
+    ws_commands: Queue[str] = make_queue("ws_commands")  # type: ignore
+    serial_ws_commands: Queue[list[str]] = make_queue("serial_ws_commands")  # type: ignore
+    telemetry_ws_commands: Queue[list[str]] = make_queue("telemetry_ws_commands")  # type: ignore
 
-    # Load config file
-    config = load_config("config.json")
+    radio_signal_report: Queue[str] = make_queue("radio_signal_report")  # type: ignore
+    rn2483_radio_input: Queue[str] = make_queue("rn2483_radio_input")  # type: ignore
+    rn2483_radio_payloads: Queue[TimestampedPayload] = make_queue("rn2483_radio_payloads")  # type: ignore
+    telemetry_json_output: Queue[JSON] = make_queue("telemetry_json_output")  # type: ignore
+    stats_queue: Queue[MetricsSnapshot] = make_queue("stats_queue")  # type: ignore
 
     # Print display screen
     print_cu_rocket(config.rocket_name, VERSION)
@@ -77,6 +86,7 @@ def main():
             radio_signal_report,
             rn2483_radio_input,
             rn2483_radio_payloads,
+            stats_queue,
             config,
         ).run,
     )
@@ -95,6 +105,7 @@ def main():
             radio_signal_report,
             telemetry_json_output,
             telemetry_ws_commands,
+            stats_queue,
             config,
             VERSION,
         ),
@@ -102,14 +113,56 @@ def main():
     telemetry.start()
     logger.info(f"{'Telemetry':.<13} started.")
 
+    # Spectators may be served by relay worker processes, so they never hold up the mission control clients
+    relay_socket: str | None = None
+    if config.relay.workers > 0:
+        if RELAY_SUPPORTED:
+            relay_socket = relay_socket_path()
+        else:
+            logger.error("Relay workers need Unix sockets and SO_REUSEPORT, which this platform does not have")
+
     # Initialize Tornado websocket for UI communication
     # This is PURELY a pass through of data for connectivity. No format conversion is done here.
     # Incoming information comes from telemetry_json_output from telemetry
-    # Outputs information to connected websocket clients
-    websocket = Process(target=WebSocketHandler, args=(telemetry_json_output, ws_commands), daemon=True)
+    # Outputs information to connected websocket clients, and pipeline metrics collected from stats_queue
+    websocket = Process(
+        target=WebSocketHandler,
+        args=(
+            telemetry_json_output,
+            ws_commands,
+            stats_queue,
+            [
+                serial_status,
+                ws_commands,
+                serial_ws_commands,
+                telemetry_ws_commands,
+                radio_signal_report,
+                rn2483_radio_input,
+                rn2483_radio_payloads,
+                telemetry_json_output,
+                stats_queue,
+            ],
+            relay_socket,
+        ),
+        daemon=True,
+    )
     websocket.start()
     logger.info(f"{'WebSocket':.<13} started.")
 
+    # Initialize the relay workers serving spectators
+    # Incoming information comes from the websocket process over the relay socket
+    # Outputs information to the spectator websocket clients on the relay port
+    relays: list[Process] = []
+    if relay_socket is not None:
+        for index in range(config.relay.workers):
+            relay = Process(
+                target=RelayWorker(relay_socket, config.relay.port, index, stats_queue).run,  # type: ignore
+                daemon=True,
+            )
+            relay.start()
+            relays.append(relay)
+        logger.info(f"{'Relays':.<13} started.")
+
     while True:
         # Messages sent to main process for handling
         try:
@@ -121,6 +174,8 @@ def main():
             serial.terminate()
             telemetry.terminate()
             websocket.terminate()
+            for relay in relays:
+                relay.terminate()
             logger.info("Ground Station shutdown.")
             exit(0)
 
@@ -29,6 +29,14 @@ class ModulationModes(StrEnum):
     FSK = "fsk"
 
 
+class QueuePolicy(StrEnum):
+    """What an inter-process queue does with a new item when it is full."""
+
+    BLOCK = "block"  # Wait for the consumer to make room
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest item to make room
+    SPILL = "spill"  # Store the item on disk until the consumer makes room
+
+
 class CodingRates(StrEnum):
     """Coding rates for the RN2483 radio."""
 
@@ -119,6 +127,100 @@ class RadioParameters:
         yield "sync_word", self.sync_word
 
 
+@dataclass
+class QueueParameters:
+
+    """
+    Represents the bound and overflow policy of an inter-process queue.
+
+    max_size: The maximum number of items on the queue. Zero means the queue is unbounded.
+    policy: What the queue does with new items when it is full.
+    """
+
+    max_size: int = 0
+    policy: QueuePolicy = QueuePolicy.BLOCK
+
+    def __post_init__(self):
+        if self.max_size < 0:
+            raise ValueError(f"Queue size '{self.max_size}' must be zero (unbounded) or a positive integer.")
+
+    @classmethod
+    def from_json(cls, data: JSON) -> Self:
+        """Builds a new QueueParameters object from JSON data found in a config file."""
+        return cls(max_size=data.get("max_size", 0), policy=QueuePolicy(data.get("policy", "block")))
+
+
+@dataclass
+class CaptureParameters:
+    """
+    Settings for capturing every raw line received from the RN2483 radio to disk.
+
+    enabled: Whether raw lines are captured.
+    directory: The directory capture files are written to, relative to the working directory.
+    max_file_size: Size in bytes after which a new capture file is started.
+    max_files: Number of capture files kept, after which the oldest are deleted.
+    """
+
+    enabled: bool = False
+    directory: str = "captures"
+    max_file_size: int = 16 * 1024 * 1024
+    max_files: int = 10
+
+    def __post_init__(self):
+        if self.max_file_size < 1:
+            raise ValueError(f"Capture file size '{self.max_file_size}' must be a positive integer.")
+        if self.max_files < 1:
+            raise ValueError(f"Number of capture files '{self.max_files}' must be a positive integer.")
+
+    @classmethod
+    def from_json(cls, data: JSON) -> Self:
+        """Builds a new CaptureParameters object from JSON data found in a config file."""
+        return cls(
+            enabled=data.get("enabled", False),
+            directory=data.get("directory", "captures"),
+            max_file_size=data.get("max_file_size", 16 * 1024 * 1024),
+            max_files=data.get("max_files", 10),
+        )
+
+
+@dataclass
+class RelayParameters:
+    """
+    Settings for relaying the telemetry updates to worker processes which serve spectator websocket clients.
+
+    workers: The number of relay worker processes. Zero turns relaying off.
+    port: The port the relay workers serve spectators on.
+    """
+
+    workers: int = 0
+    port: int = 33846
+
+    def __post_init__(self):
+        if self.workers < 0:
+            raise ValueError(f"Number of relay workers '{self.workers}' must be zero (off) or a positive integer.")
+        if self.port not in range(1, 65_535 + 1):
+            raise ValueError(f"Relay port '{self.port}' must be between 1 and 65535.")
+
+    @classmethod
+    def from_json(cls, data: JSON) -> Self:
+        """Builds a new RelayParameters object from JSON data found in a config file."""
+        return cls(workers=data.get("workers", 0), port=data.get("port", 33846))
+
+
+# Queue parameters used for the inter-process queues which are not given in the config file
+DEFAULT_QUEUES: dict[str, QueueParameters] = {
+    "serial_status": QueueParameters(1_000, QueuePolicy.BLOCK),
+    "ws_commands": QueueParameters(100, QueuePolicy.BLOCK),
+    "serial_ws_commands": QueueParameters(100, QueuePolicy.BLOCK),
+    "telemetry_ws_commands": QueueParameters(100, QueuePolicy.BLOCK),
+    "radio_signal_report": QueueParameters(100, QueuePolicy.DROP_OLDEST),
+    "rn2483_radio_input": QueueParameters(100, QueuePolicy.BLOCK),
+    "rn2483_radio_payloads": QueueParameters(10_000, QueuePolicy.SPILL),
+    "telemetry_json_output": QueueParameters(16, QueuePolicy.DROP_OLDEST),
+    "stats_queue": QueueParameters(100, QueuePolicy.DROP_OLDEST),
+}
+
+
 @dataclass
 class Config:
 
@@ -129,6 +231,9 @@ class Config:
     telemetry_buffer_size: int = 20
     radio_parameters: RadioParameters = field(default_factory=RadioParameters)
     approved_callsigns: dict[str, str] = field(default_factory=dict)
+    queues: dict[str, QueueParameters] = field(default_factory=dict)
+    capture: CaptureParameters = field(default_factory=CaptureParameters)
+    relay: RelayParameters = field(default_factory=RelayParameters)
 
     def __post_init__(self):
         if len(self.approved_callsigns) == 0:
@@ -146,8 +251,18 @@ class Config:
             telemetry_buffer_size=data.get("telemetry_buffer_size", cls.telemetry_buffer_size),
             radio_parameters=RadioParameters.from_json(data.get("radio_params", dict())),  # type:ignore
             approved_callsigns=data.get("approved_callsigns", dict()),  # type:ignore
+            queues={
+                name: QueueParameters.from_json(params)  # type:ignore
+                for name, params in data.get("queues", dict()).items()  # type:ignore
+            },
+            capture=CaptureParameters.from_json(data.get("capture", dict())),  # type:ignore
+            relay=RelayParameters.from_json(data.get("relay", dict())),  # type:ignore
         )
 
+    def queue_parameters(self, name: str) -> QueueParameters:
+        """Returns the parameters for the named inter-process queue, falling back to the defaults."""
+        return self.queues.get(name, DEFAULT_QUEUES.get(name, QueueParameters()))
+
 
 def load_config(filepath: str) -> Config:
     """Returns a Config object created from a configuration JSON file. File path must relative to project directory"""
@@ -0,0 +1,154 @@
+# Latency instrumentation for following radio payloads through the ground station pipeline
+# Every payload is stamped with time.monotonic_ns() as it passes each stage, which is comparable across processes.
+
+# Imports
+import logging
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Self
+
+# Constants
+LATENCY_KEY: str = "_latency"  # Key under which timestamps travel alongside the telemetry JSON output
+BUCKET_BOUNDS_NS: tuple[int, ...] = tuple(1_000 * 2**i for i in range(24))  # 1 us to ~8.4 s, doubling
+DEFAULT_LOG_INTERVAL: float = 10.0  # Seconds between latency summaries in the logs
+
+logger = logging.getLogger(__name__)
+
+
+class Stage(StrEnum):
+    """The pipeline stages at which a payload is timestamped, in the order they occur."""
+
+    SERIAL_READ = "serial_read"
+    DEQUEUE = "dequeue"
+    PARSE = "parse"
+    TELEMETRY_UPDATE = "telemetry_update"
+    PUBLISH = "publish"
+    WEBSOCKET_WRITE = "websocket_write"
+
+
+def stamp(timestamps: dict[str, int], stage: Stage) -> None:
+    """Records the current monotonic time for the given stage in the timestamps dictionary."""
+    timestamps[stage.value] = time.monotonic_ns()
+
+
+@dataclass
+class TimestampedPayload:
+    """
+    A radio payload (in hexadecimal digits) carrying the time at which it reached each pipeline stage, and the port
+    of the radio which received it. Payloads which did not come from a radio, such as replays, have no receiver.
+    """
+
+    data: str
+    timestamps: dict[str, int] = field(default_factory=dict)
+    receiver: str = ""
+
+    @classmethod
+    def received(cls, data: str, receiver: str = "") -> Self:
+        """Creates a new payload stamped with its arrival time at the serial read stage."""
+        payload = cls(data, receiver=receiver)
+        payload.stamp(Stage.SERIAL_READ)
+        return payload
+
+    def stamp(self, stage: Stage) -> None:
+        """Records the current time for the given pipeline stage."""
+        stamp(self.timestamps, stage)
+
+
+class LatencyHistogram:
+    """A histogram of latencies with exponentially sized buckets."""
+
+    def __init__(self) -> None:
+        self.buckets: list[int] = [0] * (len(BUCKET_BOUNDS_NS) + 1)  # Last bucket catches everything larger
+        self.count: int = 0
+        self.total_ns: int = 0
+        self.min_ns: int = 0
+        self.max_ns: int = 0
+
+    def record(self, latency_ns: int) -> None:
+        """Adds a latency measurement in nanoseconds to the histogram."""
+        latency_ns = max(latency_ns, 0)
+        self.buckets[bisect_left(BUCKET_BOUNDS_NS, latency_ns)] += 1
+        self.min_ns = latency_ns if self.count == 0 else min(self.min_ns, latency_ns)
+        self.max_ns = max(self.max_ns, latency_ns)
+        self.total_ns += latency_ns
+        self.count += 1
+
+    def percentile(self, percent: float) -> int:
+        """
+        Estimates a percentile of the recorded latencies.
+
+        Returns:
+            The upper bound in nanoseconds of the bucket containing the percentile, or 0 if nothing was recorded.
+        """
+        if self.count == 0:
+            return 0
+
+        target = percent / 100 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min(BUCKET_BOUNDS_NS[i], self.max_ns) if i < len(BUCKET_BOUNDS_NS) else self.max_ns
+        return self.max_ns
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"n={self.count} mean={self.mean_ns / 1e6:.3f}ms p50={self.percentile(50) / 1e6:.3f}ms "
+            f"p99={self.percentile(99) / 1e6:.3f}ms max={self.max_ns / 1e6:.3f}ms"
+        )
+
+    def __iter__(self):
+        yield "count", self.count
+        yield "mean_ns", self.mean_ns
+        yield "min_ns", self.min_ns
+        yield "max_ns", self.max_ns
+        yield "p50_ns", self.percentile(50)
+        yield "p90_ns", self.percentile(90)
+        yield "p99_ns", self.percentile(99)
+        yield "buckets", {str(bound): n for bound, n in zip(BUCKET_BOUNDS_NS, self.buckets) if n}
+
+
+class LatencyTracker:
+    """
+    Keeps a latency histogram for each pipeline stage after the serial read. The latency of a stage is the time
+    elapsed since the previous stage stamped on the same payload. The total histogram covers the first to last stamp.
+    """
+
+    def __init__(self, log_interval: float = DEFAULT_LOG_INTERVAL) -> None:
+        self.histograms: dict[str, LatencyHistogram] = {stage.value: LatencyHistogram() for stage in list(Stage)[1:]}
+        self.histograms["total"] = LatencyHistogram()
+        self.log_interval: float = log_interval
+
+    def record(self, timestamps: dict[str, int]) -> None:
+        """Records the per-stage latencies of a payload which has made it through the pipeline."""
+
+        previous: int | None = None
+        first: int | None = None
+        for stage in Stage:
+            timestamp = timestamps.get(stage.value)
+            if timestamp is None:
+                continue
+            if previous is None:
+                first = timestamp
+            else:
+                self.histograms[stage.value].record(timestamp - previous)
+            previous = timestamp
+
+        if first is not None and previous is not None and previous != first:
+            self.histograms["total"].record(previous - first)
+
+    def log_summary(self) -> None:
+        """Logs a summary line for each stage which has recorded latencies."""
+        for name, histogram in self.histograms.items():
+            if histogram.count:
+                logger.info(f"Latency {name:.<17} {histogram}")
+
+    def __iter__(self):
+        for name, histogram in self.histograms.items():
+            yield name, dict(histogram)
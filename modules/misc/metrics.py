@@ -0,0 +1,223 @@
+# Lightweight pipeline metrics shared between the ground station processes
+# Each process counts into its own registry and periodically puts a snapshot on a shared stats queue. The websocket
+# process collects the snapshots and renders them in the Prometheus text exposition format.
+
+# Imports
+import os
+import sys
+import time
+from enum import StrEnum
+from queue import Empty, Queue
+from typing import Any, TypeAlias
+
+from modules.misc.latency import BUCKET_BOUNDS_NS, LatencyTracker
+from modules.misc.queues import BoundedQueue
+
+# Constants
+METRIC_PREFIX: str = "ground_station_"
+PUBLISH_INTERVAL: float = 1.0  # Seconds between snapshots put on the stats queue by each process
+
+# Types
+Labels: TypeAlias = tuple[tuple[str, str], ...]
+MetricValues: TypeAlias = dict[str, dict[Labels, float]]
+MetricsSnapshot: TypeAlias = tuple[str, MetricValues]  # Name of the process and its metric values
+
+
+class MetricType(StrEnum):
+    """The Prometheus metric types used by the ground station."""
+
+    COUNTER = "counter"
+    GAUGE = "gauge"
+
+
+# All metrics which can be recorded, with their type and help text
+METRIC_DEFINITIONS: dict[str, tuple[MetricType, str]] = {
+    "packets_received_total": (MetricType.COUNTER, "Radio payloads received by the telemetry process."),
+    "packets_duplicate_total": (MetricType.COUNTER, "Copies of packets already delivered by another radio."),
+    "blocks_parsed_total": (MetricType.COUNTER, "Telemetry blocks parsed, by block subtype."),
+    "blocks_dropped_total": (MetricType.COUNTER, "Telemetry blocks dropped without being parsed, by block subtype."),
+    "parse_errors_total": (MetricType.COUNTER, "Payloads which could not be parsed, by exception type."),
+    "queue_depth": (MetricType.GAUGE, "Items waiting on an inter-process queue."),
+    "queue_overflows_total": (MetricType.COUNTER, "Items put on an inter-process queue while it was full."),
+    "queue_dropped_total": (MetricType.COUNTER, "Items discarded by the overflow policy of an inter-process queue."),
+    "queue_spilled_items": (MetricType.GAUGE, "Items of an inter-process queue waiting on disk for room."),
+    "publishes_total": (MetricType.COUNTER, "Telemetry updates published for the websocket clients."),
+    "replay_position": (MetricType.GAUGE, "Payloads played back from the mission being replayed."),
+    "websocket_clients": (MetricType.GAUGE, "Connected websocket clients."),
+    "websocket_messages_sent_total": (MetricType.COUNTER, "Messages written to websocket clients."),
+    "websocket_bytes_sent_total": (MetricType.COUNTER, "Bytes written to websocket clients."),
+    "websocket_buffered_bytes": (MetricType.GAUGE, "Bytes of updates being written to all websocket clients."),
+    "websocket_max_client_buffered_bytes": (MetricType.GAUGE, "Most bytes being written to a websocket client."),
+    "websocket_updates_coalesced_total": (MetricType.COUNTER, "Updates replaced by a newer one before being sent."),
+    "websocket_slow_disconnects_total": (MetricType.COUNTER, "Websocket clients disconnected for falling behind."),
+    "websocket_resumes_total": (MetricType.COUNTER, "Reconnecting websocket clients, by whether they were resumed."),
+    "process_cpu_seconds_total": (MetricType.COUNTER, "User and system CPU time spent by the process."),
+    "process_resident_memory_bytes": (MetricType.GAUGE, "Resident set size of the process."),
+}
+
+
+# Helper functions
+def make_labels(labels: dict[str, str]) -> Labels:
+    """Returns the labels as a hashable, sorted tuple of name/value pairs."""
+    return tuple(sorted(labels.items()))
+
+
+def queue_depth(queue: Queue[Any]) -> int | None:
+    """Returns the number of items on a queue, or None on platforms where this is not supported (macOS)."""
+    try:
+        return queue.qsize()
+    except NotImplementedError:
+        return None
+
+
+def resident_memory_bytes() -> int | None:
+    """Returns the resident set size of the current process in bytes, or None if it cannot be determined."""
+
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "r") as file:
+                return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+
+    try:
+        import resource
+
+        # Peak RSS is the best available without extra dependencies; it is reported in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+
+def escape_label_value(value: str) -> str:
+    """Escapes backslashes, double quotes and new lines in a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    """Formats the labels for the Prometheus text format."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Holds the counters and gauges recorded by a single process."""
+
+    def __init__(self, process: str, publish_interval: float = PUBLISH_INTERVAL) -> None:
+        self.process: str = process
+        self.values: MetricValues = {}
+        self.publish_interval: float = publish_interval
+        self.last_publish_time: float = 0.0
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Increments a metric by the given amount."""
+        series = self.values.setdefault(name, {})
+        key = make_labels(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """Sets a metric to the given value."""
+        self.values.setdefault(name, {})[make_labels(labels)] = value
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Returns a copy of the metric values along with the resource usage of the process."""
+
+        self.set("process_cpu_seconds_total", time.process_time())
+        rss = resident_memory_bytes()
+        if rss is not None:
+            self.set("process_resident_memory_bytes", rss)
+        return self.process, {name: dict(series) for name, series in self.values.items()}
+
+    def due(self) -> bool:
+        """Returns True if the publish interval has elapsed since the last snapshot was published."""
+        return time.monotonic() - self.last_publish_time >= self.publish_interval
+
+    def publish(self, stats_queue: Queue[MetricsSnapshot]) -> None:
+        """Puts a snapshot of the metrics on the stats queue."""
+        self.last_publish_time = time.monotonic()
+        stats_queue.put(self.snapshot())
+
+
+class MetricsCollector:
+    """Collects the metric snapshots published by every process and renders them for Prometheus."""
+
+    def __init__(
+        self,
+        stats_queue: Queue[MetricsSnapshot],
+        local: MetricsRegistry | None = None,
+        queues: list[BoundedQueue[Any]] | None = None,
+    ) -> None:
+        self.stats_queue: Queue[MetricsSnapshot] = stats_queue
+        self.local: MetricsRegistry | None = local
+        self.queues: list[BoundedQueue[Any]] = queues or []
+        self.snapshots: dict[str, MetricValues] = {}
+
+    def collect(self) -> None:
+        """Keeps the latest snapshot of each process from the stats queue."""
+        while True:
+            try:
+                process, values = self.stats_queue.get_nowait()
+            except Empty:
+                break
+            self.snapshots[process] = values
+
+        if self.local is not None:
+            process, values = self.local.snapshot()
+            self.snapshots[process] = values
+
+        # The inter-process queues are created by the main process and keep their counters in shared memory
+        if self.queues:
+            self.snapshots["main"] = queue_metrics(self.queues)
+
+    def render(self, latency: LatencyTracker | None = None) -> str:
+        """Returns all collected metrics in the Prometheus text exposition format."""
+
+        lines: list[str] = []
+        for name, (metric_type, help_text) in METRIC_DEFINITIONS.items():
+            samples: list[str] = []
+            for process, values in sorted(self.snapshots.items()):
+                for labels, value in sorted(values.get(name, {}).items()):
+                    samples.append(f"{METRIC_PREFIX}{name}{format_labels((('process', process),) + labels)} {value}")
+
+            if samples:
+                lines.append(f"# HELP {METRIC_PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {metric_type}")
+                lines.extend(samples)
+
+        if latency is not None:
+            lines.extend(render_latency(latency))
+
+        return "\n".join(lines) + "\n"
+
+
+def queue_metrics(queues: list[BoundedQueue[Any]]) -> MetricValues:
+    """Returns the depth and overflow counters of the given queues, labelled by queue name."""
+    registry = MetricsRegistry("main")
+    for queue in queues:
+        depth = queue_depth(queue)  # type: ignore
+        if depth is not None:
+            registry.set("queue_depth", depth, queue=queue.name)
+        registry.set("queue_overflows_total", queue.overflows.value, queue=queue.name)
+        registry.set("queue_dropped_total", queue.dropped.value, queue=queue.name)
+        registry.set("queue_spilled_items", queue.spilled.value, queue=queue.name)
+    return registry.values
+
+
+def render_latency(latency: LatencyTracker) -> list[str]:
+    """Returns the pipeline latency histograms in the Prometheus text exposition format."""
+
+    name = f"{METRIC_PREFIX}stage_latency_seconds"
+    lines = [
+        f"# HELP {name} Time spent by payloads reaching each pipeline stage from the previous one.",
+        f"# TYPE {name} histogram",
+    ]
+    for stage, histogram in latency.histograms.items():
+        cumulative = 0
+        for bound, count in zip(BUCKET_BOUNDS_NS, histogram.buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound / 1e9:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total_ns / 1e9}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+    return lines
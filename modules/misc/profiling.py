@@ -0,0 +1,75 @@
+# Runtime profiling of the ground station processes, toggled through websocket commands
+# No profiler exists (and so nothing is hooked into the interpreter) unless profiling has been started.
+
+# Imports
+import cProfile
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# Constants
+PROFILES_DIR: str = "profiles"
+PROFILE_EXTENSION: str = "pstats"
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeProfiler:
+    """Controls a cProfile profiler inside a running process, writing its results as pstats files."""
+
+    def __init__(self, process: str, profiles_dir: Optional[Path] = None) -> None:
+        self.process: str = process
+        # Defaults to the working directory of the process when the profiler is created, not when this is imported
+        self.profiles_dir: Path = Path.cwd().joinpath(PROFILES_DIR) if profiles_dir is None else profiles_dir
+        self.profile: cProfile.Profile | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.profile is not None
+
+    def start(self) -> None:
+        """Starts profiling the calling thread of the process."""
+        if self.profile is not None:
+            logger.warning(f"Profiling of {self.process} is already running.")
+            return
+
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        logger.info(f"Profiling of {self.process} started.")
+
+    def dump(self) -> Path | None:
+        """
+        Writes the statistics gathered so far to a new file in the profiles directory, without stopping the profiler.
+
+        Returns:
+            The path of the written file, or None if profiling is not running.
+        """
+        if self.profile is None:
+            logger.warning(f"Profiling of {self.process} is not running, nothing to dump.")
+            return None
+
+        self.profiles_dir.mkdir(parents=True, exist_ok=True)
+        filepath = self.profiles_dir.joinpath(
+            f"{self.process}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.{PROFILE_EXTENSION}"
+        )
+
+        # Dumping disables the profiler, so it is enabled again to keep collecting
+        self.profile.dump_stats(filepath)
+        self.profile.enable()
+        logger.info(f"Profile of {self.process} written to {filepath}")
+        return filepath
+
+    def stop(self) -> Path | None:
+        """
+        Stops profiling and writes the gathered statistics to a new file in the profiles directory.
+
+        Returns:
+            The path of the written file, or None if profiling was not running.
+        """
+        filepath = self.dump()
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile = None
+            logger.info(f"Profiling of {self.process} stopped.")
+        return filepath
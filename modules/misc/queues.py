@@ -0,0 +1,253 @@
+# Bounded inter-process queues with explicit overflow policies
+# Overflow counters live in shared memory so that any process holding the queue can export them. Spilled items are
+# moved back onto the queue by a thread of the producer process while any are waiting, so they reach the consumer
+# even if the producer stops putting new items.
+
+# Imports
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import threading
+import time
+from multiprocessing.sharedctypes import Synchronized
+from pathlib import Path
+from queue import Empty, Full
+from typing import Any, BinaryIO, Generic, TypeVar
+
+from modules.misc.config import QueueParameters, QueuePolicy
+
+# Constants
+SPILL_DIR: str = "spill"
+SPILL_EXTENSION: str = "spill"
+SPILL_FLUSH_INTERVAL: float = 0.05  # Seconds between attempts to move spilled items back onto the queue
+MAX_SPILL_DRAIN_TIME: float = 30.0  # Longest an exiting producer waits for its spilled items to be put back
+
+# Types
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class SpillFile:
+    """A first-in first-out store of pickled items on disk, used by a single producer process."""
+
+    def __init__(self, filepath: Path) -> None:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        self.filepath: Path = filepath
+        self.file: BinaryIO = open(filepath, "w+b")
+        self.read_pos: int = 0
+        self.count: int = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def push(self, item: Any) -> None:
+        """Appends an item to the end of the spill file."""
+        _ = self.file.seek(0, os.SEEK_END)
+        pickle.dump(item, self.file)
+        self.file.flush()  # Keep spilled items out of memory
+        self.count += 1
+
+    def peek(self) -> tuple[Any, int]:
+        """Returns the oldest item in the spill file and the position of the item after it."""
+        _ = self.file.seek(self.read_pos)
+        item = pickle.load(self.file)
+        return item, self.file.tell()
+
+    def advance(self, next_pos: int) -> None:
+        """Discards the oldest item, reclaiming the disk space once the file has been emptied."""
+        self.read_pos = next_pos
+        self.count -= 1
+        if self.count == 0:
+            _ = self.file.truncate(0)
+            self.read_pos = 0
+
+    def delete(self) -> None:
+        """Closes the spill file and removes it from disk."""
+        self.file.close()
+        self.filepath.unlink(missing_ok=True)
+
+
+class BoundedQueue(Generic[T]):
+    """
+    A multiprocessing queue with a maximum size and a policy for what to do with new items when the queue is full.
+    Queue policies are applied by the producer in put(); consumers use it like any other multiprocessing queue.
+    """
+
+    def __init__(self, name: str, parameters: QueueParameters = QueueParameters()) -> None:
+        self.name: str = name
+        self.max_size: int = parameters.max_size
+        self.policy: QueuePolicy = parameters.policy
+        self.queue: mp.Queue[T] = mp.Queue(parameters.max_size)  # A max size of zero is unbounded
+
+        # Shared between processes
+        self.overflows: Synchronized[int] = mp.Value("Q", 0)  # type: ignore # Puts which found the queue full
+        self.dropped: Synchronized[int] = mp.Value("Q", 0)  # type: ignore # Items discarded by the policy
+        self.spilled: Synchronized[int] = mp.Value("Q", 0)  # type: ignore # Items currently waiting on disk
+
+        # The spill file belongs to the producer, so it is only created in the producer's process once it is needed.
+        # The producer's threads share it with the thread flushing it.
+        self.spill_file: SpillFile | None = None
+        self.spill_lock: threading.RLock = threading.RLock()
+        self.flusher: threading.Thread | None = None
+        self.closed: threading.Event = threading.Event()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The spill file and its thread stay with the process which spilled, so other processes start without them
+        state = self.__dict__.copy()
+        state.update(spill_file=None, spill_lock=None, flusher=None, closed=None)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.spill_lock = threading.RLock()
+        self.closed = threading.Event()
+
+    def put(self, item: T) -> None:
+        """Puts an item on the queue, applying the queue policy if it is full."""
+        if self.policy == QueuePolicy.SPILL:
+            with self.spill_lock:
+                self.put_behind_spill(item)
+            return
+
+        try:
+            self.queue.put_nowait(item)
+            return
+        except Full:
+            pass
+
+        with self.overflows.get_lock():
+            self.overflows.value += 1
+
+        match self.policy:
+            case QueuePolicy.BLOCK:
+                self.queue.put(item)
+            case QueuePolicy.DROP_OLDEST:
+                self.put_dropping_oldest(item)
+
+    def put_behind_spill(self, item: T) -> None:
+        """Puts the item on the queue behind any spilled items, spilling it too if they or it do not fit."""
+        if self.spill_file is not None and len(self.spill_file) > 0:
+            # Items waiting on disk are older and must go first
+            self.flush_spill()
+            if len(self.spill_file) > 0:
+                self.spill(item)
+                return
+
+        try:
+            self.queue.put_nowait(item)
+            return
+        except Full:
+            pass
+
+        with self.overflows.get_lock():
+            self.overflows.value += 1
+        self.spill(item)
+
+    def put_dropping_oldest(self, item: T) -> None:
+        """Makes room for the item by discarding the oldest items on the queue."""
+        while True:
+            try:
+                _ = self.queue.get_nowait()
+                with self.dropped.get_lock():
+                    self.dropped.value += 1
+            except Empty:
+                pass  # The consumer made room in the meantime
+
+            try:
+                self.queue.put_nowait(item)
+                return
+            except Full:
+                continue
+
+    def spill(self, item: T) -> None:
+        """Stores the item on disk until there is room for it on the queue."""
+        if self.spill_file is None:
+            self.spill_file = SpillFile(Path.cwd().joinpath(SPILL_DIR, f"{self.name}-{os.getpid()}.{SPILL_EXTENSION}"))
+            logger.warning(f"Queue {self.name} is full, spilling items to {self.spill_file.filepath}")
+
+        with self.spill_lock:
+            self.spill_file.push(item)
+            with self.spilled.get_lock():
+                self.spilled.value += 1
+
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self.run_flusher, name=f"{self.name}-spill", daemon=True)
+                self.flusher.start()
+
+    def flush_spill(self) -> None:
+        """Moves as many spilled items as there is room for from disk back onto the queue, oldest first."""
+        with self.spill_lock:
+            if self.spill_file is None:
+                return
+
+            while len(self.spill_file) > 0:
+                item, next_pos = self.spill_file.peek()
+                try:
+                    self.queue.put_nowait(item)
+                except Full:
+                    return
+                self.spill_file.advance(next_pos)
+                with self.spilled.get_lock():
+                    self.spilled.value -= 1
+
+    def run_flusher(self) -> None:
+        """Moves spilled items back onto the queue as the consumer makes room, until none are left on disk."""
+        while not self.closed.wait(SPILL_FLUSH_INTERVAL):
+            with self.spill_lock:
+                self.flush_spill()
+                if self.spill_file is None or len(self.spill_file) == 0:
+                    self.flusher = None
+                    return
+
+    def close(self) -> None:
+        """
+        Stops moving spilled items back onto the queue, leaving any still spilled on disk. An empty spill file is
+        removed.
+        """
+        self.closed.set()
+        flusher = self.flusher
+        if flusher is not None:
+            flusher.join()
+        self.delete_empty_spill()
+
+    def delete_empty_spill(self) -> None:
+        """Removes the spill file if no items are left in it, so spill files don't pile up across runs."""
+        with self.spill_lock:
+            if self.spill_file is not None and len(self.spill_file) == 0:
+                self.spill_file.delete()
+                self.spill_file = None
+
+    def drain_spill(self, timeout: float | None = None) -> bool:
+        """
+        Waits for every spilled item to be moved back onto the queue, for producers which are about to exit. The spill
+        file is removed once it is empty.
+
+        Returns:
+            True if no items are left on disk, or False if some still are after the time out.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.flush_spill()
+            if self.spill_file is None or len(self.spill_file) == 0:
+                self.delete_empty_spill()
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(SPILL_FLUSH_INTERVAL)
+
+    def get(self, block: bool = True, timeout: float | None = None) -> T:
+        return self.queue.get(block, timeout)
+
+    def get_nowait(self) -> T:
+        return self.queue.get_nowait()
+
+    def put_nowait(self, item: T) -> None:
+        self.queue.put_nowait(item)
+
+    def empty(self) -> bool:
+        return self.queue.empty()
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
@@ -0,0 +1,217 @@
+"""
+Capture of the raw lines received from the RN2483 radio, and re-injection of captures to reproduce field bugs.
+
+A capture file starts with a magic number. It then holds one record per line output by the radio: the time the line
+was read (time.monotonic_ns), the length of the line, and the line itself without its line ending. Records are
+written by a background thread, so the serial reader only pays for putting each line on a queue. Files are rotated by
+size, and only the newest few are kept.
+
+Captures are re-injected through the same framer and parser as live radio lines, at the original timing or faster:
+
+    python -m modules.serial.capture captures/rn2483-20240101-120000-000000.cap --speed 0
+"""
+
+import argparse
+import logging
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from queue import Queue, SimpleQueue
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from modules.misc.config import CaptureParameters
+from modules.misc.latency import TimestampedPayload
+from modules.misc.queues import MAX_SPILL_DRAIN_TIME, SPILL_FLUSH_INTERVAL, BoundedQueue
+from modules.serial.rn2483_framer import LINE_END, LineKind, RadioLine, RN2483Framer
+
+CAPTURE_MAGIC: bytes = b"RN2483C1"
+CAPTURE_EXTENSION: str = "cap"
+RECORD_HEADER: struct.Struct = struct.Struct("<QI")  # Time the line was read in ns, length of the line
+WRITE_BATCH_SIZE: int = 256  # Most records written before the capture file is flushed
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureFormatError(Exception):
+    """Raised when a file is not a valid capture file."""
+
+
+class CaptureWriter:
+    """Writes raw radio lines to rotating capture files from a background thread."""
+
+    def __init__(self, parameters: CaptureParameters, name: str = "rn2483") -> None:
+        self.directory: Path = Path.cwd().joinpath(parameters.directory)
+        self.max_file_size: int = parameters.max_file_size
+        self.max_files: int = parameters.max_files
+        self.name: str = name
+
+        self.records: SimpleQueue[Optional[tuple[int, bytes]]] = SimpleQueue()  # None stops the writer thread
+        self.file: Optional[BinaryIO] = None
+        self.filepath: Optional[Path] = None
+        self.lines_written: int = 0
+        self.thread: threading.Thread = threading.Thread(target=self.run, name="capture-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, time_ns: int, line: bytes) -> None:
+        """Queues a line read from the radio at the given time to be written to the capture."""
+        self.records.put((time_ns, line))
+
+    def close(self) -> None:
+        """Writes all queued lines, then stops the writer thread and closes the capture file."""
+        self.records.put(None)
+        self.thread.join()
+
+    def run(self) -> None:
+        try:
+            while True:
+                record = self.records.get()
+                if record is None:
+                    return
+                self.write_record(*record)
+
+                # Flush once the lines which built up have been written, so little is lost if the process is killed
+                if self.records.empty() or self.lines_written % WRITE_BATCH_SIZE == 0:
+                    assert self.file is not None
+                    self.file.flush()
+        finally:
+            if self.file is not None:
+                self.file.close()
+
+    def write_record(self, time_ns: int, line: bytes) -> None:
+        """Writes one record, first starting a new capture file if the current one is full."""
+        if self.file is None or self.file.tell() >= self.max_file_size:
+            self.rotate()
+        assert self.file is not None
+        _ = self.file.write(RECORD_HEADER.pack(time_ns, len(line)))
+        _ = self.file.write(line)
+        self.lines_written += 1
+
+    def rotate(self) -> None:
+        """Starts a new capture file, deleting the oldest capture files beyond the number kept."""
+        if self.file is not None:
+            self.file.close()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.filepath = self.directory.joinpath(
+            f"{self.name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.{CAPTURE_EXTENSION}"
+        )
+        self.file = open(self.filepath, "wb")
+        _ = self.file.write(CAPTURE_MAGIC)
+        logger.info(f"Capturing raw radio lines to {self.filepath}")
+
+        captures = sorted(self.directory.glob(f"{self.name}-*.{CAPTURE_EXTENSION}"))
+        for old_capture in captures[: -self.max_files]:
+            old_capture.unlink(missing_ok=True)
+
+
+def read_capture(filepath: Path) -> Iterator[tuple[int, bytes]]:
+    """
+    Reads the records of a capture file. A record cut short at the end of the file, such as when the ground station
+    was killed mid-write, is ignored.
+
+    Returns:
+        An iterator of the time each line was read in nanoseconds, and the line without its line ending.
+    """
+    with open(filepath, "rb") as file:
+        if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise CaptureFormatError(f"{filepath} is not an RN2483 capture file.")
+
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            time_ns, length = RECORD_HEADER.unpack(header)
+            line = file.read(length)
+            if len(line) < length:
+                logger.warning(f"Capture {filepath} ends part way through a line")
+                return
+            yield time_ns, line
+
+
+def replay_lines(
+    records: Iterator[tuple[int, bytes]],
+    speed: float = 1.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Iterator[RadioLine]:
+    """
+    Re-injects captured lines through the framer, waiting between lines as long as the radio did divided by the
+    speed. A speed of 0 replays the lines without waiting.
+
+    Returns:
+        An iterator of the lines as classified by the framer.
+    """
+    framer = RN2483Framer()
+    start_ns: Optional[int] = None
+    replay_start = time.monotonic()
+
+    for time_ns, line in records:
+        if start_ns is None:
+            start_ns = time_ns
+
+        if speed > 0:
+            delay = (time_ns - start_ns) / 1e9 / speed - (time.monotonic() - replay_start)
+            if delay > 0:
+                sleep(delay)
+
+        framer.feed(line + LINE_END)
+        radio_line = framer.pop_line()
+        if radio_line is not None:
+            yield radio_line
+
+
+def capture_replay_process(
+    serial_status: Queue[str],
+    rn2483_radio_payloads: Queue[TimestampedPayload],
+    filepath: str,
+    speed: float = 1.0,
+) -> None:
+    """
+    Replays a capture as if it were a radio, putting its received packets on the payload queue. The capture file
+    stands in for the port of the radio.
+    """
+
+    serial_status.put(f"rn2483_port {filepath}")
+    serial_status.put(f"rn2483_connected {filepath} True")
+
+    received = 0
+    for line in replay_lines(read_capture(Path(filepath)), speed):
+        if line.kind == LineKind.RX:
+            rn2483_radio_payloads.put(TimestampedPayload.received(line.data.decode("ascii"), filepath))
+            received += 1
+
+    logger.info(f"Capture replay: Finished replaying {received} packets from {filepath}")
+
+    # Payloads spilled while telemetry was behind would be lost with this process, but telemetry may be stalled, so
+    # they are only waited for a while
+    if isinstance(rn2483_radio_payloads, BoundedQueue):
+        spilled = rn2483_radio_payloads.spilled.value
+        if not rn2483_radio_payloads.drain_spill(min(4 * SPILL_FLUSH_INTERVAL * spilled, MAX_SPILL_DRAIN_TIME)):
+            logger.warning(
+                f"Capture replay: {rn2483_radio_payloads.spilled.value} payloads were left on disk, as telemetry did"
+                " not take them in time"
+            )
+    serial_status.put(f"rn2483_connected {filepath} False")
+
+
+def main() -> None:
+    """Replays a capture through the framer and parser, printing each line and what it parsed to."""
+    from modules.misc.config import load_config
+    from modules.telemetry.telemetry_utils import parse_rn2483_transmission
+
+    parser = argparse.ArgumentParser(description="Replays a raw RN2483 capture through the framer and parser.")
+    _ = parser.add_argument("capture", type=Path, help="The capture file to replay.")
+    _ = parser.add_argument("--speed", type=float, default=0.0, help="Replay speed, where 0 does not wait.")
+    _ = parser.add_argument("--config", default="config.json", help="Config file with the approved call signs.")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    for line in replay_lines(read_capture(args.capture), args.speed):
+        print(f"{line.kind.name:<8} {line.data.decode('ascii', errors='replace')}")
+        if line.kind == LineKind.RX:
+            print(f"         {parse_rn2483_transmission(line.data.decode('ascii'), config)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Discovers the serial ports available for radios, without holding up the serial manager.
+
+On Linux, ports are enumerated from /sys/class/tty and /dev/serial/by-id, and on other platforms they are listed by
+pyserial from the operating system. Ports are never opened to find them, so ports in use by the ground station (or
+anything else) are still listed, and a scan never waits on a port. Results are cached, and a background thread
+rescans periodically so that ports being plugged in or removed are pushed as status updates.
+"""
+
+import logging
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from queue import Queue
+from typing import Optional
+
+import serial.tools.list_ports
+
+TEST_PORT: str = "test"  # The emulated radio is always available
+USB_SERIAL_PREFIXES: tuple[str, ...] = ("ttyUSB", "ttyACM")
+SYS_CLASS_TTY: Path = Path("/sys/class/tty")
+SERIAL_BY_ID: Path = Path("/dev/serial/by-id")
+DEV_DIR: Path = Path("/dev")
+MACOS_CALLOUT_PREFIX: str = "/dev/cu."  # Listed alongside the /dev/tty. node of every port on macOS
+HOTPLUG_INTERVAL: float = 2.0  # Seconds between rescans for ports being plugged in or removed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PortInfo:
+    """A serial port found on the system."""
+
+    device: str  # Path to the device, e.g. /dev/ttyUSB0
+    by_id: Optional[str] = None  # Stable path to the device which survives it being plugged in again, if known
+    description: str = ""
+
+
+def read_sysfs(path: Path) -> str:
+    """Returns the stripped contents of a sysfs attribute, or an empty string if it can't be read."""
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return ""
+
+
+def usb_description(device: Path) -> str:
+    """Returns the product name of the USB device a tty belongs to, searching up from its sysfs device directory."""
+    for directory in [device, *device.resolve().parents[:3]]:
+        product = read_sysfs(directory.joinpath("product"))
+        if product:
+            return product
+    return ""
+
+
+def linux_ports(
+    sys_class_tty: Path = SYS_CLASS_TTY, serial_by_id: Path = SERIAL_BY_ID, dev_dir: Path = DEV_DIR
+) -> list[PortInfo]:
+    """Returns the USB serial ports on a Linux system, found from sysfs and udev's by-id links without opening them."""
+
+    by_id: dict[str, str] = {}
+    if serial_by_id.is_dir():
+        for link in serial_by_id.iterdir():
+            by_id[str(link.resolve())] = str(link)
+
+    devices: dict[str, str] = {}
+    if sys_class_tty.is_dir():
+        for tty in sys_class_tty.iterdir():
+            device = tty.joinpath("device")
+            if tty.name.startswith(USB_SERIAL_PREFIXES) and device.exists():
+                devices[str(dev_dir.joinpath(tty.name))] = usb_description(device)
+
+    # Devices linked by udev but not found in sysfs are still usable
+    for device in by_id:
+        _ = devices.setdefault(device, "")
+
+    return [PortInfo(device, by_id.get(device), devices[device]) for device in sorted(devices)]
+
+
+def stable_path(device: str, serial_by_id: Path = SERIAL_BY_ID) -> str:
+    """
+    Returns a path to the device which stays the same if the device is unplugged and plugged back in, where udev
+    provides one. Device nodes like /dev/ttyUSB0 can be renumbered when a device comes back.
+    """
+    if not serial_by_id.is_dir() or device.startswith(str(serial_by_id)):
+        return device
+
+    resolved = Path(device).resolve()
+    for link in serial_by_id.iterdir():
+        if link.resolve() == resolved:
+            return str(link)
+    return device
+
+
+def listed_ports() -> list[PortInfo]:
+    """Returns the serial ports listed by the operating system, through pyserial, without opening them."""
+    ports = [
+        PortInfo(port.device, description=port.description if port.description != "n/a" else "")
+        for port in serial.tools.list_ports.comports()
+        if not port.device.startswith(MACOS_CALLOUT_PREFIX)
+    ]
+    return sorted(ports, key=lambda port: port.device)
+
+
+def discover_ports() -> list[PortInfo]:
+    """
+    Finds the serial ports on the system.
+
+    Raises:
+        EnvironmentError: On unsupported or unknown platforms.
+    """
+    if sys.platform.startswith("linux"):
+        return linux_ports()
+    if sys.platform.startswith(("win", "cygwin", "darwin")):
+        return listed_ports()
+    raise EnvironmentError(f"Unsupported platform {sys.platform}")
+
+
+class SerialPortScanner:
+    """Caches the serial ports available on the system, rescanning them in a background thread."""
+
+    def __init__(self, serial_status: Queue[str], interval: float = HOTPLUG_INTERVAL):
+        self.serial_status: Queue[str] = serial_status
+        self.interval: float = interval
+        self.ports: list[PortInfo] = []
+        self.scan_requested: threading.Event = threading.Event()
+        self.stopping: threading.Event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port_names(self) -> list[str]:
+        """The cached serial ports as presented to the user, including the test port."""
+        return [port.device for port in self.ports] + [TEST_PORT]
+
+    def publish(self) -> None:
+        """Puts the cached serial ports on the serial status queue."""
+        self.serial_status.put(f"serial_ports {self.port_names}")
+
+    def scan(self) -> bool:
+        """
+        Scans for serial ports, publishing them if they have changed since the last scan.
+
+        Returns:
+            True if the serial ports changed.
+        """
+        try:
+            ports = discover_ports()
+        except EnvironmentError as e:
+            logger.error(f"Serial: {e}")
+            return False
+
+        if ports == self.ports:
+            return False
+
+        for port in set(ports) - set(self.ports):
+            logger.info(f"Serial: Found {port.device} {port.description}".rstrip())
+        for port in set(self.ports) - set(ports):
+            logger.info(f"Serial: Lost {port.device}")
+
+        self.ports = ports
+        self.publish()
+        return True
+
+    def request_scan(self) -> None:
+        """Publishes the cached serial ports straight away and wakes the background thread to rescan."""
+        self.publish()
+        self.scan_requested.set()
+
+    def start(self) -> None:
+        """Starts scanning in the background, beginning with an immediate scan."""
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="serial-port-scanner", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread and waits for it."""
+        self.stopping.set()
+        self.scan_requested.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self) -> None:
+        """Scans at start up, then again on request or every interval until stopped."""
+        if not self.scan():
+            self.publish()  # Always let the user know the ports found at start up
+
+        while not self.stopping.is_set():
+            _ = self.scan_requested.wait(self.interval)
+            self.scan_requested.clear()
+            if not self.stopping.is_set():
+                _ = self.scan()
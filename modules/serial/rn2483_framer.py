@@ -0,0 +1,154 @@
+"""
+Incremental framing of the serial output of an RN2483 radio.
+
+Bytes are read as they become available into a single reusable buffer and split into lines ending in '\r\n'. Each
+line is classified without converting the buffer into strings, so partial lines and bursts of back-to-back packets
+are handled cheaply.
+
+An optional tap is given every raw line along with the time it was read, for capturing the radio output to disk.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Callable, Optional
+from serial import Serial
+
+LINE_END: bytes = b"\r\n"
+RX_PREFIX: bytes = b"radio_rx"
+ERR_PREFIX: bytes = b"radio_err"
+HEX_DIGITS: bytes = b"0123456789abcdefABCDEF"
+MAX_LINE_LENGTH: int = 1024  # Longer than any reply; the largest radio_rx line is 255 payload bytes in hexadecimal
+SPACE: int = ord(" ")
+
+logger = logging.getLogger(__name__)
+
+
+class LineKind(Enum):
+    """The kinds of lines output by the RN2483 radio."""
+
+    RX = auto()  # A received packet with a valid hexadecimal payload
+    INVALID = auto()  # A received packet whose payload is not valid hexadecimal
+    ERR = auto()  # A reception error or time out
+    OK = auto()
+    BUSY = auto()
+    NUMERIC = auto()  # A numeric reply, such as the signal to noise ratio
+    OTHER = auto()  # Any other reply, such as the firmware version after a reset
+
+
+@dataclass(slots=True)
+class RadioLine:
+    """
+    A line output by the RN2483 radio, without its line ending. For received packets, data is only the payload in
+    hexadecimal digits; otherwise it is the whole line.
+    """
+
+    kind: LineKind
+    data: bytes = b""
+
+
+def is_hex_payload(payload: bytes) -> bool:
+    """Returns True if the payload is a non-empty, whole number of bytes in hexadecimal digits."""
+    return len(payload) > 0 and len(payload) % 2 == 0 and not payload.translate(None, HEX_DIGITS)
+
+
+class RN2483Framer:
+    """Splits the byte stream read from an RN2483 radio into classified lines."""
+
+    def __init__(self, serial: Optional[Serial] = None, tap: Optional[Callable[[int, bytes], None]] = None):
+        self.serial: Optional[Serial] = serial  # Without a serial port, lines are only fed to the framer
+        self.buffer: bytearray = bytearray()
+        self.start: int = 0  # Start of the first unprocessed line in the buffer
+
+        # Called with the time each line was read (time.monotonic_ns) and the line without its line ending
+        self.tap: Optional[Callable[[int, bytes], None]] = tap
+        self.read_time_ns: int = 0
+
+    def feed(self, data: bytes) -> None:
+        """Adds bytes read from the radio to the end of the buffer."""
+        self.buffer += data
+        if self.tap is not None:
+            self.read_time_ns = time.monotonic_ns()
+
+    def read(self) -> int:
+        """
+        Reads all bytes waiting on the serial port into the buffer. If none are waiting, waits up to the serial read
+        timeout for at least one.
+
+        Returns:
+            The number of bytes read.
+        """
+        assert self.serial is not None
+        data = self.serial.read(max(self.serial.in_waiting, 1))
+        self.feed(data)
+        return len(data)
+
+    def pop_line(self) -> Optional[RadioLine]:
+        """
+        Removes the first complete line from the buffer.
+
+        Returns:
+            The classified line, or None if the buffer does not hold a complete line.
+        """
+        end = self.buffer.find(LINE_END, self.start)
+        if end < 0:
+            self._compact()
+            return None
+
+        if self.tap is not None:
+            self.tap(self.read_time_ns, bytes(memoryview(self.buffer)[self.start : end]))
+
+        line = self._classify(self.start, end)
+        self.start = end + len(LINE_END)
+        return line
+
+    def next_line(self) -> Optional[RadioLine]:
+        """
+        Returns the next complete line, reading from the serial port until one arrives.
+
+        Returns:
+            The classified line, or None if a read timed out before a complete line arrived.
+        """
+        while True:
+            line = self.pop_line()
+            if line is not None:
+                return line
+            if self.read() == 0:
+                return None
+
+    def _compact(self) -> None:
+        """Discards processed lines from the front of the buffer, and any partial line which is too long."""
+        if self.start > 0:
+            del self.buffer[: self.start]
+            self.start = 0
+
+        if len(self.buffer) > MAX_LINE_LENGTH:
+            logger.warning(f"Discarding {len(self.buffer)} bytes from the radio without a line ending")
+            self.buffer.clear()
+
+    def _classify(self, start: int, end: int) -> RadioLine:
+        """Classifies the line between the start and end positions of the buffer."""
+        buffer = self.buffer
+
+        if buffer.startswith(RX_PREFIX, start, end):
+            # Payload follows the indicator after some spaces
+            start += len(RX_PREFIX)
+            while start < end and buffer[start] == SPACE:
+                start += 1
+            while end > start and buffer[end - 1] == SPACE:
+                end -= 1
+            payload = bytes(memoryview(buffer)[start:end])
+            return RadioLine(LineKind.RX if is_hex_payload(payload) else LineKind.INVALID, payload)
+
+        if buffer.startswith(ERR_PREFIX, start, end):
+            return RadioLine(LineKind.ERR)
+
+        line = bytes(memoryview(buffer)[start:end]).strip()
+        if line == b"ok":
+            return RadioLine(LineKind.OK, line)
+        if line == b"busy":
+            return RadioLine(LineKind.BUSY, line)
+        if line.removeprefix(b"-").isdigit():
+            return RadioLine(LineKind.NUMERIC, line)
+        return RadioLine(LineKind.OTHER, line)
@@ -5,13 +5,19 @@ See the command data sheet for more information:
 https://ww1.microchip.com/downloads/en/DeviceDoc/RN2483-LoRa-Technology-Module-Command-Reference-User-Guide-DS40001784G.pdf
 """
 
+import time
+from collections import deque
 from typing import Optional
 from serial import Serial, EIGHTBITS, PARITY_NONE, SerialException
 from modules.misc.config import RadioParameters
+from modules.serial.rn2483_framer import LineKind, RadioLine, RN2483Framer
 
 RN2483_BAUD: int = 57600  # The baud rate of the RN2483 radio
 NUM_GPIO: int = 14  # Number of GPIO pins on the RN2483 module
 READ_TIMEOUT: float = 1.0  # Time out for serial read operations
+PIPELINE_DEPTH: int = 4  # Commands sent ahead of their replies, kept small to not overrun the radio's UART buffer
+SIGNAL_SAMPLE_INTERVAL: float = 0.25  # Shortest time between link quality samples, in seconds
+SIGNAL_SETTINGS: tuple[str, ...] = ("snr", "rssi")  # Link quality of the last received packet
 
 # Radio parameters
 MODULATION_MODES: list[str] = ["lora", "fsk"]
@@ -40,46 +46,58 @@ SETTING_KW: dict[str, str] = {
 }
 
 
+# The settings last applied to each radio, by serial port
+APPLIED_SETTINGS: dict[str, dict[str, str]] = {}
+
+
 # Helper functions
-def wait_for_ok(conn: Serial) -> bool:
+def setting_values(parameters: RadioParameters) -> dict[str, str]:
     """
-    Check to see if 'ok' is loaded onto the serial line by the RN2483 radio. If we receive 'ok' then this
-    function returns True. If anything else is read from the serial line then this function returns False.
+    Returns the radio parameters as the values sent to the RN2483 radio, by setting keyword.
 
     Arguments:
-        conn: Serial connection to an RN2483 radio.
+        parameters: The parameters to convert.
     """
-    rv = str(conn.readline())  # Read from serial line
-    return ("ok" in rv) or ("4294967245" in rv)
+    settings: dict[str, str] = {}
+    for parameter, value in parameters:
+        # Special case where spread factor value must be preceded by sf
+        if parameter == "spread_factor":
+            value = f"sf{value}"
 
+        # Special case: boolean settings must be specified using on/off terms instead of true/false
+        if parameter == "cyclic_redundancy" or parameter == "iqi":
+            value = "on" if value else "off"
 
-def radio_write(conn: Serial, data: str) -> None:
+        settings[SETTING_KW[parameter]] = str(value)
+    return settings
+
+
+def is_ok(line: Optional[RadioLine]) -> bool:
     """
-    Writes data to the RN2483 radio via UART.
+    Checks if a line read from the RN2483 radio is a response of 'ok'.
 
     Arguments:
-        conn: A serial connection to the RN2483 radio.
-        data: The full command or data to be sent to the RN2483 radio.
+        line: A line read from the RN2483 radio, or None if the read timed out.
     """
-    data = str(data) + "\r\n"
-    conn.flush()  # Flush the serial port
-    conn.write(data.encode("utf-8"))  # Encode command_string as bytes and then transmit over serial port
+    return line is not None and (line.kind == LineKind.OK or line.data == b"4294967245")
 
 
-def radio_write_ok(conn: Serial, data: str) -> bool:
+def radio_write(conn: Serial, data: str) -> None:
     """
-    Writes a command to the radio and waits for a response of 'ok'.
+    Writes data to the RN2483 radio via UART.
 
     Arguments:
-        conn: A serial connection to the radio.
+        conn: A serial connection to the RN2483 radio.
         data: The full command or data to be sent to the RN2483 radio.
     """
-    radio_write(conn, data)
-    return wait_for_ok(conn)
+    data = str(data) + "\r\n"
+    conn.flush()  # Flush the serial port
+    conn.write(data.encode("utf-8"))  # Encode command_string as bytes and then transmit over serial port
 
 
 class RN2483Radio:
     def __init__(self, serial_port: str):
+        self.port: str = serial_port
         self.serial = Serial(
             port=serial_port,
             timeout=1,
@@ -90,6 +108,21 @@ class RN2483Radio:
             rtscts=False,
         )
         self.serial.timeout = READ_TIMEOUT  # Read timeout of 10 seconds
+        self.framer: RN2483Framer = RN2483Framer(self.serial)  # All reads from the radio go through the framer
+
+        # Continuous reception state
+        self.rx_armed: bool = False  # The watch dog timer is off and the LoRaWAN stack is paused
+        self.listening: bool = False  # A 'radio rx 0' command is outstanding
+        self.unread_replies: deque[str] = deque()  # Commands sent without waiting for their reply, oldest first
+
+        # Link quality, sampled after received packets
+        self.signal_samples: deque[tuple[str, int]] = deque()  # Setting and value, waiting to be reported
+        self.last_signal_sample: float = 0.0
+        self.received: deque[bytes] = deque()  # Payloads which arrived while waiting on a command reply
+
+    def close(self) -> None:
+        """Closes the serial connection to the radio."""
+        self.serial.close()
 
     def init_gpio(self) -> None:
         """Set all GPIO pins to input mode, thereby putting them in a state of high impedance."""
@@ -104,6 +137,37 @@ class RN2483Radio:
         for i in range(NUM_GPIO):
             radio_write(self.serial, f"sys set pinmode GPIO{i} digin")
 
+    def reply(self) -> Optional[RadioLine]:
+        """
+        Reads the reply to the last command sent to the radio. Packets which arrive in the meantime are kept for
+        receive(), and replies to earlier 'radio rx 0' commands are skipped.
+
+        Returns:
+            The reply, or None if the read timed out.
+        """
+        while (line := self.framer.next_line()) is not None:
+            match line.kind:
+                case LineKind.RX:
+                    self.received.append(line.data)
+                    self.listening = False
+                case LineKind.INVALID | LineKind.ERR:
+                    self.listening = False
+                case _ if self.unread_replies:
+                    self._unread_reply(line)
+                case _:
+                    return line
+        return None
+
+    def write_ok(self, command: str) -> bool:
+        """
+        Writes a command to the radio and waits for a response of 'ok'.
+
+        Arguments:
+            command: The full command to be sent to the RN2483 radio.
+        """
+        radio_write(self.serial, command)
+        return is_ok(self.reply())
+
     def reset(self) -> bool:
         """
         Performs a software reset on the RN2483 radio.
@@ -112,8 +176,63 @@ class RN2483Radio:
             True if the reset was successful, false otherwise.
         """
         radio_write(self.serial, "sys reset")
-        wait_for_ok(self.serial)
-        return "RN2483" in str(self.serial.readline())  # Confirm from the RN2483 radio that the reset was a success
+        line = self.reply()
+        if is_ok(line):
+            line = self.reply()
+
+        # Confirm from the RN2483 radio that the reset was a success
+        return line is not None and line.data.startswith(b"RN2483")
+
+    def pipeline(self, commands: list[str]) -> list[Optional[RadioLine]]:
+        """
+        Sends independent commands to the radio without waiting for each reply before sending the next, keeping a
+        few commands in flight at a time.
+
+        Arguments:
+            commands: The full commands to be sent to the RN2483 radio.
+
+        Returns:
+            The reply to each command, in order. A reply is None if the read timed out.
+        """
+        replies: list[Optional[RadioLine]] = []
+        for i in range(0, len(commands), PIPELINE_DEPTH):
+            batch = commands[i : i + PIPELINE_DEPTH]
+            for command in batch:
+                radio_write(self.serial, command)
+            replies.extend(self.reply() for _ in batch)
+        return replies
+
+    def read_settings(self, keywords: list[str]) -> Optional[dict[str, str]]:
+        """
+        Reads the current value of radio settings.
+
+        Arguments:
+            keywords: The keywords of the settings to read.
+
+        Returns:
+            The value of each setting, or None if the radio did not reply to every read.
+        """
+        replies = self.pipeline([f"radio get {keyword}" for keyword in keywords])
+        if any(reply is None for reply in replies):
+            return None
+        return {
+            keyword: reply.data.decode("utf-8", errors="replace") for keyword, reply in zip(keywords, replies) if reply
+        }
+
+    def apply_settings(self, settings: dict[str, str]) -> None:
+        """
+        Sets radio settings, pipelining the set commands.
+
+        Arguments:
+            settings: The values to set, by setting keyword.
+
+        Raises:
+            SerialException: When a radio setting could not be set.
+        """
+        replies = self.pipeline([f"radio set {keyword} {value}" for keyword, value in settings.items()])
+        for (keyword, value), reply in zip(settings.items(), replies):
+            if not is_ok(reply):
+                raise SerialException(f"Could not set parameter '{keyword}' to '{value}'.")
 
     def configure(self, parameters: RadioParameters) -> None:
         """
@@ -125,22 +244,15 @@ class RN2483Radio:
         Raises:
             SerialException: When a radio parameter could not be set.
         """
-
-        for parameter, value in parameters:
-            # Special case where spread factor value must be preceded by sf
-            if parameter == "spread_factor":
-                value = f"sf{value}"
-
-            # Special case: boolean settings must be specified using on/off terms instead of true/false
-            if parameter == "cyclic_redundancy" or parameter == "iqi":
-                value = "on" if value else "off"
-
-            if not radio_write_ok(self.serial, f"radio set {SETTING_KW[parameter]} {value}"):
-                raise SerialException(f"Could not set parameter '{SETTING_KW[parameter]}' to '{value}'.")
+        settings = setting_values(parameters)
+        self.apply_settings(settings)
+        APPLIED_SETTINGS[self.port] = settings
 
     def setup(self, parameters: RadioParameters) -> None:
         """
-        Resets the RN2483 radio, initializes its GPIO pins and sets its parameters to those provided.
+        Sets up the RN2483 radio with the parameters provided. The current settings are read back from the radio and
+        only those which differ are set, so reconnecting to a radio which is already configured is quick. The radio
+        is only reset if it does not reply to the read back. Reception must be armed again afterwards.
 
         Arguments:
             parameters: The parameters to set up the radio with.
@@ -148,57 +260,131 @@ class RN2483Radio:
         Raises:
             SerialException: When a radio parameter could not be set.
         """
-        self.reset()
-        self.configure(parameters)
+        self.rx_armed = False
+        self.listening = False
+
+        # Settings which changed since they were last applied to this radio must be set without reading them back
+        desired = setting_values(parameters)
+        applied = APPLIED_SETTINGS.get(self.port)
+        unchanged = [keyword for keyword, value in desired.items() if applied is None or applied.get(keyword) == value]
+
+        # Stop any reception in progress so the radio replies to the read back
+        _ = self.write_ok("radio rxstop")
+
+        current = self.read_settings(unchanged)
+        if current is None:
+            self.reset()
+            self.configure(parameters)
+            return
+
+        differing = {
+            keyword: value for keyword, value in desired.items() if current.get(keyword, "").lower() != value.lower()
+        }
+        self.apply_settings(differing)
+        APPLIED_SETTINGS[self.port] = desired
         # For some reason, initializing GPIO causes issues. We don't need them anyway
         # self.init_gpio()
 
-    def _set_rx_mode(self) -> bool:
+    def start_rx(self) -> bool:
         """
-        Set the RN2483 radio to receive mode so that it constantly listens for transmissions.
+        Arms the RN2483 radio for continuous reception. This only needs to be done once after setting up the radio;
+        afterwards each received packet only requires the radio to be told to listen again.
 
         Returns:
-            True setting receive mode worked, false otherwise.
+            True if the radio is listening, false otherwise.
         """
-        if not radio_write_ok(self.serial, "radio set wdt 0"):  # Turn off watch dog timer
+        if not self.write_ok("radio set wdt 0"):  # Turn off watch dog timer
             return False
-        if not radio_write_ok(self.serial, "mac pause"):  # This command must be passed before any reception can occur
+        if not self.write_ok("mac pause"):  # This command must be passed before any reception can occur
             return False
+        self.rx_armed = True
 
         # Command radio to go into continuous reception mode
         radio_write(self.serial, "radio rx 0")
-        result = str(self.serial.readline())
-        if "busy" in result or "ok" in result:
-            return True
-        return False
+        result = self.reply()
+        self.listening = result is not None and result.kind in (LineKind.OK, LineKind.BUSY)
+        return self.listening
+
+    def _listen(self) -> None:
+        """
+        Tells the radio to listen for the next packet, without waiting for its reply. The 'ok' reply is skipped
+        when it arrives, so no time is spent waiting on a serial round trip between packets.
+        """
+        radio_write(self.serial, "radio rx 0")
+        self.listening = True
+        self.unread_replies.append("rx")
+
+    def _sample_signal(self) -> None:
+        """
+        Asks the radio for the link quality of the packet it just received, without waiting for the replies. This
+        must be done before listening again, and is limited to one sample per interval so high packet rates aren't
+        slowed down.
+        """
+        now = time.monotonic()
+        if now - self.last_signal_sample < SIGNAL_SAMPLE_INTERVAL:
+            return
+        self.last_signal_sample = now
+
+        for setting in SIGNAL_SETTINGS:
+            radio_write(self.serial, f"radio get {setting}")
+            self.unread_replies.append(setting)
+
+    def _unread_reply(self, line: RadioLine) -> None:
+        """Handles the reply to the oldest command which was sent without waiting for its reply."""
+        command = self.unread_replies.popleft()
+        if command in SIGNAL_SETTINGS and line.kind == LineKind.NUMERIC:
+            self.signal_samples.append((command, int(line.data)))
 
     def receive(self) -> Optional[str]:
         """
-        Checks for new transmissions on the serial connection.
+        Checks for new transmissions on the serial connection. Reception is armed on the first call, and the radio is
+        only told to listen again once it reports a received packet or a reception error.
 
         Returns:
             A string message that the radio received (in hexadecimal digits), otherwise None.
         """
 
-        # Enter receive mode
-        if not self._set_rx_mode():
-            return None
-
-        message = str(self.serial.readline())[10:-5]  # Trim off reception indicator
-
-        # Check if message is in hex
-        try:
-            int(message, 16)
-            return message
-        except ValueError:
-            return None
+        if self.received:
+            return self.received.popleft().decode("ascii")
+
+        if not self.rx_armed:
+            if not self.start_rx():
+                return None
+        elif not self.listening:
+            self._listen()
+
+        line = self.framer.next_line()
+        if line is None:
+            return None  # Read timeout
+
+        match line.kind:
+            case LineKind.RX:
+                # Sample the link quality before listening again right away, so the next packet isn't missed
+                self._sample_signal()
+                self._listen()
+                return line.data.decode("ascii")
+            case LineKind.INVALID | LineKind.ERR:
+                self._listen()
+            case _ if self.unread_replies:
+                self._unread_reply(line)
+        return None
 
     def signal_report(self) -> int:
         """
-        Gets a signal to noise ratio report from the radio.
+        Gets a signal to noise ratio report from the radio. Reception is stopped for the request if it was active.
 
         Returns:
             An integer from -128 to 127 representing the signal to noise ratio of the last received packet.
+
+        Raises:
+            SerialException: When the radio does not reply with a number.
         """
+        if self.listening:
+            _ = self.write_ok("radio rxstop")
+            self.listening = False
+
         radio_write(self.serial, "radio get snr")
-        return int(self.serial.readline())
+        line = self.reply()
+        if line is None or line.kind != LineKind.NUMERIC:
+            raise SerialException(f"Invalid signal to noise ratio reply: {line}")
+        return int(line.data)
@@ -0,0 +1,288 @@
+"""
+Simulates an RN2483 radio on a Linux pseudo-terminal, so that the real serial path (RN2483Radio and
+rn2483_radio_process) can be run and load-tested without hardware.
+
+The simulator implements the part of the RN2483 command protocol used by the ground station, and outputs received
+packets at a configurable rate while the radio is listening. Packets can be lost, corrupted or jittered in time.
+
+Run it with `python -m modules.serial.rn2483_simulator`, then connect the ground station to the printed port.
+"""
+
+import argparse
+import logging
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+from typing import Callable, Optional
+
+from modules.telemetry.v1.block import DeviceAddress
+
+FIRMWARE_VERSION: str = "RN2483 1.0.5 Oct 31 2018 15:06:52"
+MAC_PAUSE_REPLY: str = "4294967245"  # Longest time the LoRaWAN stack can be paused for, in milliseconds
+MAX_OUTPUT_SIZE: int = 65536  # Output waiting to be read beyond this is dropped, like an overrun UART
+POLL_INTERVAL: float = 0.1  # Longest time the simulator thread waits before checking if it should stop
+CORRUPT_CHARACTERS: str = "GHIJKLMNOPQRSTUVWXYZ"
+
+# Radio settings after a reset, by keyword of the 'radio get' and 'radio set' commands
+DEFAULT_SETTINGS: dict[str, str] = {
+    "mod": "lora",
+    "freq": "868100000",
+    "pwr": "1",
+    "sf": "sf12",
+    "cr": "4/5",
+    "bw": "125",
+    "prlen": "8",
+    "crc": "on",
+    "iqi": "off",
+    "sync": "34",
+    "wdt": "15000",
+}
+
+logger = logging.getLogger(__name__)
+
+
+# Helper functions
+def header_payload(packet_num: int, callsign: str = "VA3INI") -> str:
+    """
+    Returns a packet in hexadecimal digits made up of only a v1 packet header from the rocket.
+
+    Arguments:
+        packet_num: The packet number to put in the header.
+        callsign: The callsign to put in the header.
+    """
+    header = callsign.encode("utf-8").ljust(9, b"\x00")
+    header += struct.pack("<BBBI", 16 // 4 - 1, 1, DeviceAddress.ROCKET, packet_num)
+    return header.hex().upper()
+
+
+class RN2483Simulator:
+    """An RN2483 radio simulated on a pseudo-terminal, run by a background thread."""
+
+    def __init__(
+        self,
+        packet_rate: float = 10.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        corruption: float = 0.0,
+        snr: int = 7,
+        rssi: int = -60,
+        payload: Callable[[int], str] = header_payload,
+        seed: Optional[int] = None,
+    ):
+        """
+        Arguments:
+            packet_rate: Packets transmitted per second.
+            jitter: Largest random change to the time between packets, as a fraction of the time between packets.
+            loss: Probability of a packet not being received.
+            corruption: Probability of a received packet having a character in its payload corrupted.
+            snr: Signal to noise ratio reported for received packets.
+            rssi: Received signal strength reported for received packets.
+            payload: Returns the payload in hexadecimal digits of the packet with the given number.
+            seed: Seed for the random number generator, to make a simulation repeatable.
+        """
+        if packet_rate <= 0:
+            raise ValueError(f"Packet rate must be positive, not {packet_rate}.")
+        if not 0 <= jitter < 1:
+            raise ValueError(f"Jitter must be a fraction from 0 up to 1, not {jitter}.")
+        for name, probability in (("Loss", loss), ("Corruption", corruption)):
+            if not 0 <= probability <= 1:
+                raise ValueError(f"{name} must be a probability from 0 to 1, not {probability}.")
+
+        self.packet_interval: float = 1 / packet_rate
+        self.jitter: float = jitter
+        self.loss: float = loss
+        self.corruption: float = corruption
+        self.payload: Callable[[int], str] = payload
+        self.random: random.Random = random.Random(seed)
+
+        self.settings: dict[str, str] = dict(DEFAULT_SETTINGS)
+        self.signal: dict[str, str] = {"snr": str(snr), "rssi": str(rssi)}  # Quality of the last received packet
+        self.listening: bool = False
+
+        # Statistics
+        self.packets_transmitted: int = 0
+        self.packets_received: int = 0  # Output over serial, including corrupted packets
+        self.packets_lost: int = 0  # Lost over the air
+        self.packets_missed: int = 0  # Transmitted while the radio was not listening
+        self.packets_corrupted: int = 0
+        self.overruns: int = 0  # Packets dropped because nothing read the serial output
+
+        self.master_fd: int = -1
+        self.slave_fd: int = -1
+        self.port: str = ""
+        self.commands: bytearray = bytearray()
+        self.output: bytearray = bytearray()
+        self.thread: Optional[threading.Thread] = None
+        self.stopping: threading.Event = threading.Event()
+
+    def __enter__(self) -> "RN2483Simulator":
+        _ = self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def start(self) -> str:
+        """
+        Opens the pseudo-terminal and starts simulating the radio.
+
+        Returns:
+            The path to the serial port of the simulated radio.
+        """
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)  # No echo or line ending translation
+        os.set_blocking(self.master_fd, False)
+        self.port = os.ttyname(self.slave_fd)
+
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="rn2483-simulator", daemon=True)
+        self.thread.start()
+        logger.info(f"RN2483 simulator running on {self.port}")
+        return self.port
+
+    def stop(self) -> None:
+        """Stops simulating the radio and closes the pseudo-terminal."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            if fd >= 0:
+                os.close(fd)
+        self.master_fd = self.slave_fd = -1
+
+    def run(self) -> None:
+        """Handles commands and transmits packets until stopped."""
+        next_packet = time.monotonic() + self.packet_interval
+
+        while not self.stopping.is_set():
+            timeout = min(max(next_packet - time.monotonic(), 0), POLL_INTERVAL)
+            readable, writable, _ = select.select(
+                [self.master_fd], [self.master_fd] if self.output else [], [], timeout
+            )
+
+            if readable:
+                self.read_commands()
+            if writable:
+                self.write_output()
+
+            now = time.monotonic()
+            while now >= next_packet:
+                self.transmit()
+                next_packet += self.packet_interval * (1 + self.random.uniform(-self.jitter, self.jitter))
+
+    def read_commands(self) -> None:
+        """Reads and handles every complete command written to the radio."""
+        try:
+            self.commands += os.read(self.master_fd, 4096)
+        except (BlockingIOError, OSError):
+            return
+
+        while (end := self.commands.find(b"\r\n")) >= 0:
+            command = self.commands[:end].decode("utf-8", errors="replace")
+            del self.commands[: end + 2]
+            self.reply(self.handle(command))
+
+    def handle(self, command: str) -> str:
+        """
+        Carries out a command sent to the radio.
+
+        Returns:
+            The reply of the radio.
+        """
+        match command.split():
+            case ["sys", "reset"]:
+                self.settings = dict(DEFAULT_SETTINGS)
+                self.listening = False
+                return FIRMWARE_VERSION
+            case ["sys", "set", *_]:
+                return "ok"
+            case ["mac", "pause"]:
+                return MAC_PAUSE_REPLY
+            case ["radio", "rx", _]:
+                if self.listening:
+                    return "busy"
+                self.listening = True
+                return "ok"
+            case ["radio", "rxstop"]:
+                self.listening = False
+                return "ok"
+            case ["radio", "set", setting, value] if setting in self.settings:
+                self.settings[setting] = value
+                return "ok"
+            case ["radio", "get", setting] if setting in self.settings:
+                return self.settings[setting]
+            case ["radio", "get", setting] if setting in self.signal:
+                return self.signal[setting]
+            case _:
+                return "invalid_param"
+
+    def transmit(self) -> None:
+        """Transmits the next packet, outputting it if the radio is listening and receives it."""
+        packet_num = self.packets_transmitted
+        self.packets_transmitted += 1
+
+        if self.random.random() < self.loss:
+            self.packets_lost += 1
+            return
+        if not self.listening:
+            self.packets_missed += 1
+            return
+
+        payload = self.payload(packet_num)
+        if self.random.random() < self.corruption:
+            i = self.random.randrange(len(payload))
+            payload = payload[:i] + self.random.choice(CORRUPT_CHARACTERS) + payload[i + 1 :]
+            self.packets_corrupted += 1
+
+        self.listening = False  # The radio stops listening after each packet
+        self.packets_received += 1
+        self.reply(f"radio_rx  {payload}")
+
+    def reply(self, line: str) -> None:
+        """Outputs a line from the radio."""
+        if len(self.output) > MAX_OUTPUT_SIZE:
+            self.overruns += 1
+            return
+        self.output += f"{line}\r\n".encode("utf-8")
+        self.write_output()
+
+    def write_output(self) -> None:
+        """Writes as much of the output as the pseudo-terminal accepts."""
+        try:
+            written = os.write(self.master_fd, self.output)
+        except BlockingIOError:
+            return
+        del self.output[:written]
+
+    def __str__(self) -> str:
+        return (
+            f"transmitted {self.packets_transmitted}, received {self.packets_received}, lost {self.packets_lost}, "
+            f"missed {self.packets_missed}, corrupted {self.packets_corrupted}, overruns {self.overruns}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulates an RN2483 radio on a pseudo-terminal.")
+    _ = parser.add_argument("--rate", help="Packets transmitted per second.", type=float, default=10.0)
+    _ = parser.add_argument("--jitter", help="Jitter as a fraction of the packet interval.", type=float, default=0.0)
+    _ = parser.add_argument("--loss", help="Probability of a packet being lost.", type=float, default=0.0)
+    _ = parser.add_argument("--corruption", help="Probability of a packet being corrupted.", type=float, default=0.0)
+    _ = parser.add_argument("--seed", help="Random seed, for repeatable simulations.", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    simulator = RN2483Simulator(args.rate, args.jitter, args.loss, args.corruption, seed=args.seed)
+    with simulator:
+        print(f"Simulated RN2483 radio on {simulator.port}, connect with: serial rn2483_radio connect {simulator.port}")
+        try:
+            while True:
+                time.sleep(10)
+                logger.info(f"Packets {simulator}")
+        except KeyboardInterrupt:
+            pass
+    logger.info(f"Packets {simulator}")
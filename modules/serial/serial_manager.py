@@ -1,14 +1,21 @@
 """Handles connections, specifying what serial port a radio should use and spawning the serial processes."""
 
-import glob
-import sys
 import logging
-from queue import Queue
+from queue import Empty, Queue
 from multiprocessing import Process, active_children
-from serial import Serial, SerialException
 from modules.misc.config import Config
+from modules.misc.latency import TimestampedPayload
+from modules.misc.metrics import MetricsRegistry, MetricsSnapshot
+from modules.misc.profiling import RuntimeProfiler
+from modules.serial.capture import capture_replay_process
+from modules.serial.port_discovery import TEST_PORT, SerialPortScanner
 from modules.serial.serial_rn2483_radio import rn2483_radio_process
-from modules.serial.serial_rn2483_emulator import SerialRN2483Emulator
+from modules.serial.serial_rn2483_emulator import (
+    DEFAULT_CALLSIGN,
+    DEFAULT_PACKET_RATE,
+    MAX_PACKET_RATE,
+    SerialRN2483Emulator,
+)
 from signal import signal, SIGTERM
 from types import FrameType
 
@@ -23,64 +30,32 @@ def shutdown_sequence(signum: int, stack_frame: FrameType):
     exit(0)
 
 
-def update_serial_ports(serial_status: Queue[str]) -> list[str]:
-    """Finds and updates serial ports on device
-
-    :raises EnvironmentError:
-        On unsupported or unknown platforms
-    :returns:
-        A list of the serial ports available on the system
-    """
-    com_ports: list[str] = [""]
-
-    if sys.platform.startswith("win"):
-        com_ports = ["COM%s" % (i + 1) for i in range(256)]
-    elif sys.platform.startswith("linux") or sys.platform.startswith("cygwin"):
-        # '/dev/tty[A-Za-z]*'
-        com_ports = glob.glob("/dev/ttyUSB*")
-    elif sys.platform.startswith("darwin"):
-        com_ports = glob.glob("/dev/tty.*")
-
-    tested_com_ports: list[str] = []
-
-    # Checks ports if they are potential COM ports
-    for test_port in com_ports:
-        try:
-            ser = Serial(test_port)
-            ser.close()
-            tested_com_ports.append(test_port)
-        except (OSError, SerialException):
-            pass
-
-    tested_com_ports.append("test")
-    serial_status.put(f"serial_ports {tested_com_ports}")
-    return tested_com_ports
-
-
 class SerialManager:
     def __init__(
         self,
         serial_status: Queue[str],
         serial_ws_commands: Queue[list[str]],
-        radio_signal_report: Queue[int],
+        radio_signal_report: Queue[str],
         rn2483_radio_input: Queue[str],
-        rn2483_radio_payloads: Queue[str],
+        rn2483_radio_payloads: Queue[TimestampedPayload],
+        stats_queue: Queue[MetricsSnapshot],
         config: Config,
     ):
         self.serial_status: Queue[str] = serial_status
-        self.serial_ports: list[str] = []
+        self.port_scanner: SerialPortScanner | None = None  # Started with the serial manager process
         self.serial_ws_commands: Queue[list[str]] = serial_ws_commands
 
-        self.radio_signal_report: Queue[int] = radio_signal_report
+        self.radio_signal_report: Queue[str] = radio_signal_report
 
         self.rn2483_radio_input: Queue[str] = rn2483_radio_input
-        self.rn2483_radio_payloads: Queue[str] = rn2483_radio_payloads
-        self.rn2483_radio: Process | None = None
+        self.rn2483_radio_payloads: Queue[TimestampedPayload] = rn2483_radio_payloads
+        self.rn2483_radios: dict[str, Process] = {}  # Radio processes by port, each receiving at the same time
 
-        self.config = config
+        self.stats_queue: Queue[MetricsSnapshot] = stats_queue
+        self.metrics: MetricsRegistry = MetricsRegistry("serial")
+        self.profiler: RuntimeProfiler = RuntimeProfiler("serial")
 
-        # Immediately find serial ports
-        self.serial_ports = update_serial_ports(self.serial_status)
+        self.config = config
 
         # Handle program closing to ensure no orphan processes
         signal(SIGTERM, shutdown_sequence)  # type:ignore
@@ -88,8 +63,20 @@ class SerialManager:
     def run(self):
         logger.info("Serial manager started.")
 
+        # Serial ports are found in the background, so commands can be served straight away
+        self.port_scanner = SerialPortScanner(self.serial_status)
+        self.port_scanner.start()
+
         while True:
-            ws_cmd = self.serial_ws_commands.get()
+            # Wake up periodically to publish metrics even when no commands arrive
+            try:
+                ws_cmd = self.serial_ws_commands.get(timeout=self.metrics.publish_interval)
+            except Empty:
+                self.metrics.publish(self.stats_queue)
+                continue
+
+            if self.metrics.due():
+                self.metrics.publish(self.stats_queue)
 
             # Parse command
             try:
@@ -97,51 +84,139 @@ class SerialManager:
                     case "rn2483_radio":
                         self.parse_rn2483_radio_ws(ws_cmd[1:])
                     case "update":
-                        self.serial_ports = update_serial_ports(self.serial_status)
+                        if self.port_scanner is not None:
+                            self.port_scanner.request_scan()
+                    case "profile":
+                        self.parse_profile_ws(ws_cmd[1:])
                     case _:
                         logger.error("Serial: Invalid device type.")
             except IndexError:
                 logger.error("Serial: Error parsing ws command")
 
+    def parse_profile_ws(self, ws_cmd: list[str]) -> None:
+        """Parses the websocket commands for profiling the serial manager process."""
+        match ws_cmd[0]:
+            case "start":
+                self.profiler.start()
+            case "stop":
+                _ = self.profiler.stop()
+            case "dump":
+                _ = self.profiler.dump()
+            case _:
+                logger.error(f"Serial: Invalid profile command '{ws_cmd[0]}'.")
+
     def parse_rn2483_radio_ws(self, ws_cmd: list[str]) -> None:
-        """Parses the websocket commands relating to the RN2483_radio"""
+        """
+        Parses the websocket commands relating to the RN2483 radios. Several radios can be connected at once, each
+        with its own process, and are disconnected by port ('disconnect <port>') or all together ('disconnect').
+        """
         radio_ws_cmd = ws_cmd[0]
+        self.remove_exited_radios()
 
-        if radio_ws_cmd == "connect" and self.rn2483_radio is None:
-            proposed_serial_port = ws_cmd[1]
-
-            if proposed_serial_port == "test":
-                self.rn2483_radio = Process(
-                    target=SerialRN2483Emulator,
-                    args=(self.serial_status, self.radio_signal_report, self.rn2483_radio_payloads),
-                    daemon=True,
-                )
-            else:
-                self.rn2483_radio = Process(
-                    target=rn2483_radio_process,
-                    args=(
-                        self.serial_status,
-                        self.radio_signal_report,
-                        self.rn2483_radio_input,
-                        self.rn2483_radio_payloads,
-                        proposed_serial_port,
-                        self.config.radio_parameters,
-                    ),
-                    daemon=True,
-                )
-
-            # Start the appropriate process (emulator or real radio)
-            self.rn2483_radio.start()
-
-        elif radio_ws_cmd == "connect":
-            logger.info("Already connected.")
-
-        elif radio_ws_cmd == "disconnect" and self.rn2483_radio is not None:
-            logger.info("Serial: RN2483 Radio terminating")
-            self.serial_status.put("rn2483_connected False")
-            self.serial_status.put("rn2483_port null")
-            self.rn2483_radio.terminate()
-            self.rn2483_radio = None
+        if radio_ws_cmd == "connect":
+            process = self.rn2483_radio_process(ws_cmd[1:])
+            if process is not None:
+                port, self.rn2483_radios[port] = process
+                self.rn2483_radios[port].start()
 
         elif radio_ws_cmd == "disconnect":
-            logger.warning("Serial: RN2483 Radio already disconnected.")
+            ports = ws_cmd[1:2] or list(self.rn2483_radios)
+            if not ports:
+                logger.warning("Serial: RN2483 Radio already disconnected.")
+
+            for port in ports:
+                radio = self.rn2483_radios.pop(port, None)
+                if radio is None:
+                    logger.warning(f"Serial: RN2483 Radio on {port} already disconnected.")
+                    continue
+
+                logger.info(f"Serial: RN2483 Radio on {port} terminating")
+                radio.terminate()
+                self.serial_status.put(f"rn2483_connected {port} False")
+                self.serial_status.put(f"rn2483_port_closed {port}")
+
+    def remove_exited_radios(self) -> None:
+        """
+        Forgets the radio processes which have exited by themselves, such as a capture replay which has finished, so
+        their ports can be connected again.
+        """
+        for port, radio in list(self.rn2483_radios.items()):
+            if not radio.is_alive():
+                logger.info(f"Serial: RN2483 Radio on {port} has exited")
+                radio.join()
+                del self.rn2483_radios[port]
+
+    def rn2483_radio_process(self, ws_cmd: list[str]) -> tuple[str, Process] | None:
+        """
+        Creates the process for the radio on the port given by a connect command, which is either a serial port, the
+        emulated test port or a capture to replay.
+
+        Returns:
+            The port of the radio and its process, or None if the radio is already connected or the command is invalid.
+        """
+        proposed_serial_port = ws_cmd[0]
+
+        if proposed_serial_port == "test":
+            # The test port takes an optional packet rate for soak testing, e.g. 'connect test 1000'
+            try:
+                packet_rate = float(ws_cmd[1]) if len(ws_cmd) > 1 else DEFAULT_PACKET_RATE
+            except ValueError:
+                packet_rate = -1
+            if not 0 < packet_rate <= MAX_PACKET_RATE:
+                logger.error(f"Serial: Emulator packet rate must be above 0 and at most {MAX_PACKET_RATE}.")
+                return None
+
+            port = TEST_PORT
+            process = Process(
+                target=SerialRN2483Emulator,
+                args=(
+                    self.serial_status,
+                    self.radio_signal_report,
+                    self.rn2483_radio_payloads,
+                    next(iter(self.config.approved_callsigns), DEFAULT_CALLSIGN),
+                    packet_rate,
+                ),
+                daemon=True,
+            )
+
+        elif proposed_serial_port == "capture":
+            # Captures of the raw radio output are re-injected at an optional speed, e.g. 'connect capture <file> 0'
+            # The capture file stands in for the port of the radio
+            if len(ws_cmd) < 2:
+                logger.error("Serial: No capture file given to replay.")
+                return None
+            port = ws_cmd[1]
+            try:
+                speed = float(ws_cmd[2]) if len(ws_cmd) > 2 else 1.0
+            except ValueError:
+                speed = -1
+            if speed < 0:
+                logger.error("Serial: Capture replay speed must be 0 (no waiting) or above.")
+                return None
+
+            process = Process(
+                target=capture_replay_process,
+                args=(self.serial_status, self.rn2483_radio_payloads, port, speed),
+                daemon=True,
+            )
+
+        else:
+            port = proposed_serial_port
+            process = Process(
+                target=rn2483_radio_process,
+                args=(
+                    self.serial_status,
+                    self.radio_signal_report,
+                    self.rn2483_radio_input,
+                    self.rn2483_radio_payloads,
+                    port,
+                    self.config.radio_parameters,
+                    self.config.capture,
+                ),
+                daemon=True,
+            )
+
+        if port in self.rn2483_radios:
+            logger.info(f"Already connected to {port}.")
+            return None
+        return port, process
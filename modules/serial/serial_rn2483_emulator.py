@@ -1,69 +1,218 @@
 # Emulates the RN2483 LoRa Radio Module
-# Outputs emulated radio payloads from the CU-InSpace rocket
+# Outputs emulated radio payloads from the CU-InSpace rocket, encoded in version 1 of the radio packet format. The
+# payloads follow a deterministic flight profile (boost, coast, apogee, descent) with seeded sensor noise.
 #
 # Authors:
 # Thomas Selwyn (Devil)
 
 import random
-import struct
 import time
+from dataclasses import dataclass
+from enum import StrEnum
 from queue import Queue
 from multiprocessing import Process
-from datetime import datetime
+from modules.misc.latency import TimestampedPayload
+from modules.serial.port_discovery import TEST_PORT
+from modules.telemetry.v1.block import (
+    BLOCK_HEADER_LENGTH,
+    PACKET_HEADER_LENGTH,
+    BlockHeader,
+    BlockType,
+    DeviceAddress,
+    PacketHeader,
+)
+from modules.telemetry.v1.data_block import (
+    AltitudeDB,
+    DataBlock,
+    DataBlockSubtype,
+    HumidityDB,
+    PressureDB,
+    TemperatureDB,
+)
+
+# Constants
+DEFAULT_CALLSIGN: str = "VA3INI"
+DEFAULT_PACKET_RATE: float = 20.0  # Packets per second
+MAX_PACKET_RATE: float = 10000.0
+BATCH_INTERVAL: float = 0.01  # Seconds between batches of packets put on the payload queue
+GRAVITY: float = 9.80665  # m/s^2
+SEA_LEVEL_PRESSURE: float = 101325  # Pa
+LAPSE_RATE: float = 0.0065  # Temperature drop with altitude in the troposphere, in degrees per metre
+APOGEE_WINDOW: float = 0.5  # Seconds either side of apogee considered to be the apogee phase
+
+
+class FlightPhase(StrEnum):
+    """The phases of the emulated flight."""
+
+    BOOST = "boost"
+    COAST = "coast"
+    APOGEE = "apogee"
+    DESCENT = "descent"
+    LANDED = "landed"
+
+
+@dataclass
+class FlightProfile:
+    """A simple rocket flight: constant thrust, a ballistic coast to apogee and a descent at constant speed."""
+
+    burn_time: float = 3.0  # s
+    boost_acceleration: float = 80.0  # m/s^2, net of gravity
+    descent_rate: float = 25.0  # m/s
+    ground_temperature: float = 22.0  # Celsius
+    ground_humidity: float = 45.0  # Percent
+
+    @property
+    def burnout_velocity(self) -> float:
+        return self.boost_acceleration * self.burn_time
+
+    @property
+    def burnout_altitude(self) -> float:
+        return self.boost_acceleration * self.burn_time**2 / 2
+
+    @property
+    def apogee_time(self) -> float:
+        return self.burn_time + self.burnout_velocity / GRAVITY
+
+    @property
+    def apogee_altitude(self) -> float:
+        return self.burnout_altitude + self.burnout_velocity**2 / (2 * GRAVITY)
+
+    @property
+    def landing_time(self) -> float:
+        return self.apogee_time + self.apogee_altitude / self.descent_rate
+
+    def phase(self, t: float) -> FlightPhase:
+        """Returns the phase of the flight t seconds after launch."""
+        if t < self.burn_time:
+            return FlightPhase.BOOST
+        if t < self.apogee_time - APOGEE_WINDOW:
+            return FlightPhase.COAST
+        if t <= self.apogee_time + APOGEE_WINDOW:
+            return FlightPhase.APOGEE
+        if t < self.landing_time:
+            return FlightPhase.DESCENT
+        return FlightPhase.LANDED
+
+    def altitude(self, t: float) -> float:
+        """Returns the altitude in metres above the launch site t seconds after launch."""
+        if t < self.burn_time:
+            return self.boost_acceleration * t**2 / 2
+        if t < self.apogee_time:
+            coast_time = t - self.burn_time
+            return self.burnout_altitude + self.burnout_velocity * coast_time - GRAVITY * coast_time**2 / 2
+        return max(self.apogee_altitude - self.descent_rate * (t - self.apogee_time), 0)
+
+    def temperature(self, altitude: float) -> float:
+        """Returns the air temperature in Celsius at the given altitude."""
+        return self.ground_temperature - LAPSE_RATE * altitude
+
+    def pressure(self, altitude: float) -> float:
+        """Returns the air pressure in pascals at the given altitude, using the standard atmosphere."""
+        return SEA_LEVEL_PRESSURE * (1 - 2.25577e-5 * altitude) ** 5.25588
+
+    def humidity(self, altitude: float) -> float:
+        """Returns the relative humidity in percent at the given altitude."""
+        return max(self.ground_humidity * (1 - altitude / 10000), 0)
+
+
+class FlightEmulator:
+    """Encodes the sensor readings of an emulated flight as version 1 radio packets, with seeded sensor noise."""
+
+    def __init__(
+        self,
+        callsign: str = DEFAULT_CALLSIGN,
+        packet_rate: float = DEFAULT_PACKET_RATE,
+        seed: int = 0,
+        profile: FlightProfile = FlightProfile(),
+    ):
+        if not 0 < packet_rate <= MAX_PACKET_RATE:
+            raise ValueError(f"Packet rate must be above 0 and at most {MAX_PACKET_RATE}, not {packet_rate}.")
+
+        self.callsign: str = callsign
+        self.packet_rate: float = packet_rate
+        self.profile: FlightProfile = profile
+        self.random: random.Random = random.Random(seed)
+        self.packet_num: int = 0
+
+    def readings(self, t: float) -> list[tuple[DataBlockSubtype, DataBlock]]:
+        """Returns the noisy sensor readings t seconds after launch as data blocks."""
+        mission_time = round(t * 1000)
+        altitude = self.profile.altitude(t)
+        noisy_altitude = altitude + self.random.gauss(0, 0.5)
+
+        return [
+            (DataBlockSubtype.ALTITUDE, AltitudeDB(mission_time, noisy_altitude)),
+            (
+                DataBlockSubtype.TEMPERATURE,
+                TemperatureDB(
+                    mission_time, round((self.profile.temperature(altitude) + self.random.gauss(0, 0.1)) * 1000)
+                ),
+            ),
+            (
+                DataBlockSubtype.PRESSURE,
+                PressureDB(mission_time, round(self.profile.pressure(altitude) + self.random.gauss(0, 5))),
+            ),
+            (
+                DataBlockSubtype.HUMIDITY,
+                HumidityDB(mission_time, round((self.profile.humidity(altitude) + self.random.gauss(0, 0.2)) * 100)),
+            ),
+        ]
+
+    def next_packet(self) -> str:
+        """Returns the next packet of the flight in hexadecimal digits."""
+        t = self.packet_num / self.packet_rate
+
+        blocks = b""
+        for subtype, block in self.readings(t):
+            contents = block.to_bytes()
+            header = BlockHeader(
+                BLOCK_HEADER_LENGTH + len(contents), BlockType.DATA, subtype, DeviceAddress.GROUND_STATION
+            )
+            blocks += header.to_bytes() + contents
+
+        packet_header = PacketHeader(
+            self.callsign, None, PACKET_HEADER_LENGTH + len(blocks), 1, DeviceAddress.ROCKET, self.packet_num
+        )
+        self.packet_num += 1
+        return (packet_header.to_bytes() + blocks).hex().upper()
 
 
 class SerialRN2483Emulator(Process):
-    def __init__(self, serial_status: Queue[str], radio_signal_report: Queue[str], rn2483_radio_payloads: Queue[str]):
+    def __init__(
+        self,
+        serial_status: Queue[str],
+        radio_signal_report: Queue[str],
+        rn2483_radio_payloads: Queue[TimestampedPayload],
+        callsign: str = DEFAULT_CALLSIGN,
+        packet_rate: float = DEFAULT_PACKET_RATE,
+        seed: int = 0,
+    ):
         super().__init__()
 
         self.serial_status: Queue[str] = serial_status
 
-        self.rn2483_radio_payloads: Queue[str] = rn2483_radio_payloads
+        self.rn2483_radio_payloads: Queue[TimestampedPayload] = rn2483_radio_payloads
         self.radio_signal_report: Queue[str] = radio_signal_report
 
         # Emulation Variables
-        self.altitude: float = 0
-        self.temp: float = 22
-        self.going_up: bool = True
-        self.startup_time: datetime = datetime.now()
+        self.flight: FlightEmulator = FlightEmulator(callsign, packet_rate, seed)
 
         self.run()
 
     def run(self):
-        self.serial_status.put("rn2483_connected True")
-        self.serial_status.put("rn2483_port test")
-        self.radio_signal_report.put("snr 30")
-        # self.radio_signal_report.put("rssi -55")
+        self.serial_status.put(f"rn2483_port {TEST_PORT}")
+        self.serial_status.put(f"rn2483_connected {TEST_PORT} True")
+        self.radio_signal_report.put(f"snr 30 {TEST_PORT}")
+        # self.radio_signal_report.put(f"rssi -55 {TEST_PORT}")
+
+        # Packets are generated in batches for the time elapsed, rather than sleeping between packets
+        start_time = time.monotonic()
         while True:
-            self.tester()
-            time.sleep(random.uniform(0, 2000) / 100000)
-
-    def tester(self):
-        """Generates test data to give to the telemetry process"""
-        random_alternation = int(random.uniform(0, 1000))
-        if self.going_up:
-            self.temp += random_alternation / 500
-        else:
-            self.temp -= random_alternation / 500
-
-        if self.temp > 100:
-            self.going_up = False
-        elif self.temp < 20:
-            self.going_up = True
-
-        self.altitude += random.uniform(0, 4)
-
-        packet_call_sign = b"Devils".hex()
-        six_byte_spacer = b"      ".hex()  # Should be packet header data!!!
-        packet_header = f"{packet_call_sign}{six_byte_spacer}"
-        block_header = "840C0000"  # Should be struct generated header data!!!
-
-        offset = datetime.now() - self.startup_time
-
-        # self.rn2483_radio_payloads.put(f"{packet_header}{block_header}{'E01F00008D540100BC57FF0010FEFFFF'}")
-        formatted_secs = int(offset.total_seconds() * 1000)
-        formatted_temp = int(87181 + self.temp * 50)
-        formatted_temp2 = int(self.temp * 1000)
-        formatted_alt = int(self.altitude * 1000)
-        byte_contents = struct.pack("<Iiii", formatted_secs, formatted_temp, formatted_temp2, formatted_alt)
-        self.rn2483_radio_payloads.put(f"{packet_header}{block_header}{byte_contents.hex().upper()}")
+            due = int((time.monotonic() - start_time) * self.flight.packet_rate)
+            batch = [
+                TimestampedPayload.received(self.flight.next_packet(), TEST_PORT)
+                for _ in range(due - self.flight.packet_num)
+            ]
+            for payload in batch:
+                self.rn2483_radio_payloads.put(payload)
+            time.sleep(BATCH_INTERVAL)
@@ -2,55 +2,127 @@
 
 import time
 import logging
+from pathlib import Path
 from queue import Queue
+from typing import Callable, Optional
 from serial import SerialException
-from modules.misc.config import RadioParameters
+from modules.misc.config import CaptureParameters, RadioParameters
+from modules.misc.latency import TimestampedPayload
+from modules.serial.capture import CaptureWriter
+from modules.serial.port_discovery import stable_path
 from modules.serial.rn2483_radio import RN2483Radio
 
+RECONNECT_INITIAL_DELAY: float = 0.1  # Seconds before the first attempt to reconnect to the radio
+RECONNECT_MAX_DELAY: float = 5.0  # Longest time between attempts to reconnect to the radio, in seconds
+
 logger = logging.getLogger(__name__)
 
 
+def connect_radio(
+    serial_status: Queue[str],
+    serial_port: str,
+    settings: RadioParameters,
+    initial_delay: float = RECONNECT_INITIAL_DELAY,
+    max_delay: float = RECONNECT_MAX_DELAY,
+    tap: Optional[Callable[[int, bytes], None]] = None,
+    receiver: str = "",
+) -> RN2483Radio:
+    """
+    Opens and sets up the RN2483 radio, retrying with exponential back off until it succeeds. Every line read from
+    the radio, including the replies to set up, is given to the tap if there is one. Failures are reported under the
+    receiver name, which defaults to the serial port.
+
+    Returns:
+        The radio, ready to receive.
+    """
+    delay = initial_delay
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            radio = RN2483Radio(serial_port)
+        except (SerialException, OSError) as e:
+            logger.warning(f"RN2483 Radio: Could not open {serial_port} (attempt {attempt}): {e}")
+        else:
+            radio.framer.tap = tap
+            try:
+                radio.setup(settings)
+                logger.debug("Radio initialization worked.")
+                return radio
+            except (SerialException, OSError) as e:
+                radio.close()
+                logger.warning(f"RN2483 Radio: Could not set up radio on {serial_port} (attempt {attempt}): {e}")
+
+        serial_status.put(f"rn2483_connected {receiver or serial_port} False")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
 def rn2483_radio_process(
     serial_status: Queue[str],
-    radio_signal_report: Queue[int],
+    radio_signal_report: Queue[str],
     rn2483_radio_input: Queue[str],
-    rn2483_radio_payloads: Queue[str],
+    rn2483_radio_payloads: Queue[TimestampedPayload],
     serial_port: str,
     settings: RadioParameters,
+    capture: CaptureParameters = CaptureParameters(),
 ):
-    """Runs the primary logic for connecting to and reading from the RN2483 radio."""
-    radio = RN2483Radio(serial_port)
+    """
+    Runs the primary logic for connecting to and reading from the RN2483 radio. If the connection to the radio is
+    lost, the same device is reopened in this process without telling telemetry the port changed, so no telemetry
+    state is lost. If capturing is enabled, every raw line read from the radio is written to the capture files.
+
+    Several radios may run at once, each in its own process so a slow port cannot stall the others. Payloads, signal
+    reports and status messages are all tagged with the port, for telemetry to tell the radios apart.
+    """
+
+    tap = CaptureWriter(capture, name=f"rn2483-{Path(serial_port).name}").write if capture.enabled else None
+
+    # Reconnect through the stable path of the device, since it may come back under a different device node
+    device = stable_path(serial_port)
+    radio = connect_radio(serial_status, device, settings, tap=tap, receiver=serial_port)
 
     logger.info(f"RN2483 Radio: Connected to {serial_port}")
-    serial_status.put("rn2483_connected True")
     serial_status.put(f"rn2483_port {serial_port}")
+    serial_status.put(f"rn2483_connected {serial_port} True")
 
-    # Set up radio
-    while True:
-        try:
-            radio.setup(settings)
-            logger.debug("Radio initialization worked.")
-            break
-        except SerialException:
-            serial_status.put("rn2483_connected False")
-            serial_status.put("rn2483_port null")
-            logger.info("RN2483 Radio: Error communicating with serial device.")
-            time.sleep(3)
+    reconnects = 0
+    downtime = 0.0
 
     # Get transmissions
     while True:
-        while not rn2483_radio_input.empty():
-            command_string = rn2483_radio_input.get()
-            if command_string == "radio get snr":
-                radio_signal_report.put(radio.signal_report())
-            else:
-                logger.error(f"Radio command '{command_string}' is not implemented.")
-
-        # TODO: LIMIT TO ONLY AFTER THE ENTIRE BATCH IS DONE.
-        # TODO: AFTER SENDING A COMMAND TO RADIO RECALL SET_RX_MODE()
-
-        # Put serial message in data queue for telemetry
-        message = radio.receive()
-        if message is not None:
-            logger.info(f"Received: {message}")
-            rn2483_radio_payloads.put(message)
+        try:
+            while not rn2483_radio_input.empty():
+                command_string = rn2483_radio_input.get()
+                if command_string == "radio get snr":
+                    radio_signal_report.put(f"snr {radio.signal_report()} {serial_port}")
+                else:
+                    logger.error(f"Radio command '{command_string}' is not implemented.")
+
+            # Put serial message in data queue for telemetry
+            message = radio.receive()
+            if message is not None:
+                payload = TimestampedPayload.received(message, serial_port)
+                logger.info(f"Received: {message}")
+                rn2483_radio_payloads.put(payload)
+
+            # Report the link quality sampled after received packets, as 'snr <value> <port>' or 'rssi <value> <port>'
+            while radio.signal_samples:
+                setting, value = radio.signal_samples.popleft()
+                radio_signal_report.put(f"{setting} {value} {serial_port}")
+
+        except (SerialException, OSError) as e:
+            logger.error(f"RN2483 Radio: Lost connection to {serial_port}: {e}")
+            serial_status.put(f"rn2483_connected {serial_port} False")
+            lost_time = time.monotonic()
+            radio.close()
+
+            # Reception is armed again by the first receive of the new connection
+            radio = connect_radio(serial_status, device, settings, tap=tap, receiver=serial_port)
+            reconnects += 1
+            downtime += time.monotonic() - lost_time
+
+            logger.info(f"RN2483 Radio: Reconnected to {serial_port} after {time.monotonic() - lost_time:.2f}s")
+            serial_status.put(f"rn2483_connected {serial_port} True")
+            serial_status.put(f"rn2483_reconnects {serial_port} {reconnects}")
+            serial_status.put(f"rn2483_downtime {serial_port} {downtime:.3f}")
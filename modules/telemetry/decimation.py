@@ -0,0 +1,185 @@
+"""
+Decimation of the telemetry series, so that a whole flight can be plotted with a fixed number of points.
+
+Two methods are offered:
+- Min/max bucketing splits the samples into buckets and keeps the lowest and highest sample of every field in each, so
+  peaks such as apogee are never lost.
+- Largest-Triangle-Three-Buckets (LTTB) keeps the one sample of each bucket forming the largest triangle with the
+  samples kept either side of it, which follows the shape of the line closely. It picks by the first field of the
+  series.
+
+SeriesDecimator summarises a series as it grows, in a bounded number of buckets holding the lowest and highest samples
+of each. Adding a sample takes constant amortized time. Views are made from the summaries rather than every sample, so
+their cost does not grow with the length of the flight.
+"""
+
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, Sequence, TypeAlias
+
+# Constants
+DECIMATION_BUCKETS: int = 1024  # Most buckets a series is summarised in, and so the most points of a view
+
+# Types
+Row: TypeAlias = Sequence[Any]  # Mission time, then the value of every field
+
+
+class DecimationMethod(StrEnum):
+    """How a series is reduced to fewer points."""
+
+    MIN_MAX = "minmax"
+    LTTB = "lttb"
+
+
+def min_max(rows: Sequence[Row], points: int) -> list[Row]:
+    """Returns at most the given number of rows: the lowest and highest of every field in each bucket of rows."""
+    if len(rows) <= points:
+        return list(rows)
+
+    fields = len(rows[0]) - 1
+    buckets = max(1, points // (2 * max(1, fields)))
+    size = len(rows) / buckets
+    selected: list[Row] = []
+    for bucket in range(buckets):
+        start, stop = int(bucket * size), int((bucket + 1) * size)
+        keep: set[int] = set()
+        for field in range(1, fields + 1):
+            keep.add(min(range(start, stop), key=lambda i: rows[i][field]))
+            keep.add(max(range(start, stop), key=lambda i: rows[i][field]))
+        selected.extend(rows[i] for i in sorted(keep))
+    return selected
+
+
+def lttb(rows: Sequence[Row], points: int) -> list[Row]:
+    """Returns the given number of rows picked with Largest-Triangle-Three-Buckets, keeping the first and last."""
+    if len(rows) <= points:
+        return list(rows)
+    if points < 3:
+        return [rows[0], rows[-1]][:points]
+
+    every = (len(rows) - 2) / (points - 2)
+    selected: list[Row] = [rows[0]]
+    previous = rows[0]
+    for bucket in range(points - 2):
+        # The point the triangle is closed with is the average of the next bucket
+        next_start, next_stop = int((bucket + 1) * every) + 1, min(int((bucket + 2) * every) + 1, len(rows))
+        next_rows = rows[next_start:next_stop]
+        average_time = sum(row[0] for row in next_rows) / len(next_rows)
+        average_value = sum(row[1] for row in next_rows) / len(next_rows)
+
+        best, best_area = None, -1.0
+        for row in rows[int(bucket * every) + 1 : int((bucket + 1) * every) + 1]:
+            base = (previous[0] - average_time) * (row[1] - previous[1])
+            area = abs(base - (previous[0] - row[0]) * (average_value - previous[1]))
+            if area > best_area:
+                best, best_area = row, area
+        assert best is not None
+        selected.append(best)
+        previous = best
+
+    selected.append(rows[-1])
+    return selected
+
+
+def decimate(rows: Sequence[Row], points: int, method: DecimationMethod = DecimationMethod.MIN_MAX) -> list[Row]:
+    """Returns at most the given number of rows, picked with the given method."""
+    if method == DecimationMethod.LTTB:
+        return lttb(rows, points)
+    return min_max(rows, points)
+
+
+@dataclass
+class Bucket:
+    """The last, lowest and highest rows of a run of consecutive rows."""
+
+    last: Row
+    lowest: list[Row]  # For each field
+    highest: list[Row]
+
+    @classmethod
+    def of(cls, row: Row) -> "Bucket":
+        return cls(row, [row] * (len(row) - 1), [row] * (len(row) - 1))
+
+    def add(self, row: Row) -> None:
+        self.last = row
+        for field, (lowest, highest) in enumerate(zip(self.lowest, self.highest), start=1):
+            if row[field] < lowest[field]:
+                self.lowest[field - 1] = row
+            if row[field] > highest[field]:
+                self.highest[field - 1] = row
+
+    def merge(self, following: "Bucket") -> None:
+        """Takes in the rows of the bucket which follows this one."""
+        self.last = following.last
+        for field in range(len(self.lowest)):
+            if following.lowest[field][field + 1] < self.lowest[field][field + 1]:
+                self.lowest[field] = following.lowest[field]
+            if following.highest[field][field + 1] > self.highest[field][field + 1]:
+                self.highest[field] = following.highest[field]
+
+    def rows(self) -> list[Row]:
+        """Returns the lowest and highest rows of every field, in time order."""
+        rows = {row[0]: row for row in (*self.lowest, *self.highest)}
+        return [rows[time] for time in sorted(rows)]
+
+
+class SeriesDecimator:
+    """
+    Summarises a growing series in at most a fixed number of buckets, from which views of it are made. A view is kept
+    once made: the rows of the buckets closing after it are added to it as they are, until it is full and made again
+    at half its size. So views are only rebuilt every few hundred buckets, rather than on every update.
+    """
+
+    def __init__(self, buckets: int = DECIMATION_BUCKETS) -> None:
+        self.max_buckets: int = buckets
+        self.bucket_size: int = 1  # Rows in each closed bucket
+        self.buckets: list[Bucket] = []
+        self.closed_rows: list[Row] = []  # The rows summarising the closed buckets
+        self.open: Bucket | None = None  # The bucket rows are being added to
+        self.open_size: int = 0
+        self.fields: int = 0
+        self.last: Row | None = None  # The latest row, which every view ends with
+        self.views: dict[tuple[int, DecimationMethod], list[Row]] = {}  # Views of the closed buckets
+
+    def add(self, row: Row) -> None:
+        """Adds the row, which must be later than every row added before it."""
+        self.last = row
+        if self.open is None:
+            self.open, self.open_size = Bucket.of(row), 1
+            self.fields = len(row) - 1
+        else:
+            self.open.add(row)
+            self.open_size += 1
+        if self.open_size < self.bucket_size:
+            return
+
+        self.buckets.append(self.open)
+        rows = self.open.rows()
+        self.closed_rows.extend(rows)
+        for view in self.views.values():
+            view.extend(rows)
+        self.open = None
+
+        # Halve the buckets once they are all used, which happens less often the longer the series gets
+        if len(self.buckets) == self.max_buckets:
+            for i in range(1, len(self.buckets), 2):
+                self.buckets[i - 1].merge(self.buckets[i])
+            self.buckets = self.buckets[::2]
+            self.bucket_size *= 2
+            self.closed_rows = [row for bucket in self.buckets for row in bucket.rows()]
+            self.views.clear()
+
+    def view(self, points: int, method: DecimationMethod = DecimationMethod.MIN_MAX) -> list[Row]:
+        """Returns at most the given number of rows showing the shape of the whole series."""
+        # Room is kept for the bucket being filled and the latest row: the latest row alone for LTTB, or the lowest and
+        # highest rows of the bucket as well
+        closed_points = max(0, points - (1 if method == DecimationMethod.LTTB else 2 * self.fields + 1))
+        view = self.views.get((points, method))
+        if view is None or len(view) > closed_points:
+            target = closed_points if len(self.closed_rows) <= closed_points else closed_points // 2
+            view = self.views[(points, method)] = decimate(self.closed_rows, target, method)
+
+        rows = view + (self.open.rows() if self.open is not None and method == DecimationMethod.MIN_MAX else [])
+        if self.last is not None and (not rows or rows[-1] is not self.last):
+            rows.append(self.last)
+        return rows
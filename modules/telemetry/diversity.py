@@ -0,0 +1,78 @@
+"""
+Merging of the packets received by several RN2483 radios at once.
+
+Every radio process puts its payloads on the same queue, tagged with its port. The same packet heard by several
+radios is only processed once: packets are identified by their call sign and packet number, which are read straight
+from the hexadecimal packet header without parsing the rest of the packet.
+
+A packet is only a copy if a different radio delivered it shortly before, since the copies heard by several radios
+arrive within moments of each other. A radio never delivers the same packet twice, and packet numbers start over when
+the rocket's flight computer restarts, so a packet number repeated by the same radio, or long after, is a new packet.
+"""
+
+import struct
+import time
+from typing import Optional, TypeAlias
+
+from modules.telemetry.v1.block import CALLSIGN_LENGTH, PACKET_HEADER_LENGTH
+
+# Constants
+DEDUPLICATION_WINDOW: float = 2.0  # Seconds packets are remembered to recognize copies from slower radios
+MAX_REMEMBERED_PACKETS: int = 1024  # Most packets remembered at once
+PACKET_NUMBER: struct.Struct = struct.Struct("<I")  # Packet number at the end of the packet header
+
+# Types
+PacketKey: TypeAlias = tuple[bytes, int]  # Call sign and zone, and packet number
+
+
+def packet_key(data: str) -> Optional[PacketKey]:
+    """
+    Returns the call sign (with its zone) and packet number identifying a payload in hexadecimal digits, or None if
+    the payload is too short or not hexadecimal. Such payloads are left for the parser to reject.
+    """
+    try:
+        header = bytes.fromhex(data[: PACKET_HEADER_LENGTH * 2])
+    except ValueError:
+        return None
+    if len(header) < PACKET_HEADER_LENGTH:
+        return None
+    return header[:CALLSIGN_LENGTH], PACKET_NUMBER.unpack_from(header, PACKET_HEADER_LENGTH - PACKET_NUMBER.size)[0]
+
+
+class PacketDeduplicator:
+    """Recognizes packets which were just received by another radio."""
+
+    def __init__(self, window: float = DEDUPLICATION_WINDOW, max_packets: int = MAX_REMEMBERED_PACKETS) -> None:
+        self.window: float = window
+        self.max_packets: int = max_packets
+        # The radio which first delivered each packet and when, kept in the order packets arrived, oldest first
+        self.seen: dict[PacketKey, tuple[str, float]] = {}
+        # The last packet number delivered by each radio for each call sign, and when
+        self.last: dict[tuple[bytes, str], tuple[int, float]] = {}
+
+    def is_duplicate(self, key: PacketKey, receiver: str, now: Optional[float] = None) -> bool:
+        """Returns True if another radio delivered the packet within the window, otherwise remembers it."""
+        now = time.monotonic() if now is None else now
+        while self.seen and (
+            len(self.seen) >= self.max_packets or next(iter(self.seen.values()))[1] < now - self.window
+        ):
+            del self.seen[next(iter(self.seen))]
+
+        # The packet numbers of this radio going back means the flight computer restarted, so the packets remembered
+        # up to the last one this radio delivered were from before and are forgotten
+        callsign, packet_num = key
+        last = self.last.get((callsign, receiver))
+        self.last[(callsign, receiver)] = (packet_num, now)
+        if last is not None and packet_num < last[0]:
+            self.seen = {
+                seen: (first, arrival)
+                for seen, (first, arrival) in self.seen.items()
+                if seen[0] != callsign or arrival > last[1]
+            }
+
+        first = self.seen.get(key)
+        if first is not None:
+            return first[0] != receiver
+
+        self.seen[key] = (receiver, now)
+        return False
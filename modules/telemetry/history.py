@@ -0,0 +1,258 @@
+"""
+History of the telemetry series over the whole session, for clients to fetch ranges of on request.
+
+The telemetry output only holds the last few samples of each series. The history store is fed with every output
+update and keeps each sample newer than the last one it has, so it holds the series since the start of the live
+mission or replay at full resolution, up to a maximum number of samples per series. A sample is only missed if more
+samples than the telemetry buffer size are produced between two updates which reach the store. Each series is also
+summarised as it grows (see the decimation module), for views of the whole series at a fixed number of points, and
+rolled up at coarser resolutions (see the rollup module), for overviews of long sessions.
+
+Overviews of a range are read from the tier whose resolution suits the span and number of points asked for, so their
+cost depends on the number of points rather than on the span: an overview of hours costs the same as one of seconds.
+"""
+
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeAlias
+
+from modules.telemetry.decimation import DecimationMethod, SeriesDecimator, decimate
+from modules.telemetry.rollup import RollupTier, SeriesRollup, rollup_fields
+
+# Constants
+MAX_HISTORY_SAMPLES: int = 100_000  # Most samples kept for each series, after which the oldest are dropped
+TIME_KEY: str = "mission_time"
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+Row: TypeAlias = list[Any]  # Mission time, then the value of every field
+
+
+def to_columns(fields: list[str], rows: list[Row]) -> JSON:
+    """Returns rows in the form of the telemetry output, as a column for each of the fields."""
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in fields]
+    return dict(zip(fields, columns))
+
+
+@dataclass
+class Overview:
+    """The rows of a range of a series read for a number of points, and how they were made."""
+
+    fields: list[str]
+    rows: list[Row]
+    resolution: Optional[int] = None  # Mission time rolled up in each row, or None if the rows are samples
+    decimation: Optional[DecimationMethod] = None  # How the samples were picked, or None if they all were
+
+
+@dataclass
+class SeriesHistory:
+    """The samples of one telemetry series, as a column for the mission time and one for each field."""
+
+    fields: list[str]
+    mission_time: list[int] = field(default_factory=list)
+    values: list[list[Any]] = field(default_factory=list)
+    decimator: SeriesDecimator = field(default_factory=SeriesDecimator)
+    rollup: SeriesRollup = field(init=False)
+    trimmed: bool = False  # Whether samples have been dropped
+
+    def __post_init__(self) -> None:
+        if not self.values:
+            self.values = [[] for _ in self.fields]
+        self.rollup = SeriesRollup(len(self.fields))
+
+    def record(self, block: JSON, max_samples: int) -> None:
+        """Appends the samples of an output block which are newer than the last sample kept."""
+        times: list[int] = block.get(TIME_KEY, [])
+        last = self.mission_time[-1] if self.mission_time else None
+        start = 0 if last is None else bisect_right(times, last)
+        if start == len(times):
+            return
+
+        self.mission_time.extend(times[start:])
+        for column, name in zip(self.values, self.fields):
+            column.extend(block[name][start:])
+        for row in zip(times[start:], *(block[name][start:] for name in self.fields)):
+            self.decimator.add(row)
+            self.rollup.add(row)
+
+        # Trim in bulk rather than on every sample, so appending stays cheap
+        excess = len(self.mission_time) - max_samples
+        if excess > max_samples // 16:
+            self.trimmed = True
+            del self.mission_time[:excess]
+            for column in self.values:
+                del column[:excess]
+
+    def range(self, start: Optional[int], stop: Optional[int]) -> tuple[int, int]:
+        """Returns the indices of the samples between the start and stop mission times, inclusive."""
+        first = 0 if start is None else bisect_left(self.mission_time, start)
+        last = len(self.mission_time) if stop is None else bisect_right(self.mission_time, stop)
+        return first, max(first, last)
+
+    def covers(self, start: Optional[int]) -> bool:
+        """Returns whether the samples from the given mission time on are all still kept."""
+        return not self.trimmed or (start is not None and bool(self.mission_time) and self.mission_time[0] <= start)
+
+    def rows(self, first: int, last: int) -> list[Row]:
+        """Returns the samples between the indices as rows."""
+        columns = [self.mission_time[first:last]] + [column[first:last] for column in self.values]
+        return [list(row) for row in zip(*columns)]
+
+
+class HistoryStore:
+    """
+    Keeps the history of every telemetry series. It is fed from one thread and read from another, so every access
+    takes its lock and reads return copies.
+    """
+
+    def __init__(self, max_samples: int = MAX_HISTORY_SAMPLES) -> None:
+        self.max_samples: int = max_samples
+        self.series: dict[str, SeriesHistory] = {}
+        self.last_mission_time: int = -1
+        self.lock: threading.Lock = threading.Lock()
+
+    def record(self, telemetry: JSON) -> None:
+        """
+        Records the samples of the telemetry output which are not in the history yet. The history starts over when
+        the mission time goes back, which happens when a new mission or replay starts.
+        """
+        with self.lock:
+            last_mission_time = telemetry.get("last_mission_time", -1)
+            if last_mission_time < self.last_mission_time:
+                self.series.clear()
+            self.last_mission_time = last_mission_time
+
+            for name, block in telemetry.items():
+                if not isinstance(block, dict) or TIME_KEY not in block:
+                    continue
+                history = self.series.get(name)
+                if history is None:
+                    history = self.series[name] = SeriesHistory([key for key in block if key != TIME_KEY])
+                history.record(block, self.max_samples)  # type: ignore
+
+    def fields(self, name: str) -> list[str]:
+        """
+        Returns the names of the columns of a series, starting with the mission time.
+
+        Raises:
+            KeyError: If no samples of the series have been recorded.
+        """
+        with self.lock:
+            return [TIME_KEY] + self.series[name].fields
+
+    def count(self, name: str, start: Optional[int] = None, stop: Optional[int] = None) -> int:
+        """Returns the number of samples of a series between the start and stop mission times, inclusive."""
+        with self.lock:
+            history = self.series.get(name)
+            if history is None:
+                return 0
+            first, last = history.range(start, stop)
+            return last - first
+
+    def rows(
+        self,
+        name: str,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[Row], Optional[int]]:
+        """
+        Returns the samples of a series between the start and stop mission times (inclusive), at most limit of them.
+        Large ranges are read in pieces by passing the returned mission time as the next start.
+
+        Returns:
+            The samples as rows of the mission time and the value of every field, and the mission time to continue
+            from, or None if the range has been read.
+        """
+        with self.lock:
+            history = self.series.get(name)
+            if history is None:
+                return [], None
+
+            first, last = history.range(start, stop)
+            end = last if limit is None else min(last, first + limit)
+            return history.rows(first, end), history.mission_time[end] if end < last else None
+
+    def view(self, name: str, points: int, method: DecimationMethod = DecimationMethod.MIN_MAX) -> Optional[JSON]:
+        """
+        Returns a view of the whole series in at most the given number of points, in the form of the telemetry
+        output, or None if no samples of the series have been recorded.
+        """
+        with self.lock:
+            history = self.series.get(name)
+            if history is None:
+                return None
+            return to_columns([TIME_KEY, *history.fields], history.decimator.view(points, method))
+
+    def overview(
+        self,
+        name: str,
+        start: Optional[int],
+        stop: Optional[int],
+        points: int,
+        method: DecimationMethod = DecimationMethod.MIN_MAX,
+    ) -> Optional[Overview]:
+        """
+        Returns about the given number of rows, at most, covering the series between the start and stop mission times
+        (inclusive), or None if no samples of the series have been recorded.
+
+        The coarsest tier (the samples, then each rollup) with no more rows in the range than the points is picked. If
+        it has less than half as many, the next finer tier is reduced to the points instead: its samples are
+        decimated, or its buckets merged. So only a small multiple of the points is ever read. Tiers which have
+        dropped part of the range are passed over.
+        """
+        with self.lock:
+            history = self.series.get(name)
+            if history is None:
+                return None
+
+            tiers: list[Optional[RollupTier]] = [None, *history.rollup.tiers]  # None for the samples
+            ranges = [history.range(start, stop) if tier is None else tier.range(start, stop) for tier in tiers]
+            covering = [
+                (tier, first, last)
+                for tier, (first, last) in zip(tiers, ranges)
+                if (history.covers(start) if tier is None else tier.covers(start))
+            ] or [(tiers[-1], *ranges[-1])]
+
+            chosen = next(
+                (i for i, (_, first, last) in enumerate(covering) if last - first <= points), len(covering) - 1
+            )
+            tier, first, last = covering[chosen]
+            fits = last - first <= points
+            if fits and (chosen == 0 or last - first >= points // 2):
+                if tier is None:
+                    return Overview([TIME_KEY, *history.fields], history.rows(first, last))
+                return Overview([TIME_KEY, *rollup_fields(history.fields)], tier.rows(first, last), tier.resolution)
+
+            # Reduce the next finer tier to the points, or the coarsest one if even it has too many rows
+            if fits:
+                tier, first, last = covering[chosen - 1]
+            if tier is None:
+                rows = decimate(history.rows(first, last), points, method)
+                return Overview([TIME_KEY, *history.fields], rows, decimation=method)  # type: ignore
+            group = math.ceil((last - first) / points)
+            fields = [TIME_KEY, *rollup_fields(history.fields)]
+            return Overview(fields, tier.rows(first, last, group), tier.resolution * group)
+
+    def recent(
+        self, name: str, span: int, points: int, method: DecimationMethod = DecimationMethod.MIN_MAX
+    ) -> Optional[JSON]:
+        """
+        Returns an overview of the last span of mission time of a series in the form of the telemetry output, or None
+        if no samples of the series have been recorded.
+        """
+        with self.lock:
+            history = self.series.get(name)
+            if history is None or not history.mission_time:
+                return None
+            latest = history.mission_time[-1]
+
+        overview = self.overview(name, latest - span, None, points, method)
+        return None if overview is None else to_columns(overview.fields, overview.rows)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.series.clear()
+            self.last_mission_time = -1
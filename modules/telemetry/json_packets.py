@@ -6,6 +6,7 @@ import json
 # Imports
 import logging
 import os
+from collections import deque
 from dataclasses import dataclass, field
 from enum import IntEnum
 from pathlib import Path
@@ -15,6 +16,7 @@ from modules.telemetry.telemetry_utils import ParsedBlock
 # Constants
 MISSION_EXTENSION: str = "mission"
 MISSIONS_DIR: str = "missions"
+SIGNAL_HISTORY_LENGTH: int = 64  # Link quality samples kept for the rolling statistics
 
 # Aliases
 OutputFormat: TypeAlias = dict[str, dict[str, dict[str, dict[str, str]]]]
@@ -73,18 +75,133 @@ class SerialData:
         yield "available_ports", self.available_ports
 
 
+def signal_stats(history: deque[int]) -> dict[str, float]:
+    """Returns the minimum, mean and maximum of a link quality history, which are all zero if it is empty."""
+    if not history:
+        return {"min": 0, "mean": 0.0, "max": 0}
+    return {"min": min(history), "mean": round(sum(history) / len(history), 2), "max": max(history)}
+
+
+@dataclass
+class ReceiverData:
+    """Reception statistics of one of the RN2483 radios receiving the rocket, which are kept by port."""
+
+    connected: bool = False
+    snr: int = 0  # Signal to noise ratio of the last sampled packet in dB
+    rssi: int = 0  # Received signal strength of the last sampled packet in dBm
+    reconnects: int = 0  # Times the connection to the radio was recovered after being lost
+    downtime: float = 0.0  # Total seconds spent reconnecting to the radio
+    packets: int = 0  # Packets received, including those another radio delivered first
+    duplicates: int = 0  # Packets received after another radio had already delivered them
+    missed: int = 0  # Packets only received by other radios, which filled the gaps of this one
+    first_packet: int = 0  # Number of merged packets before this radio started receiving
+    snr_history: deque[int] = field(default_factory=lambda: deque(maxlen=SIGNAL_HISTORY_LENGTH))
+    rssi_history: deque[int] = field(default_factory=lambda: deque(maxlen=SIGNAL_HISTORY_LENGTH))
+
+    def record_signal(self, setting: str, value: int) -> None:
+        """Records a link quality sample ('snr' or 'rssi') reported by the radio."""
+        match setting:
+            case "snr":
+                self.snr = value
+                self.snr_history.append(value)
+            case "rssi":
+                self.rssi = value
+                self.rssi_history.append(value)
+            case _:
+                raise ValueError(f"Unknown link quality setting '{setting}'")
+
+    def __iter__(self):
+        yield "connected", self.connected
+        yield "snr", self.snr
+        yield "rssi", self.rssi
+        yield "snr_stats", signal_stats(self.snr_history)
+        yield "rssi_stats", signal_stats(self.rssi_history)
+        yield "reconnects", self.reconnects
+        yield "downtime", self.downtime
+        yield "packets", self.packets
+        yield "duplicates", self.duplicates
+        yield "missed", self.missed
+
+
 @dataclass
 class RN2483RadioData:
-    """The RN2483 radio data packet for the telemetry process."""
+    """
+    The RN2483 radio data packet for the telemetry process. Several radios may receive at once; their statistics
+    are kept by port in receivers, and merged into the remaining fields.
+    """
 
     connected: bool = False
     connected_port: str = ""
-    snr: int = 0  # TODO SET SNR
+    snr: int = 0  # Signal to noise ratio of the last sampled packet in dB
+    rssi: int = 0  # Received signal strength of the last sampled packet in dBm
+    reconnects: int = 0  # Times the connection to the radio was recovered after being lost
+    downtime: float = 0.0  # Total seconds spent reconnecting to the radio
+    packets: int = 0  # Packets received by any radio, each counted once
+    duplicates: int = 0  # Copies of packets dropped because another radio delivered them first
+    snr_history: deque[int] = field(default_factory=lambda: deque(maxlen=SIGNAL_HISTORY_LENGTH))
+    rssi_history: deque[int] = field(default_factory=lambda: deque(maxlen=SIGNAL_HISTORY_LENGTH))
+    receivers: dict[str, ReceiverData] = field(default_factory=dict)
+
+    def receiver(self, port: str) -> ReceiverData:
+        """Returns the statistics of the radio on the given port, adding the radio if it is new."""
+        receiver = self.receivers.get(port)
+        if receiver is None:
+            receiver = self.receivers[port] = ReceiverData(first_packet=self.packets)
+        return receiver
+
+    def remove_receiver(self, port: str) -> None:
+        """Removes the radio on the given port."""
+        _ = self.receivers.pop(port, None)
+        if self.connected_port == port:
+            self.connected_port = next(iter(self.receivers), "")
+        self.merge_receivers()
+
+    def merge_receivers(self) -> None:
+        """Updates the connection state, reconnects and downtime from those of every radio."""
+        self.connected = any(receiver.connected for receiver in self.receivers.values())
+        self.reconnects = sum(receiver.reconnects for receiver in self.receivers.values())
+        self.downtime = sum(receiver.downtime for receiver in self.receivers.values())
+
+    def record_signal(self, setting: str, value: int, port: str = "") -> None:
+        """Records a link quality sample ('snr' or 'rssi') reported by the radio on the given port, if any."""
+        match setting:
+            case "snr":
+                self.snr = value
+                self.snr_history.append(value)
+            case "rssi":
+                self.rssi = value
+                self.rssi_history.append(value)
+            case _:
+                raise ValueError(f"Unknown link quality setting '{setting}'")
+        if port:
+            self.receiver(port).record_signal(setting, value)
+
+    def record_packet(self, port: str, duplicate: bool) -> None:
+        """Records a packet received by the radio on the given port, which is a duplicate if another was first."""
+        receiver = self.receiver(port)
+        receiver.packets += 1
+        if duplicate:
+            receiver.duplicates += 1
+            self.duplicates += 1
+        else:
+            self.packets += 1
+
+        # Packets since a radio started which it has not delivered (yet) were only received by the other radios
+        for other in self.receivers.values():
+            other.missed = max(0, self.packets - other.first_packet - other.packets)
 
     def __iter__(self):
         yield "connected", self.connected,
         yield "connected_port", self.connected_port
         yield "snr", self.snr
+        yield "rssi", self.rssi
+        yield "snr_stats", signal_stats(self.snr_history)
+        yield "rssi_stats", signal_stats(self.rssi_history)
+        yield "reconnects", self.reconnects
+        yield "downtime", self.downtime
+        yield "packets", self.packets
+        yield "duplicates", self.duplicates
+        yield "receivers", {port: dict(receiver) for port, receiver in self.receivers.items()}
 
 
 @dataclass
@@ -4,6 +4,7 @@ import logging
 from pathlib import Path
 from queue import Queue
 from time import time, sleep
+from modules.misc.latency import TimestampedPayload
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -18,7 +19,7 @@ class TelemetryReplay:
 
     def __init__(
         self,
-        replay_payloads: Queue[str],
+        replay_payloads: Queue[TimestampedPayload],
         replay_input: Queue[str],
         replay_speed: float,
         replay_path: Path,
@@ -26,7 +27,7 @@ class TelemetryReplay:
         super().__init__()
 
         # Replay buffers (Input and output)
-        self.replay_payloads: Queue[str] = replay_payloads
+        self.replay_payloads: Queue[TimestampedPayload] = replay_payloads
         self.replay_input: Queue[str] = replay_input
 
         # Misc replay
@@ -45,7 +46,7 @@ class TelemetryReplay:
         with open(self.replay_path, "r") as file:
             for line in file:
                 if self.speed > 0:
-                    self.replay_payloads.put(line)
+                    self.replay_payloads.put(TimestampedPayload.received(line))
 
                 if not self.replay_input.empty():
                     self.parse_input_command(self.replay_input.get())
@@ -0,0 +1,107 @@
+"""
+Rollups of the telemetry series at coarser resolutions, so that long sessions such as static fires and countdowns can
+be looked at over hours without reading every sample.
+
+Each series is rolled up into tiers of fixed resolution (1 s, 10 s and 1 min by default). Each tier holds one bucket
+for every period of the resolution in which samples arrived, with the number of samples and the lowest, highest and
+mean value of every field. The last bucket of a tier is the one samples are being added to, so adding a sample only
+updates the last bucket of each tier or starts a new one. Each tier keeps a fixed number of buckets, after which the
+oldest are dropped, so the coarser tiers reach back further than the finer ones.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Optional, Sequence, TypeAlias
+
+# Constants
+ROLLUP_RESOLUTIONS: tuple[int, ...] = (1000, 10_000, 60_000)  # Mission time covered by each bucket of a tier, in ms
+MAX_ROLLUP_BUCKETS: int = 14_400  # Most buckets kept in each tier: 4 hours at 1 s, 40 at 10 s and 10 days at 1 min
+COUNT_KEY: str = "count"
+
+# Types
+Row: TypeAlias = list[Any]  # Mission time, then the value of every field
+
+
+def rollup_fields(fields: Sequence[str]) -> list[str]:
+    """Returns the names of the columns of the rolled up rows of a series with the given fields."""
+    columns = [COUNT_KEY]
+    for name in fields:
+        columns.extend((f"{name}_min", f"{name}_max", f"{name}_mean"))
+    return columns
+
+
+class RollupTier:
+    """The buckets of one series at one resolution, as a column for each part of the buckets."""
+
+    def __init__(self, resolution: int, fields: int, max_buckets: int = MAX_ROLLUP_BUCKETS) -> None:
+        self.resolution: int = resolution
+        self.max_buckets: int = max_buckets
+        self.start: list[int] = []  # Mission time each bucket starts at
+        self.count: list[int] = []
+        self.minimum: list[list[Any]] = [[] for _ in range(fields)]
+        self.maximum: list[list[Any]] = [[] for _ in range(fields)]
+        self.total: list[list[Any]] = [[] for _ in range(fields)]
+        self.trimmed: bool = False  # Whether buckets have been dropped
+
+    def add(self, row: Row) -> None:
+        """Adds the sample to the bucket of its mission time, which must be the last bucket or a new one."""
+        start = row[0] - row[0] % self.resolution
+        if self.start and self.start[-1] >= start:
+            self.count[-1] += 1
+            for field, value in enumerate(row[1:]):
+                if value < self.minimum[field][-1]:
+                    self.minimum[field][-1] = value
+                if value > self.maximum[field][-1]:
+                    self.maximum[field][-1] = value
+                self.total[field][-1] += value
+            return
+
+        self.start.append(start)
+        self.count.append(1)
+        for field, value in enumerate(row[1:]):
+            self.minimum[field].append(value)
+            self.maximum[field].append(value)
+            self.total[field].append(value)
+
+        # Trim in bulk rather than on every bucket, like the history itself
+        excess = len(self.start) - self.max_buckets
+        if excess > self.max_buckets // 16:
+            self.trimmed = True
+            for column in (self.start, self.count, *self.minimum, *self.maximum, *self.total):
+                del column[:excess]
+
+    def covers(self, start: Optional[int]) -> bool:
+        """Returns whether the tier still holds the samples from the given mission time on."""
+        return not self.trimmed or (start is not None and bool(self.start) and self.start[0] <= start)
+
+    def range(self, start: Optional[int], stop: Optional[int]) -> tuple[int, int]:
+        """Returns the indices of the buckets holding samples between the start and stop mission times, inclusive."""
+        first = 0 if start is None else bisect_left(self.start, start - start % self.resolution)
+        last = len(self.start) if stop is None else bisect_right(self.start, stop)
+        return first, max(first, last)
+
+    def rows(self, first: int, last: int, group: int = 1) -> list[Row]:
+        """
+        Returns the buckets between the indices as rows of their start time, their count, and the lowest, highest and
+        mean value of every field. Every group of consecutive buckets is merged into one row.
+        """
+        rows: list[Row] = []
+        for bucket in range(first, last, group):
+            end = min(bucket + group, last)
+            count = sum(self.count[bucket:end])
+            row: Row = [self.start[bucket], count]
+            for minimum, maximum, total in zip(self.minimum, self.maximum, self.total):
+                row.extend((min(minimum[bucket:end]), max(maximum[bucket:end]), sum(total[bucket:end]) / count))
+            rows.append(row)
+        return rows
+
+
+class SeriesRollup:
+    """The rollups of one series at every resolution, finest first."""
+
+    def __init__(self, fields: int, resolutions: Sequence[int] = ROLLUP_RESOLUTIONS) -> None:
+        self.tiers: list[RollupTier] = [RollupTier(resolution, fields) for resolution in resolutions]
+
+    def add(self, row: Row) -> None:
+        """Adds the sample to every tier, which takes constant time."""
+        for tier in self.tiers:
+            tier.add(row)
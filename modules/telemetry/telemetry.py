@@ -6,17 +6,22 @@ Outputs information to telemetry_json_output in friendly JSON for UI.
 
 from io import BufferedWriter
 import logging
+import struct
 from ast import literal_eval
-from queue import Queue
+from queue import Empty, Queue
 import multiprocessing as mp
 from multiprocessing import Process, active_children
 from pathlib import Path
 from signal import signal, SIGTERM
-from time import sleep
-from typing import Any, TypeAlias
+from time import monotonic_ns, sleep
+from typing import Any, Callable, TypeAlias, TypeVar
 import modules.telemetry.json_packets as jsp
 import modules.websocket.commands as wsc
 from modules.misc.config import Config
+from modules.misc.latency import LATENCY_KEY, Stage, TimestampedPayload, stamp
+from modules.misc.metrics import MetricsRegistry, MetricsSnapshot, queue_depth
+from modules.misc.profiling import RuntimeProfiler
+from modules.telemetry.diversity import PacketDeduplicator, packet_key
 from modules.telemetry.replay import TelemetryReplay
 from modules.telemetry.telemetry_utils import (
     mission_path,
@@ -26,13 +31,43 @@ from modules.telemetry.telemetry_utils import (
 from modules.telemetry.telemetry_errors import MissionNotFoundError, AlreadyRecordingError, ReplayPlaybackError
 from types import FrameType
 
+# Constants
+DATA_SLICE_SIZE: int = 64  # Maximum payloads processed before control messages are checked again
+DATA_SLICE_BUDGET_NS: int = 2_000_000  # Maximum time spent processing payloads before control messages are checked
+
 # Types
 JSON: TypeAlias = dict[str, Any]
+T = TypeVar("T")
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
+def process_slice(
+    queue: Queue[T],
+    handler: Callable[[T], None],
+    max_items: int = DATA_SLICE_SIZE,
+    budget_ns: int = DATA_SLICE_BUDGET_NS,
+) -> int:
+    """
+    Processes items from the queue until it is empty, the maximum number of items have been processed or the time
+    budget has run out, whichever comes first.
+
+    Returns:
+        The number of items processed.
+    """
+    deadline = monotonic_ns() + budget_ns
+    processed = 0
+    while processed < max_items and monotonic_ns() < deadline:
+        try:
+            item = queue.get_nowait()
+        except Empty:
+            break
+        handler(item)
+        processed += 1
+    return processed
+
+
 def shutdown_sequence(signum: int, stack_frame: FrameType) -> None:
     """Kills all children before terminating. Acts as a signal handler for Telemetry class when receiving SIGTERM."""
     for child in active_children():
@@ -44,11 +79,12 @@ class Telemetry:
     def __init__(
         self,
         serial_status: Queue[str],
-        radio_payloads: Queue[Any],
+        radio_payloads: Queue[TimestampedPayload],
         rn2483_radio_input: Queue[str],
         radio_signal_report: Queue[str],
         telemetry_json_output: Queue[JSON],
         telemetry_ws_commands: Queue[list[str]],
+        stats_queue: Queue[MetricsSnapshot],
         config: Config,
         version: str,
     ):
@@ -56,17 +92,27 @@ class Telemetry:
         self.config = config
         self.version = version
 
-        self.radio_payloads: Queue[str] = radio_payloads
+        self.radio_payloads: Queue[TimestampedPayload] = radio_payloads
         self.telemetry_json_output: Queue[JSON] = telemetry_json_output
         self.telemetry_ws_commands: Queue[list[str]] = telemetry_ws_commands
         self.rn2483_radio_input: Queue[str] = rn2483_radio_input
         self.radio_signal_report: Queue[str] = radio_signal_report
         self.serial_status: Queue[str] = serial_status
+        self.stats_queue: Queue[MetricsSnapshot] = stats_queue
+
+        # Metrics are published to the websocket process for the /metrics endpoint
+        self.metrics: MetricsRegistry = MetricsRegistry("telemetry")
+
+        # Profiling is only active when started with a websocket command
+        self.profiler: RuntimeProfiler = RuntimeProfiler("telemetry")
 
         # Telemetry Data holds the last few copies of received data blocks stored under the subtype name as a key.
         self.status: jsp.StatusData = jsp.StatusData()
         self.telemetry_data: jsp.TelemetryData = jsp.TelemetryData(self.config.telemetry_buffer_size)
 
+        # Packets heard by more than one radio are only processed once
+        self.deduplicator: PacketDeduplicator = PacketDeduplicator()
+
         # Mission System
         self.missions_dir = Path.cwd().joinpath("missions")
         self.missions_dir.mkdir(parents=True, exist_ok=True)
@@ -79,7 +125,7 @@ class Telemetry:
         # Replay System
         self.replay = None
         self.replay_input: Queue[str] = mp.Queue()  # type:ignore
-        self.replay_output: Queue[str] = mp.Queue()  # type:ignore
+        self.replay_output: Queue[TimestampedPayload] = mp.Queue()  # type:ignore
 
         # Handle program closing to ensure no orphan processes
         signal(SIGTERM, shutdown_sequence)  # type:ignore
@@ -90,75 +136,147 @@ class Telemetry:
 
     def run(self):
         while True:
-            # Sleep for 1 ms
-            sleep(0.001)
+            # Control and status messages always go first, so they are never stuck behind a backlog of payloads
+            self.process_control()
 
-            while not self.telemetry_ws_commands.empty():
-                try:
-                    # Parse websocket command into an enum
-                    commands: list[str] = self.telemetry_ws_commands.get()
-                    command = wsc.parse(commands, wsc.WebsocketCommand)
-                    parameters = commands  # Remaining items in the commands list are parameters
-                    self.execute_command(command, parameters)
-                except AttributeError as e:
-                    logger.error(e)
-                except wsc.WebsocketCommandNotFound as e:
-                    logger.error(e)
-
-            while not self.radio_signal_report.empty():
-                # TODO set radio SNR
-                logger.info(f"SIGNAL DATA {self.radio_signal_report.get()}")
-
-            while not self.serial_status.empty():
-                x = self.serial_status.get().split(" ", maxsplit=1)
-                logger.debug(f"serial_status: {x}")
-                self.parse_serial_status(command=x[0], data=x[1])
-                self.update_websocket()
+            if self.metrics.due():
+                self.publish_metrics()
 
             # Switch data queues between replay and radio depending on mission state
             match self.status.mission.state:
                 case jsp.MissionState.RECORDED:
-                    while not self.replay_output.empty():
-                        self.process_transmission(self.replay_output.get())
-                        self.update_websocket()
+                    processed = process_slice(self.replay_output, self.process_replay_payload)
                 case _:
-                    while not self.radio_payloads.empty():
-                        self.process_transmission(self.radio_payloads.get())
-                        self.update_websocket()
-
-    def update_websocket(self) -> None:
-        """Updates the websocket with the latest packet using the JSON output process."""
-        websocket_response = {
+                    processed = process_slice(self.radio_payloads, self.process_radio_payload)
+
+            # Sleep for 1 ms when there is nothing left to do
+            if processed == 0:
+                sleep(0.001)
+
+    def process_control(self) -> None:
+        """Handles all pending websocket commands, signal reports and serial status messages."""
+
+        while not self.telemetry_ws_commands.empty():
+            try:
+                # Parse websocket command into an enum
+                commands: list[str] = self.telemetry_ws_commands.get()
+                command = wsc.parse(commands, wsc.WebsocketCommand)
+                parameters = commands  # Remaining items in the commands list are parameters
+                self.execute_command(command, parameters)
+            except AttributeError as e:
+                logger.error(e)
+            except wsc.WebsocketCommandNotFound as e:
+                logger.error(e)
+
+        signal_reported = False
+        while not self.radio_signal_report.empty():
+            # Signal reports are 'snr <value> <port>' or 'rssi <value> <port>'
+            report = self.radio_signal_report.get()
+            try:
+                setting, value, *port = report.split(" ", maxsplit=2)
+                self.status.rn2483_radio.record_signal(setting, int(value), *port)
+                signal_reported = True
+            except ValueError:
+                logger.error(f"Invalid radio signal report '{report}'")
+        if signal_reported:
+            self.update_websocket()
+
+        while not self.serial_status.empty():
+            x = self.serial_status.get().split(" ", maxsplit=1)
+            logger.debug(f"serial_status: {x}")
+            self.parse_serial_status(command=x[0], data=x[1])
+            self.update_websocket()
+
+    def process_radio_payload(self, payload: TimestampedPayload) -> None:
+        """Processes a payload received by the radio and publishes the updated telemetry."""
+        payload.stamp(Stage.DEQUEUE)
+        if payload.receiver and self.is_duplicate(payload):
+            return
+        self.process_transmission(payload)
+        self.update_websocket(payload.timestamps)
+
+    def process_replay_payload(self, payload: TimestampedPayload) -> None:
+        """Processes a payload played back from a mission recording and publishes the updated telemetry."""
+        self.metrics.inc("replay_position")
+        self.process_radio_payload(payload)
+
+    def is_duplicate(self, payload: TimestampedPayload) -> bool:
+        """
+        Records the packet in the statistics of the radio which received it, and returns True if another radio
+        already delivered the same packet.
+        """
+        key = packet_key(payload.data)
+        duplicate = key is not None and self.deduplicator.is_duplicate(key, payload.receiver)
+        self.status.rn2483_radio.record_packet(payload.receiver, duplicate)
+        if duplicate:
+            self.metrics.inc("packets_duplicate_total", receiver=payload.receiver)
+        return duplicate
+
+    def update_websocket(self, timestamps: dict[str, int] | None = None) -> None:
+        """
+        Updates the websocket with the latest packet using the JSON output process.
+
+        Arguments:
+            timestamps: The pipeline timestamps of the payload which caused this update, if any.
+        """
+        websocket_response: JSON = {
             "org": self.config.organization,
             "rocket": self.config.rocket_name,
             "version": self.version,
             "status": dict(self.status),
             "telemetry": dict(self.telemetry_data),
         }
+        if timestamps is not None:
+            stamp(timestamps, Stage.PUBLISH)
+            websocket_response[LATENCY_KEY] = timestamps
         self.telemetry_json_output.put(websocket_response)
+        self.metrics.inc("publishes_total")
+
+    def publish_metrics(self) -> None:
+        """Records the depth of the replay queue and publishes the telemetry metrics."""
+        # The queues shared with other processes are monitored by the websocket process
+        depth = queue_depth(self.replay_output)
+        if depth is not None:
+            self.metrics.set("queue_depth", depth, queue="replay_output")
+        self.metrics.publish(self.stats_queue)
 
     def reset_data(self) -> None:
         """Resets all live data on the telemetry backend to a default state."""
         self.status = jsp.StatusData()
         self.telemetry_data.clear()
+        self.deduplicator = PacketDeduplicator()
 
     def parse_serial_status(self, command: str, data: str) -> None:
-        """Parses the serial managers status output"""
+        """
+        Parses the serial managers status output. Messages about a radio give its port first, such as
+        'rn2483_connected /dev/ttyUSB0 True'.
+        """
+        radio = self.status.rn2483_radio
         match command:
             case "serial_ports":
                 self.status.serial.available_ports = literal_eval(data)
             case "rn2483_connected":
-                self.status.rn2483_radio.connected = bool(data)
+                port, connected = data.rsplit(" ", maxsplit=1)
+                radio.receiver(port).connected = connected == "True"
+                radio.merge_receivers()
+            case "rn2483_reconnects":
+                port, reconnects = data.rsplit(" ", maxsplit=1)
+                radio.receiver(port).reconnects = int(reconnects)
+                radio.merge_receivers()
+            case "rn2483_downtime":
+                port, downtime = data.rsplit(" ", maxsplit=1)
+                radio.receiver(port).downtime = float(downtime)
+                radio.merge_receivers()
             case "rn2483_port":
-                if self.status.mission.state != jsp.MissionState.DNE:
-                    self.reset_data()
-                self.status.rn2483_radio.connected_port = data
-
-                match self.status.rn2483_radio.connected_port:
-                    case "":
-                        self.status.mission.state = jsp.MissionState.DNE
-                    case _:
-                        self.status.mission.state = jsp.MissionState.LIVE
+                # The first radio starts a new live mission, and any others join it
+                if radio.connected_port == "":
+                    if self.status.mission.state != jsp.MissionState.DNE:
+                        self.reset_data()
+                    self.status.rn2483_radio.connected_port = data
+                    self.status.mission.state = jsp.MissionState.LIVE
+                _ = self.status.rn2483_radio.receiver(data)
+            case "rn2483_port_closed":
+                radio.remove_receiver(data)
             case _:
                 return None
 
@@ -202,6 +320,14 @@ class Telemetry:
                     logger.error(e.message)
                 except ReplayPlaybackError as e:
                     logger.error(e.message)
+
+            # Profile commands
+            case WSCommand.PROFILE.value.START:
+                self.profiler.start()
+            case WSCommand.PROFILE.value.STOP:
+                _ = self.profiler.stop()
+            case WSCommand.PROFILE.value.DUMP:
+                _ = self.profiler.dump()
             case _:
                 raise NotImplementedError(f"Command {command} not implemented.")
 
@@ -240,7 +366,7 @@ class Telemetry:
         self.replay = None
 
         # Empty replay output
-        self.replay_output: Queue[str] = mp.Queue()  # type:ignore
+        self.replay_output: Queue[TimestampedPayload] = mp.Queue()  # type:ignore
         self.reset_data()
 
     def play_mission(self, mission_name: str) -> None:
@@ -256,6 +382,7 @@ class Telemetry:
 
         # Set output data to current mission
         self.status.mission.name = mission_name
+        self.metrics.set("replay_position", 0)
 
         # We are not to record when replaying missions
         self.status.mission.state = jsp.MissionState.RECORDED
@@ -289,14 +416,26 @@ class Telemetry:
         logger.info("RECORDING STOP")
         # TODO
 
-    def process_transmission(self, data: str) -> None:
+    def process_transmission(self, payload: TimestampedPayload) -> None:
         """Processes the incoming radio transmission data."""
 
+        self.metrics.inc("packets_received_total")
+
         # Parse the transmission, if result is not null, update telemetry data
-        parsed_transmission: ParsedTransmission | None = parse_rn2483_transmission(data, self.config)
+        try:
+            parsed_transmission: ParsedTransmission | None = parse_rn2483_transmission(
+                payload.data, self.config, self.metrics
+            )
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError) as e:
+            # Corrupted payloads must not take down the telemetry process
+            logger.error(f"Could not parse transmission '{payload.data.strip()}': {e}")
+            self.metrics.inc("parse_errors_total", error=type(e).__name__)
+            return
+        payload.stamp(Stage.PARSE)
         if parsed_transmission and parsed_transmission.blocks:
             # Updates the telemetry buffer with the latest block data and latest mission time
             self.telemetry_data.update_telemetry(parsed_transmission.packet_header.version, parsed_transmission.blocks)
+            payload.stamp(Stage.TELEMETRY_UPDATE)
 
             # TODO UPDATE FOR V1
             # Write data to file when recording
@@ -13,6 +13,7 @@ from modules.telemetry.v1.block import (
 )
 import modules.telemetry.v1.data_block as v1db
 from modules.misc.config import Config
+from modules.misc.metrics import MetricsRegistry
 
 MISSION_EXTENSION: str = "mission"
 FILE_CREATION_ATTEMPT_LIMIT: int = 50
@@ -62,9 +63,15 @@ class ParsedTransmission:
     blocks: List[ParsedBlock]
 
 
-def parse_radio_block(pkt_version: int, block_header: BlockHeader, hex_block_contents: str) -> Optional[ParsedBlock]:
+def parse_radio_block(
+    pkt_version: int,
+    block_header: BlockHeader,
+    hex_block_contents: str,
+    metrics: Optional[MetricsRegistry] = None,
+) -> Optional[ParsedBlock]:
     """
     Parses telemetry payload blocks from either parsed packets or stored replays. Block contents are a hex string.
+    Parsed and dropped blocks are counted by subtype in the metrics registry, if one is given.
     """
 
     # Working with hex strings until this point.
@@ -88,6 +95,8 @@ def parse_radio_block(pkt_version: int, block_header: BlockHeader, hex_block_con
         #     self.status.rocket = jsp.RocketData.from_data_block(block)
         #     return
 
+        if metrics is not None:
+            metrics.inc("blocks_parsed_total", subtype=block_name)
         return ParsedBlock(block_name, block_header, dict(block_contents))  # type: ignore
 
     except ValueError:
@@ -99,11 +108,16 @@ def parse_radio_block(pkt_version: int, block_header: BlockHeader, hex_block_con
                 implemented!"
         )
 
+    if metrics is not None:
+        metrics.inc("blocks_dropped_total", subtype=str(block_header.message_subtype))
 
-def parse_rn2483_transmission(data: str, config: Config) -> Optional[ParsedTransmission]:
+
+def parse_rn2483_transmission(
+    data: str, config: Config, metrics: Optional[MetricsRegistry] = None
+) -> Optional[ParsedTransmission]:
     """
     Parses RN2483 Packets and extracts our telemetry payload blocks, returns parsed transmission object if packet
-    is valid.
+    is valid. Parse errors and block outcomes are counted in the metrics registry, if one is given.
     """
     # List of parsed blocks
     parsed_blocks: list[ParsedBlock] = []
@@ -113,11 +127,13 @@ def parse_rn2483_transmission(data: str, config: Config) -> Optional[ParsedTrans
     logger.debug(f"Full data string: {data}")
     # TODO Make a generic abstract packet header class to encompass V1 packet header, etc
 
-    # Catch unsupported encoding versions by skipping packet
+    # Catch unsupported encoding versions and invalid header field values by skipping packet
     try:
         pkt_hdr = PacketHeader.from_hex(data[:32])
-    except UnsupportedEncodingVersionError as e:
+    except (UnsupportedEncodingVersionError, InvalidHeaderFieldValueError) as e:
         logger.error(f"{e}, skipping packet")
+        if metrics is not None:
+            metrics.inc("parse_errors_total", error=type(e).__name__)
         return
 
     # We can keep unauthorized callsigns but we'll log them as warnings
@@ -142,6 +158,8 @@ def parse_rn2483_transmission(data: str, config: Config) -> Optional[ParsedTrans
             block_header = BlockHeader.from_hex(blocks[:8])
         except InvalidHeaderFieldValueError as e:
             logger.error(f"{e}, skipping packet")
+            if metrics is not None:
+                metrics.inc("parse_errors_total", error=type(e).__name__)
             return
 
         # Select block contents
@@ -151,11 +169,13 @@ def parse_rn2483_transmission(data: str, config: Config) -> Optional[ParsedTrans
 
         # Check if message is destined for ground station for processing
         if block_header.destination in [DeviceAddress.GROUND_STATION, DeviceAddress.MULTICAST]:
-            cur_block = parse_radio_block(pkt_hdr.version, block_header, block_contents)
+            cur_block = parse_radio_block(pkt_hdr.version, block_header, block_contents, metrics)
             if cur_block:
                 parsed_blocks.append(cur_block)  # Append parsed block to list
         else:
             logger.warning("Invalid destination address")
+            if metrics is not None:
+                metrics.inc("blocks_dropped_total", subtype=str(block_header.message_subtype))
 
         # Remove the data we processed from the whole set, and move onto the next data block
         blocks = blocks[block_len:]
@@ -9,6 +9,9 @@ from modules.telemetry.v1.data_block import DataBlockSubtype
 
 MIN_SUPPORTED_VERSION: int = 1
 MAX_SUPPORTED_VERSION: int = 1
+PACKET_HEADER_LENGTH: int = 16  # Bytes
+BLOCK_HEADER_LENGTH: int = 4  # Bytes
+CALLSIGN_LENGTH: int = 9  # Bytes at the start of the packet header for the call sign and call zone
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -102,6 +105,24 @@ class PacketHeader:
 
         return cls(callsign, callzone, length, version, src_addr, packet_num)
 
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the packet header.
+        Returns:
+            The packet header as bytes.
+        """
+        amateur_radio = self.callsign + (f"/{self.callzone}" if self.callzone else "")
+        return amateur_radio.encode("utf-8").ljust(CALLSIGN_LENGTH, b"\x00") + struct.pack(
+            "<BBBI", self.length // 4 - 1, self.version, self.src_addr, self.packet_num
+        )
+
+    def to_hex(self) -> str:
+        """
+        Returns:
+            The encoded packet header in hexadecimal digits.
+        """
+        return self.to_bytes().hex().upper()
+
     def __len__(self) -> int:
         """
         Returns:
@@ -140,6 +161,21 @@ class BlockHeader:
 
         return cls(length, message_type, message_subtype, destination)
 
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the block header.
+        Returns:
+            The block header as bytes.
+        """
+        return struct.pack("<BBBB", self.length // 4 - 1, self.message_type, self.message_subtype, self.destination)
+
+    def to_hex(self) -> str:
+        """
+        Returns:
+            The encoded block header in hexadecimal digits.
+        """
+        return self.to_bytes().hex().upper()
+
     def __len__(self) -> int:
         """
         Returns:
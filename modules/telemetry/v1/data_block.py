@@ -76,6 +76,15 @@ class DataBlock(ABC):
         """
         pass
 
+    @abstractmethod
+    def to_bytes(self) -> bytes:
+        """
+        Encodes a data block as bytes.
+        Returns:
+            The data block contents, not including the block header.
+        """
+        pass
+
     @abstractmethod
     def __len__(self) -> int:
         """
@@ -133,13 +142,16 @@ class DebugMessageDB(DataBlock):
         message = payload[4:].decode("utf-8")
         return cls(mission_time, message)
 
+    def to_bytes(self) -> bytes:
+        return struct.pack("<I", self.mission_time) + self.message.encode("utf-8")
+
     def __len__(self) -> int:
         """
         Get the length of a debug message data block in bytes.
         Returns:
             The length of a debug message data block in bytes, not including the block header.
         """
-        return 4 + len(self.message)
+        return 4 + len(self.message.encode("utf-8"))
 
     def __str__(self):
         return f"{self.__class__.__name__} -> time: {self.mission_time} ms, message: {self.message}"
@@ -155,7 +167,7 @@ class DebugMessageDB(DataBlock):
 class AltitudeDB(DataBlock):
     """Represents an altitude data block."""
 
-    def __init__(self, mission_time: int, altitude: int) -> None:
+    def __init__(self, mission_time: int, altitude: float) -> None:
         super().__init__(mission_time)
         self.altitude = altitude
 
@@ -165,7 +177,7 @@ class AltitudeDB(DataBlock):
         Returns:
             The length of an altitude data block in bytes, not including the block header.
         """
-        return 16
+        return 8
 
     @classmethod
     def from_bytes(cls, payload: bytes) -> Self:
@@ -179,7 +191,7 @@ class AltitudeDB(DataBlock):
         return cls(parts[0], parts[1] / 1000)  # Altitude is sent in mm
 
     def to_bytes(self) -> bytes:
-        return struct.pack("<Ii", int(self.altitude))
+        return struct.pack("<Ii", self.mission_time, round(self.altitude * 1000))  # Altitude is sent in mm
 
     def __str__(self):
         return f"{self.__class__.__name__} -> time: {self.mission_time} ms, altitude: {self.altitude} m"
@@ -206,6 +218,9 @@ class TemperatureDB(DataBlock):
         parts = struct.unpack("<Ii", payload)
         return cls(parts[0], parts[1])
 
+    def to_bytes(self) -> bytes:
+        return struct.pack("<Ii", self.mission_time, self.temperature)
+
     def __len__(self) -> int:
         """
         Get the length of a temperature data block in bytes.
@@ -251,6 +266,9 @@ class PressureDB(DataBlock):
         parts = struct.unpack("<II", payload)
         return cls(parts[0], parts[1])
 
+    def to_bytes(self) -> bytes:
+        return struct.pack("<II", self.mission_time, self.pressure)
+
     def __len__(self) -> int:
         """
         Get the length of a pressure data block in bytes.
@@ -292,6 +310,9 @@ class HumidityDB(DataBlock):
         parts = struct.unpack("<II", payload)
         return cls(parts[0], parts[1])
 
+    def to_bytes(self) -> bytes:
+        return struct.pack("<II", self.mission_time, self.humidity)
+
     def __len__(self) -> int:
         """
         Get the length of a humidity data block in bytes.
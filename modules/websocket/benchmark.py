@@ -0,0 +1,323 @@
+"""
+Load test of the websocket server with a synthetic telemetry feed.
+
+The real WebSocketHandler is started in its own process, and fed updates shaped like the telemetry output at a fixed
+rate. Each update carries the time it was put on the queue, so every client measures how long each update took to
+reach it. The number of concurrent clients is stepped up, and each step reports the latency percentiles, the
+throughput, the share of updates which reached the clients, and the CPU and memory used by the server process:
+
+    python -m modules.websocket.benchmark --clients 1,10,50,100,250,500 --rate 20 --duration 10
+
+The clients run in this process on one event loop, so the latencies include the time they wait for it; at the
+largest client counts this process may become the bottleneck before the server does.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from functools import cache
+from pathlib import Path
+from queue import Queue
+from typing import Any, Optional, TypeAlias
+
+import tornado.httpclient
+import tornado.websocket
+
+from modules.misc.metrics import METRIC_PREFIX
+from modules.websocket.encoding import Encoding, decode_binary
+from modules.websocket.websocket import WebSocketHandler
+
+# Constants
+BENCHMARK_PORT: int = 33900
+SENT_KEY: str = "benchmark_sent_ns"  # Time each update was put on the queue, from time.monotonic_ns
+CONNECT_TIMEOUT: float = 10.0
+DRAIN_TIME: float = 1.0  # Seconds updates sent during a step are given to arrive after it ends
+SERVER_START_TIMEOUT: float = 10.0
+TELEMETRY_PACKET: Path = Path(__file__).parents[1].joinpath("telemetry", "telemetry_packet.json")
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StepResult:
+    """The measurements of one step of the benchmark, with a fixed number of clients."""
+
+    clients: int
+    duration: float
+    updates_sent: int
+    messages_received: int
+    delivery_ratio: float  # Messages received over the updates sent to every client
+    messages_per_second: float
+    bytes_per_second: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    latency_max_ms: float
+    server_cpu_percent: Optional[float]
+    server_rss_bytes: Optional[float]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Returns the value below which the given fraction of the sorted values fall."""
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+@cache
+def output_format() -> dict[str, dict[str, Any]]:
+    """Returns the series of the telemetry output and their fields."""
+    with open(TELEMETRY_PACKET, "r") as file:
+        return json.load(file)
+
+
+def synthetic_update(sequence: int, buffer_size: int) -> JSON:
+    """Returns an update shaped like the telemetry output, with every series holding the last few samples."""
+    times = list(range(max(0, sequence - buffer_size + 1) * 100, (sequence + 1) * 100, 100))
+    telemetry: JSON = {"last_mission_time": times[-1]}
+    for block, fields in output_format().items():
+        telemetry[block] = {"mission_time": times}
+        for number, name in enumerate(fields):
+            telemetry[block][name] = [time / 1000 * (number + 1) + 0.123456789 for time in times]
+
+    return {
+        "org": "CUInSpace",
+        "rocket": "Benchmark",
+        "version": "benchmark",
+        "status": {"mission": {"name": "benchmark", "state": 1}},
+        "telemetry": telemetry,
+    }
+
+
+class SyntheticFeed:
+    """Puts synthetic updates on the telemetry output queue at a fixed rate from a background thread."""
+
+    def __init__(self, telemetry_json_output: Queue[JSON], rate: float, buffer_size: int) -> None:
+        self.telemetry_json_output: Queue[JSON] = telemetry_json_output
+        self.rate: float = rate
+        self.buffer_size: int = buffer_size
+        self.sent: int = 0
+        self.stopped: threading.Event = threading.Event()
+        self.thread: threading.Thread = threading.Thread(target=self.run, name="benchmark-feed", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def run(self) -> None:
+        next_time = time.monotonic()
+        while not self.stopped.is_set():
+            update = synthetic_update(self.sent, self.buffer_size)
+            update[SENT_KEY] = time.monotonic_ns()
+            self.telemetry_json_output.put(update)
+            self.sent += 1
+
+            next_time += 1 / self.rate
+            _ = self.stopped.wait(max(0.0, next_time - time.monotonic()))
+
+
+class BenchmarkClient:
+    """A websocket client which records the latency and size of every update it receives."""
+
+    def __init__(self, url: str, encoding: Encoding) -> None:
+        self.url: str = url
+        self.encoding: Encoding = encoding
+        self.connection: Optional[tornado.websocket.WebSocketClientConnection] = None
+        self.received: list[tuple[int, int, int]] = []  # Time each update was sent, its latency in ns and its size
+
+    async def connect(self) -> None:
+        self.connection = await tornado.websocket.websocket_connect(
+            f"{self.url}?encoding={self.encoding}", connect_timeout=CONNECT_TIMEOUT, compression_options={}
+        )
+
+    async def receive(self) -> None:
+        """Reads updates until the connection is closed."""
+        assert self.connection is not None
+        while True:
+            message = await self.connection.read_message()
+            if message is None:
+                return
+            received = time.monotonic_ns()
+            update = decode_binary(message) if isinstance(message, bytes) else json.loads(message)
+            if SENT_KEY in update:
+                self.received.append((update[SENT_KEY], received - update[SENT_KEY], len(message)))
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+
+
+async def server_usage(port: int) -> tuple[Optional[float], Optional[float]]:
+    """Returns the CPU seconds and resident memory of the websocket process, read from its metrics endpoint."""
+    response = await tornado.httpclient.AsyncHTTPClient().fetch(f"http://localhost:{port}/metrics")
+    usage: dict[str, float] = {}
+    for name in ("process_cpu_seconds_total", "process_resident_memory_bytes"):
+        match = re.search(rf'^{METRIC_PREFIX}{name}{{process="websocket"}} (\S+)$', response.body.decode(), re.M)
+        if match is not None:
+            usage[name] = float(match.group(1))
+    return usage.get("process_cpu_seconds_total"), usage.get("process_resident_memory_bytes")
+
+
+async def wait_for_server(port: int) -> None:
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        try:
+            _ = await server_usage(port)
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run_step(port: int, clients: int, duration: float, encoding: Encoding, feed: SyntheticFeed) -> StepResult:
+    """Connects the clients, then measures what they receive over the duration."""
+    url = f"ws://localhost:{port}/websocket"
+    step_clients = [BenchmarkClient(url, encoding) for _ in range(clients)]
+    _ = await asyncio.gather(*(client.connect() for client in step_clients))
+    receivers = [asyncio.create_task(client.receive()) for client in step_clients]
+
+    # Only the updates sent during the step are measured, once they have had time to arrive
+    cpu_start, _ = await server_usage(port)
+    start, sent_start = time.monotonic_ns(), feed.sent
+    await asyncio.sleep(duration)
+    end, sent = time.monotonic_ns(), feed.sent - sent_start
+    cpu_end, rss = await server_usage(port)
+    await asyncio.sleep(DRAIN_TIME)
+
+    for client in step_clients:
+        client.close()
+    _ = await asyncio.gather(*receivers, return_exceptions=True)
+
+    measured = [
+        (latency / 1e9, size)
+        for client in step_clients
+        for sent_time, latency, size in client.received
+        if start <= sent_time < end
+    ]
+    latencies = sorted(latency for latency, _ in measured)
+    received = len(latencies)
+    elapsed = (end - start) / 1e9
+    cpu_percent = None if cpu_start is None or cpu_end is None else (cpu_end - cpu_start) / elapsed * 100
+    return StepResult(
+        clients=clients,
+        duration=elapsed,
+        updates_sent=sent,
+        messages_received=received,
+        delivery_ratio=received / (sent * clients) if sent else 0.0,
+        messages_per_second=received / elapsed,
+        bytes_per_second=sum(size for _, size in measured) / elapsed,
+        latency_p50_ms=percentile(latencies, 0.50) * 1000,
+        latency_p95_ms=percentile(latencies, 0.95) * 1000,
+        latency_p99_ms=percentile(latencies, 0.99) * 1000,
+        latency_max_ms=(latencies[-1] if latencies else float("nan")) * 1000,
+        server_cpu_percent=cpu_percent,
+        server_rss_bytes=rss,
+    )
+
+
+def run_benchmark(
+    client_counts: list[int],
+    rate: float = 20.0,
+    duration: float = 10.0,
+    buffer_size: int = 20,
+    encoding: Encoding = Encoding.JSON,
+    port: int = BENCHMARK_PORT,
+) -> JSON:
+    """
+    Starts the websocket server, feeds it updates and runs a step of the benchmark for each number of clients.
+
+    Returns:
+        The report of the benchmark, with its parameters and the results of each step.
+    """
+    # The server is spawned rather than forked, so it starts from a clean event loop
+    context = mp.get_context("spawn")
+    telemetry_json_output: Queue[JSON] = context.Queue()  # type: ignore
+    ws_commands: Queue[str] = context.Queue()  # type: ignore
+    stats_queue: Queue[Any] = context.Queue()  # type: ignore
+    server = context.Process(
+        target=WebSocketHandler,
+        args=(telemetry_json_output, ws_commands, stats_queue, None, None, port),
+        daemon=True,
+    )
+    server.start()
+    feed = SyntheticFeed(telemetry_json_output, rate, buffer_size)
+
+    async def run() -> list[StepResult]:
+        await wait_for_server(port)
+        feed.start()
+        results: list[StepResult] = []
+        for clients in client_counts:
+            result = await run_step(port, clients, duration, encoding, feed)
+            logger.info(
+                f"{clients:>4} clients: p50 {result.latency_p50_ms:.2f} ms, p99 {result.latency_p99_ms:.2f} ms, "
+                f"{result.messages_per_second:.0f} messages/s, delivered {result.delivery_ratio:.0%}, "
+                f"server CPU {result.server_cpu_percent or 0:.0f}%"
+            )
+            results.append(result)
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        feed.stop()
+        server.terminate()
+        server.join()
+
+    return {
+        "parameters": {
+            "rate": rate,
+            "duration": duration,
+            "buffer_size": buffer_size,
+            "encoding": str(encoding),
+            "cpu_count": os.cpu_count(),
+        },
+        "steps": [asdict(result) for result in results],
+    }
+
+
+def main() -> None:
+    """Runs the benchmark from the command line and writes its report as JSON."""
+    parser = argparse.ArgumentParser(description="Load tests the websocket server with a synthetic telemetry feed.")
+    _ = parser.add_argument(
+        "--clients", default="1,10,50,100,250,500", help="Comma separated client counts to step through."
+    )
+    _ = parser.add_argument("--rate", type=float, default=20.0, help="Updates per second fed to the server.")
+    _ = parser.add_argument("--duration", type=float, default=10.0, help="Seconds measured at each client count.")
+    _ = parser.add_argument("--buffer-size", type=int, default=20, help="Samples of each series in every update.")
+    _ = parser.add_argument("--encoding", type=Encoding, default=Encoding.JSON, choices=list(Encoding))
+    _ = parser.add_argument("--port", type=int, default=BENCHMARK_PORT, help="Port the server under test listens on.")
+    _ = parser.add_argument(
+        "--output", type=Path, default=Path("benchmark.json"), help="File the report is written to."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    report = run_benchmark(
+        [int(count) for count in args.clients.split(",")],
+        args.rate,
+        args.duration,
+        args.buffer_size,
+        args.encoding,
+        args.port,
+    )
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,12 +33,21 @@ class RecordCommands(StrEnum):
     STOP = "stop recording"
 
 
+class ProfileCommands(StrEnum):
+    """Contains the structure for the profile subcommands."""
+
+    START = "start profile"
+    STOP = "stop profile"
+    DUMP = "dump profile"
+
+
 class WebsocketCommand(Enum):
     """Contains the structure for the telemetry commands."""
 
     UPDATE = "update"
     RECORD = RecordCommands
     REPLAY = ReplayCommands
+    PROFILE = ProfileCommands
 
 
 # Parsing functions
@@ -0,0 +1,135 @@
+# Encodings of the telemetry updates sent to the websocket clients
+# Clients pick one of the following with the encoding query argument when they connect:
+#
+# json: JSON text frames, the default.
+# deflate: JSON text frames, compressed with the permessage-deflate websocket extension if the client offers it.
+# binary: Binary frames in which the numeric history buffers of the telemetry series are typed arrays.
+#
+# A binary frame is laid out as:
+#
+#   magic (4 bytes) | header length (uint32) | header (UTF-8 JSON) | padding | array data
+#
+# The header is the update with every numeric list under "telemetry" replaced by {"$array": <index>}, along with an
+# "$arrays" list describing each array as [type, byte offset, length]. Integers are sent as int32 ("i4") and other
+# numbers as float64 ("f8"), so no precision is lost; lists of integers which do not fit in 32 bits stay in the
+# header as JSON. Arrays are little endian and aligned to 8 bytes from the start of the frame, so browsers can view
+# them directly as Int32Array or Float64Array.
+
+# Imports
+import json
+import struct
+import sys
+from array import array
+from enum import StrEnum
+from typing import Any, TypeAlias
+
+# Constants
+BINARY_MAGIC: bytes = b"GSB1"
+BINARY_PREFIX: struct.Struct = struct.Struct("<4sI")  # Magic, header length
+ARRAY_KEY: str = "$array"
+ARRAYS_KEY: str = "$arrays"
+ARRAY_ALIGNMENT: int = 8
+INT32_MIN: int = -(2**31)
+INT32_MAX: int = 2**31 - 1
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+Frame: TypeAlias = str | bytes
+
+
+class Encoding(StrEnum):
+    """The encodings websocket clients can choose for their updates."""
+
+    JSON = "json"
+    DEFLATE = "deflate"
+    BINARY = "binary"
+
+
+ARRAY_TYPES: dict[str, str] = {"i": "i4", "d": "f8"}  # Array type codes and the type names given to clients
+ARRAY_TYPE_CODES: dict[str, str] = {name: typecode for typecode, name in ARRAY_TYPES.items()}
+
+
+def array_type(values: list[Any]) -> str | None:
+    """
+    Returns the array type code for a list of numbers, or None if it cannot be sent as a typed array without losing
+    precision, such as a list which is not all numbers or has integers which do not fit in 32 bits.
+    """
+    if not values:
+        return None
+    if all(type(value) is int for value in values):
+        return "i" if all(INT32_MIN <= value <= INT32_MAX for value in values) else None
+    if all(type(value) in (int, float) for value in values):
+        return "d"
+    return None
+
+
+def encode_binary(json_data: JSON) -> bytes:
+    """Encodes an update as a binary frame, with the numeric lists of the telemetry series as typed arrays."""
+
+    arrays: list[array[Any]] = []
+
+    def extract(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: extract(item) for key, item in value.items()}  # type: ignore
+        if isinstance(value, list) and (typecode := array_type(value)) is not None:  # type: ignore
+            arrays.append(array(typecode, value))  # type: ignore
+            return {ARRAY_KEY: len(arrays) - 1}
+        return value
+
+    header = dict(json_data)
+    if "telemetry" in json_data:
+        header["telemetry"] = extract(json_data["telemetry"])
+
+    # Array offsets depend on the length of the header which describes them, so they are laid out after a header
+    # with placeholder offsets which are at least as long as the real ones
+    header[ARRAYS_KEY] = [[ARRAY_TYPES[values.typecode], 0xFFFFFFFF, len(values)] for values in arrays]
+    offset = BINARY_PREFIX.size + len(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+    for descriptor, values in zip(header[ARRAYS_KEY], arrays):
+        offset += -offset % ARRAY_ALIGNMENT
+        descriptor[1] = offset
+        offset += len(values) * values.itemsize
+
+    encoded_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    frame = bytearray(BINARY_PREFIX.pack(BINARY_MAGIC, len(encoded_header)))
+    frame += encoded_header
+    for (_, offset, _), values in zip(header[ARRAYS_KEY], arrays):
+        frame += b" " * (offset - len(frame))
+        if sys.byteorder == "big":
+            values.byteswap()
+        frame += values.tobytes()
+    return bytes(frame)
+
+
+def decode_binary(frame: bytes) -> JSON:
+    """Decodes a binary frame back into an update, with the typed arrays as lists."""
+
+    magic, header_length = BINARY_PREFIX.unpack_from(frame)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a binary telemetry frame")
+    header = json.loads(frame[BINARY_PREFIX.size : BINARY_PREFIX.size + header_length])
+
+    arrays: list[list[Any]] = []
+    for type_name, offset, length in header.pop(ARRAYS_KEY):
+        values = array(ARRAY_TYPE_CODES[type_name])
+        values.frombytes(frame[offset : offset + length * values.itemsize])
+        if sys.byteorder == "big":
+            values.byteswap()
+        arrays.append(values.tolist())
+
+    def restore(value: Any) -> Any:
+        if isinstance(value, dict):
+            if ARRAY_KEY in value:
+                return arrays[value[ARRAY_KEY]]
+            return {key: restore(item) for key, item in value.items()}  # type: ignore
+        return value
+
+    if "telemetry" in header:
+        header["telemetry"] = restore(header["telemetry"])
+    return header
+
+
+def encode(json_data: JSON, encoding: Encoding) -> Frame:
+    """Encodes an update for clients using the given encoding."""
+    if encoding == Encoding.BINARY:
+        return encode_binary(json_data)
+    return json.dumps(json_data)  # Compression is applied per connection by the websocket extension
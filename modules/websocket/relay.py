@@ -0,0 +1,91 @@
+# Fan-out of the telemetry updates to relay worker processes
+# In relay mode the primary websocket server publishes every update it sends to its own clients, encoded once as
+# JSON, to the relay workers over a Unix socket. Each worker serves spectator clients on the relay port (see the
+# relay_worker module), so large numbers of spectators are written to by other processes and on other cores than the
+# mission control clients of the primary server.
+#
+# Each update is framed on the socket by its length (uint32, little endian) followed by its JSON text. Workers which
+# fall too far behind are disconnected and reconnect to pick up from the latest update.
+
+# Imports
+import logging
+import os
+import socket
+import struct
+import tempfile
+from typing import Any, Optional, TypeAlias
+
+import tornado.iostream
+import tornado.netutil
+import tornado.tcpserver
+
+# Constants
+RELAY_SUPPORTED: bool = hasattr(socket, "AF_UNIX") and hasattr(socket, "SO_REUSEPORT")
+RELAY_FRAME: struct.Struct = struct.Struct("<I")  # Length of the JSON text of each update
+MAX_RELAY_BUFFER: int = 16 * 1024 * 1024  # Most bytes waiting to be written to a worker before it is disconnected
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+def relay_socket_path() -> str:
+    """Returns the path of the Unix socket the relay workers of this ground station connect to."""
+    return os.path.join(tempfile.gettempdir(), f"ground-station-relay-{os.getpid()}.sock")
+
+
+def relay_frame(text: str) -> bytes:
+    """Returns the JSON text of an update framed for the relay socket."""
+    encoded = text.encode("utf-8")
+    return RELAY_FRAME.pack(len(encoded)) + encoded
+
+
+class RelayServer(tornado.tcpserver.TCPServer):
+    """Publishes the updates of the primary websocket server to the relay workers connected to its Unix socket."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path: str = path
+        self.streams: set[tornado.iostream.IOStream] = set()
+        self.last_update: Optional[str] = None  # Sent to workers when they connect
+
+    def listen_unix(self) -> None:
+        self.add_socket(tornado.netutil.bind_unix_socket(self.path))
+        logger.info(f"Relay listening on {self.path}")
+
+    async def handle_stream(self, stream: tornado.iostream.IOStream, address: Any) -> None:
+        stream.max_write_buffer_size = MAX_RELAY_BUFFER
+        self.streams.add(stream)
+        logger.info(f"Relay worker connected, {len(self.streams)} in total")
+        if self.last_update is not None:
+            self.write(stream, relay_frame(self.last_update))
+
+        # Workers never send anything, so this waits for the worker to disconnect
+        try:
+            _ = await stream.read_until_close()
+        except tornado.iostream.StreamClosedError:
+            pass
+        self.streams.discard(stream)
+        logger.info(f"Relay worker disconnected, {len(self.streams)} left")
+
+    def publish(self, text: str) -> None:
+        """Sends the JSON text of an update to every relay worker, framing it once for all of them."""
+        self.last_update = text
+        if not self.streams:
+            return
+
+        frame = relay_frame(text)
+        for stream in list(self.streams):
+            self.write(stream, frame)
+
+    def write(self, stream: tornado.iostream.IOStream, frame: bytes) -> None:
+        try:
+            _ = stream.write(frame)
+        except tornado.iostream.StreamBufferFullError:
+            logger.warning("Disconnecting relay worker, which is too far behind")
+            self.streams.discard(stream)
+            stream.close()
+        except tornado.iostream.StreamClosedError:
+            self.streams.discard(stream)
@@ -0,0 +1,95 @@
+# Relay worker process serving spectator websocket clients
+# Each worker receives the updates published by the primary websocket server (see the relay module) and sends them to
+# its own clients, which connect to the relay port. Every worker listens on the same port with SO_REUSEPORT, so the
+# operating system spreads the spectators between them. Spectators get updates like the clients of the primary server,
+# with the same query arguments, but cannot send commands to the ground station.
+
+# Imports
+import asyncio
+import json
+import logging
+import socket
+from queue import Queue
+
+import tornado.httpserver
+import tornado.ioloop
+import tornado.iostream
+import tornado.netutil
+import tornado.web
+
+from modules.misc.metrics import PUBLISH_INTERVAL, MetricsSnapshot
+from modules.telemetry.history import HistoryStore
+from modules.websocket.encoding import Encoding
+from modules.websocket.relay import RELAY_FRAME
+from modules.websocket.subscriptions import Subscription
+from modules.websocket.websocket import TornadoWSServer
+
+# Constants
+RELAY_RECONNECT_INTERVAL: float = 1.0  # Seconds between attempts to connect to the primary server
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+class SpectatorWSServer(TornadoWSServer):
+    """The websocket server of a relay worker, whose clients are only sent updates."""
+
+    def on_message(self, message: str) -> None:  # type: ignore
+        logger.debug(f"Ignoring message from spectator {self.request.remote_ip}")
+
+
+def receive(text: bytes) -> None:
+    """Sends an update relayed from the primary server to the clients of this worker."""
+    json_data = json.loads(text)
+    if SpectatorWSServer.history is not None and "telemetry" in json_data:
+        SpectatorWSServer.history.record(json_data["telemetry"])
+
+    # The relayed text is already what clients subscribed to everything in JSON are sent
+    relayed = text.decode("utf-8")
+    SpectatorWSServer.send_update(json_data, {(Subscription(), Encoding.JSON): (relayed, len(text))})
+
+
+class RelayWorker:
+    """Serves spectator clients on the relay port with the updates published by the primary websocket server."""
+
+    def __init__(self, relay_socket: str, port: int, index: int, stats_queue: Queue[MetricsSnapshot]) -> None:
+        self.relay_socket: str = relay_socket
+        self.port: int = port
+        self.index: int = index
+        self.stats_queue: Queue[MetricsSnapshot] = stats_queue
+
+    def run(self) -> None:
+        asyncio.run(self.serve())
+
+    async def serve(self) -> None:
+        app = tornado.web.Application(
+            [(r"/websocket", SpectatorWSServer)], websocket_ping_interval=5, websocket_ping_timeout=10
+        )
+        server = tornado.httpserver.HTTPServer(app)
+        server.add_sockets(tornado.netutil.bind_sockets(self.port, reuse_port=hasattr(socket, "SO_REUSEPORT")))
+        logger.info(f"Relay worker {self.index} serving spectators on port {self.port}")
+
+        # Each worker keeps its own history, for spectators which ask for decimated series
+        SpectatorWSServer.history = HistoryStore()
+
+        # Metrics are published for the /metrics endpoint of the primary server, labelled with this worker
+        SpectatorWSServer.metrics.process = f"relay-{self.index}"
+        tornado.ioloop.PeriodicCallback(
+            lambda: SpectatorWSServer.metrics.publish(self.stats_queue), PUBLISH_INTERVAL * 1000
+        ).start()
+
+        await self.follow()
+
+    async def follow(self) -> None:
+        """Receives the updates published by the primary server, reconnecting whenever the connection is lost."""
+        while True:
+            stream = tornado.iostream.IOStream(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM))
+            try:
+                _ = await stream.connect(self.relay_socket)
+                logger.info(f"Relay worker {self.index} connected to the primary server")
+                while True:
+                    (length,) = RELAY_FRAME.unpack(await stream.read_bytes(RELAY_FRAME.size))
+                    receive(await stream.read_bytes(length))
+            except (tornado.iostream.StreamClosedError, OSError):
+                stream.close()
+            await asyncio.sleep(RELAY_RECONNECT_INTERVAL)
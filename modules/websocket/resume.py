@@ -0,0 +1,90 @@
+# Resuming the updates of websocket clients which reconnect
+# Every update sent to the clients carries a sequence number under "seq", one more than the update before it. The
+# server keeps a log of the most recent updates. A client which reconnects gives the last sequence number it received
+# with the last_seq query argument (/websocket?last_seq=1234), and is sent one update holding everything it missed:
+# the latest status, and for each telemetry series every sample newer than the last one it had. That update also
+# carries "resumed_from", the client's sequence number, so the client knows to add the samples to its own rather than
+# replace them. Clients too far behind for the log, or from before the mission restarted, get the latest update.
+
+# Imports
+from collections import deque
+from typing import Any, Optional, TypeAlias
+
+# Constants
+REPLAY_LOG_SIZE: int = 256  # Most recent updates kept for clients which reconnect
+SEQUENCE_KEY: str = "seq"
+RESUMED_KEY: str = "resumed_from"
+TIME_KEY: str = "mission_time"
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+
+
+def last_times(telemetry: JSON) -> dict[str, float]:
+    """Returns the mission time of the last sample of each telemetry series."""
+    return {
+        name: block[TIME_KEY][-1] if block[TIME_KEY] else float("-inf")
+        for name, block in telemetry.items()
+        if isinstance(block, dict) and TIME_KEY in block
+    }
+
+
+class ReplayLog:
+    """The most recent updates sent to the clients, numbered in sequence."""
+
+    def __init__(self, size: int = REPLAY_LOG_SIZE) -> None:
+        self.updates: deque[JSON] = deque(maxlen=size)
+        self.sequence: int = 0
+
+    def append(self, json_data: JSON) -> JSON:
+        """
+        Numbers the update with the next sequence number and keeps it in the log. Updates relayed from the primary
+        server keep their number, and the log starts over if any were missed.
+        """
+        sequence = json_data.setdefault(SEQUENCE_KEY, self.sequence + 1)
+        if sequence != self.sequence + 1:
+            self.updates.clear()
+        self.sequence = sequence
+        self.updates.append(json_data)
+        return json_data
+
+    def missed(self, last_seq: int) -> Optional[JSON]:
+        """
+        Returns an update holding everything sent after the update with the given sequence number, or None if that
+        update is no longer in the log, is from before the mission restarted or was never sent.
+        """
+        first = self.sequence - len(self.updates) + 1
+        if not self.updates or not first <= last_seq <= self.sequence:
+            return None
+
+        updates = list(self.updates)[last_seq - first :]
+        known = last_times(updates[0].get("telemetry", {}))
+        latest = updates[-1]
+
+        telemetry: JSON = dict(latest.get("telemetry", {}))
+        samples: dict[str, dict[str, list[Any]]] = {}
+        last_mission_time = updates[0].get("telemetry", {}).get("last_mission_time", -1)
+        for update in updates[1:]:
+            update_telemetry = update.get("telemetry", {})
+            if update_telemetry.get("last_mission_time", -1) < last_mission_time:
+                return None  # The mission restarted, so the client's samples are from another mission
+            last_mission_time = update_telemetry.get("last_mission_time", -1)
+
+            for name, last_time in last_times(update_telemetry).items():
+                block = update_telemetry[name]
+                newest = known.get(name, float("-inf"))
+                if last_time <= newest:
+                    continue
+                missed = samples.setdefault(name, {key: [] for key in block})
+                start = next(i for i, time in enumerate(block[TIME_KEY]) if time > newest)
+                for key, values in block.items():
+                    missed[key].extend(values[start:])
+                known[name] = last_time
+
+        for name in last_times(telemetry):
+            telemetry[name] = samples.get(name, {key: [] for key in telemetry[name]})
+
+        resumed = {**latest, RESUMED_KEY: last_seq}
+        if "telemetry" in latest:
+            resumed["telemetry"] = telemetry
+        return resumed
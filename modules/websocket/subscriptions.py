@@ -0,0 +1,96 @@
+# Per-client subscriptions to parts of the telemetry JSON output
+# Clients choose the telemetry series and status sections they want with query arguments, such as
+# /websocket?series=altitude,gnss&status=mission. Leaving out an argument subscribes to everything it covers, and an
+# empty argument (series=) to nothing. Each distinct subscription is built and serialized once per update.
+#
+# Clients plotting the whole flight may instead ask for each series to be decimated to a number of points, such as
+# the pixel width of their plots, with /websocket?points=800&decimation=lttb (or minmax, the default). Those clients
+# are sent a view of each series since the mission started rather than its last few samples. With a span of mission
+# time in milliseconds as well, such as /websocket?points=240&span=14400000, they are sent an overview of the last
+# span of each series instead, rolled up at the resolution matching the span (see HistoryStore.overview). Clients
+# tell rolled up series from samples by their fields, which are then a count and the min, max and mean of each field.
+
+# Imports
+from dataclasses import dataclass
+from typing import Any, Optional, Self, TypeAlias
+
+from modules.telemetry.decimation import DecimationMethod
+from modules.telemetry.history import HistoryStore
+from modules.websocket.encoding import Encoding, Frame, encode
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+
+
+def parse_names(argument: Optional[str]) -> Optional[frozenset[str]]:
+    """Returns the comma separated names in a query argument, or None if the argument was not given."""
+    if argument is None:
+        return None
+    return frozenset(name.strip() for name in argument.split(",") if name.strip())
+
+
+def select(section: JSON, names: Optional[frozenset[str]]) -> JSON:
+    """Returns the named entries of a section of the telemetry output, or all of them if no names are given."""
+    if names is None:
+        return section
+    return {name: value for name, value in section.items() if name in names}
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """
+    The telemetry series and status sections sent to a client, where None means all of them, and the number of points
+    each series is decimated to, where None means the series are sent as they are.
+    """
+
+    series: Optional[frozenset[str]] = None
+    status: Optional[frozenset[str]] = None
+    points: Optional[int] = None
+    decimation: DecimationMethod = DecimationMethod.MIN_MAX
+    span: Optional[int] = None  # Mission time before the latest sample which is sent, or None for the whole series
+
+    @classmethod
+    def from_query(
+        cls,
+        series: Optional[str],
+        status: Optional[str],
+        points: Optional[int] = None,
+        decimation: DecimationMethod = DecimationMethod.MIN_MAX,
+        span: Optional[int] = None,
+    ) -> Self:
+        """Builds a subscription from the series, status and decimation query arguments of a client."""
+        return cls(parse_names(series), parse_names(status), points, decimation, span)
+
+    def select(self, json_data: JSON, history: Optional[HistoryStore] = None) -> JSON:
+        """
+        Returns the subscribed parts of the telemetry output, along with the ground station details. Series are
+        decimated from the history, if one is given and the subscription asks for it.
+        """
+        decimate = self.points is not None and history is not None
+        if self.series is None and self.status is None and not decimate:
+            return json_data
+
+        selected = dict(json_data)
+        if "status" in json_data:
+            selected["status"] = select(json_data["status"], self.status)
+        if "telemetry" in json_data:
+            selected["telemetry"] = select(json_data["telemetry"], self.series)
+            if decimate:
+                selected["telemetry"] = {
+                    name: self.overview(history, name) or block if isinstance(block, dict) else block  # type: ignore
+                    for name, block in selected["telemetry"].items()
+                }
+        return selected
+
+    def overview(self, history: HistoryStore, name: str) -> Optional[JSON]:
+        """Returns the series decimated for the subscription, over the whole mission or the last span of it."""
+        assert self.points is not None
+        if self.span is None:
+            return history.view(name, self.points, self.decimation)
+        return history.recent(name, self.span, self.points, self.decimation)
+
+    def serialize(
+        self, json_data: JSON, encoding: Encoding = Encoding.JSON, history: Optional[HistoryStore] = None
+    ) -> Frame:
+        """Returns the subscribed parts of the telemetry output, encoded for the client."""
+        return encode(self.select(json_data, history), encoding)
@@ -7,35 +7,81 @@
 # Thomas Selwyn (Devil)
 
 from __future__ import annotations
-import json
+import threading
 from multiprocessing import Queue, Process
 from abc import ABC
+from asyncio import Future
+from queue import Empty
 from typing import Optional, Any
+import json
 import logging
 import os.path
+import time
 import tornado.gen
 import tornado.httpserver
 import tornado.ioloop
 import tornado.web
 import tornado.websocket
+from modules.misc.latency import LATENCY_KEY, LatencyTracker, Stage
+from modules.misc.metrics import PUBLISH_INTERVAL, MetricsCollector, MetricsRegistry, MetricsSnapshot
+from modules.misc.queues import BoundedQueue
+from modules.telemetry.decimation import DecimationMethod
+from modules.telemetry.history import HistoryStore
+from modules.websocket.encoding import Encoding, Frame
+from modules.websocket.relay import RelayServer
+from modules.websocket.resume import ReplayLog
+from modules.websocket.subscriptions import Subscription
 
 # Constants
+WEBSOCKET_PORT: int = 33845
+MAX_CLIENT_LAG: float = 5.0  # Longest time in seconds an update may take to be written before the client is dropped
+SLOW_CLIENT_CLOSE_CODE: int = 1013  # Try again later
+HISTORY_CHUNK_SIZE: int = 1000  # Samples of a series history written to the client at a time
 ws_commands_queue: Queue[Any]
 
 # Logger
 logger = logging.getLogger(__name__)
 
 
+def frame_size(message: Frame) -> int:
+    """Returns the size of a websocket frame's payload in bytes."""
+    return len(message) if isinstance(message, bytes) else len(message.encode("utf-8"))
+
+
 class WebSocketHandler(Process):
     """Handles starting the websocket server process."""
 
-    def __init__(self, telemetry_json_output: Queue[Any], ws_commands: Queue[Any]):
+    def __init__(
+        self,
+        telemetry_json_output: Queue[Any],
+        ws_commands: Queue[Any],
+        stats_queue: Queue[MetricsSnapshot],
+        monitored_queues: list[BoundedQueue[Any]] | None = None,
+        relay_socket: Optional[str] = None,
+        port: int = WEBSOCKET_PORT,
+    ):
         super().__init__()
         global ws_commands_queue
 
         self.telemetry_json_output: Queue[Any] = telemetry_json_output
         ws_commands_queue = ws_commands
 
+        # Metrics published by every process are collected here to be served on /metrics
+        self.metrics: MetricsCollector = MetricsCollector(
+            stats_queue, local=TornadoWSServer.metrics, queues=monitored_queues
+        )
+
+        # Pipeline latency of the payloads whose updates are written to the clients
+        self.latency: LatencyTracker = LatencyTracker()
+
+        # Updates are also published to the relay workers serving spectators, if there are any
+        self.relay_socket: Optional[str] = relay_socket
+        self.port: int = port
+
+        # History of the telemetry series over the session, served on /api/series
+        self.history: HistoryStore = HistoryStore()
+        TornadoWSServer.history = self.history
+
         # Default to test mode
         # ws_commands_queue.put("serial rn2483_radio connect test")
 
@@ -47,6 +93,9 @@ class WebSocketHandler(Process):
         wss = tornado.web.Application(
             [
                 (r"/websocket", TornadoWSServer),
+                (r"/latency", LatencyHandler, {"tracker": self.latency}),
+                (r"/metrics", MetricsHandler, {"collector": self.metrics, "tracker": self.latency}),
+                (r"/api/series/([^/]+)", SeriesHandler, {"history": self.history}),
                 (
                     r"/(.*)",
                     tornado.web.StaticFileHandler,
@@ -58,43 +107,311 @@ class WebSocketHandler(Process):
         )
 
         try:
-            _ = wss.listen(33845)
-            logger.info("HTTP listening on port 33845, accessible at http://localhost:33845")
+            _ = wss.listen(self.port)
+            logger.info(f"HTTP listening on port {self.port}, accessible at http://localhost:{self.port}")
         except OSError:
-            logger.error("Failed to bind to port 33845, ensure there is no other running ground station process!")
+            logger.error(
+                f"Failed to bind to port {self.port}, ensure there is no other running ground station process!"
+            )
             ws_commands_queue.put("shutdown")
 
+        if self.relay_socket is not None:
+            TornadoWSServer.relay = RelayServer(self.relay_socket)
+            TornadoWSServer.relay.listen_unix()
+
         io_loop = tornado.ioloop.IOLoop.current()
-        periodic_callback = tornado.ioloop.PeriodicCallback(
-            lambda: TornadoWSServer.send_message(self.check_for_messages()), 50
-        )
+        latency_callback = tornado.ioloop.PeriodicCallback(self.latency.log_summary, self.latency.log_interval * 1000)
+
+        # The stats queue is emptied as the processes publish to it, so it never overflows between scrapes
+        self.metrics.collect()
+        tornado.ioloop.PeriodicCallback(self.metrics.collect, PUBLISH_INTERVAL * 1000).start()
 
-        periodic_callback.start()
+        # Telemetry updates are pushed to the clients as soon as they arrive
+        TelemetryPublisher(self.telemetry_json_output, self.latency, io_loop, self.history).start()
+        latency_callback.start()
         io_loop.start()
 
-    def check_for_messages(self) -> Optional[str]:
-        """Returns any JSON data that may be on the telemetry JSON output queue."""
 
-        json_data = None
-        while not self.telemetry_json_output.empty():
+class TelemetryPublisher:
+    """
+    Pushes telemetry updates to the websocket clients as soon as they arrive. A reader thread blocks on the
+    telemetry JSON output queue and hands each update to the IOLoop. Updates arriving while the IOLoop is still busy
+    with the last one are coalesced, so only the latest is sent. Every update is still recorded in the history, if
+    one is kept. Putting None on the queue (see stop) ends the reader thread once the updates before it are taken.
+    """
+
+    def __init__(
+        self,
+        telemetry_json_output: Queue[Any],
+        latency: LatencyTracker,
+        io_loop: tornado.ioloop.IOLoop,
+        history: Optional[HistoryStore] = None,
+    ):
+        self.telemetry_json_output: Queue[Any] = telemetry_json_output
+        self.latency: LatencyTracker = latency
+        self.io_loop: tornado.ioloop.IOLoop = io_loop
+        self.history: Optional[HistoryStore] = history
+
+        # Shared between the reader thread and the IOLoop
+        self.lock: threading.Lock = threading.Lock()
+        self.latest: Optional[dict[str, Any]] = None
+        self.pending_timestamps: list[dict[str, int]] = []  # Payloads covered by the latest update
+        self.push_scheduled: bool = False
+
+        self.thread: threading.Thread = threading.Thread(target=self.read, name="telemetry-reader", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Ends the reader thread after the updates already on the queue, and waits for it."""
+        self.telemetry_json_output.put(None)
+        self.thread.join()
+
+    def read(self) -> None:
+        """Waits for telemetry updates and schedules them to be pushed to the clients, until None is read."""
+        stopping = False
+        while not stopping:
             json_data = self.telemetry_json_output.get()
-        return json.dumps(json_data)
+            if json_data is None:
+                return
+            with self.lock:
+                self.take(json_data)
+                # Take whatever else arrived in the meantime, since only the latest is sent
+                while True:
+                    try:
+                        json_data = self.telemetry_json_output.get_nowait()
+                    except Empty:
+                        break
+                    if json_data is None:
+                        stopping = True
+                        break
+                    self.take(json_data)
+
+                if self.push_scheduled:
+                    continue
+                self.push_scheduled = True
+            self.io_loop.add_callback(self.push_messages)
+
+    def take(self, json_data: dict[str, Any]) -> None:
+        """Makes the update the latest one, keeping the pipeline timestamps it carries."""
+        timestamps = json_data.pop(LATENCY_KEY, None)
+        if timestamps is not None:
+            self.pending_timestamps.append(timestamps)
+        if self.history is not None and "telemetry" in json_data:
+            self.history.record(json_data["telemetry"])
+        self.latest = json_data
+
+    def push_messages(self) -> None:
+        """Sends the latest telemetry JSON data to the clients and records the latency of the payloads it covers."""
+
+        with self.lock:
+            json_data, self.latest = self.latest, None
+            pending_timestamps, self.pending_timestamps = self.pending_timestamps, []
+            self.push_scheduled = False
+
+        if json_data is None:
+            return
+        TornadoWSServer.send_update(json_data)
+
+        write_time = time.monotonic_ns()
+        for timestamps in pending_timestamps:
+            timestamps[Stage.WEBSOCKET_WRITE.value] = write_time
+            self.latency.record(timestamps)
+
+
+class LatencyHandler(tornado.web.RequestHandler):
+    """Serves the pipeline latency histograms as JSON."""
+
+    def initialize(self, tracker: LatencyTracker) -> None:
+        self.tracker: LatencyTracker = tracker
+
+    def get(self) -> None:
+        self.write(dict(self.tracker))
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """Serves the metrics of all ground station processes in the Prometheus text exposition format."""
+
+    def initialize(self, collector: MetricsCollector, tracker: LatencyTracker) -> None:
+        self.collector: MetricsCollector = collector
+        self.tracker: LatencyTracker = tracker
+
+    def get(self) -> None:
+        # The snapshots are collected periodically by the websocket server, whether or not anything scrapes them
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(self.collector.render(self.tracker))
+
+
+class SeriesHandler(tornado.web.RequestHandler):
+    """
+    Serves the history of a telemetry series, such as /api/series/altitude?from=0&to=60000&max_points=500. The from
+    and to arguments are mission times in milliseconds and both are optional. Ranges with more samples than
+    max_points are sent as an overview of about that many points (see HistoryStore.overview): rollups with the
+    resolution matching the span, or samples decimated with the method given by the decimation argument (minmax or
+    lttb). Other ranges are sent at full resolution, written and flushed a chunk at a time, so large ranges are
+    streamed with chunked transfer encoding rather than built in memory.
+    """
+
+    def initialize(self, history: HistoryStore) -> None:
+        self.history: HistoryStore = history
+
+    def int_argument(self, name: str) -> Optional[int]:
+        value = self.get_query_argument(name, None)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"Invalid {name} '{value}'")
+
+    async def get(self, name: str) -> None:
+        start, stop, max_points = self.int_argument("from"), self.int_argument("to"), self.int_argument("max_points")
+        if max_points is not None and max_points < 1:
+            raise tornado.web.HTTPError(400, f"Invalid max_points '{max_points}'")
+        try:
+            method = DecimationMethod(self.get_query_argument("decimation", DecimationMethod.MIN_MAX))
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"Invalid decimation '{self.get_query_argument('decimation')}'")
+
+        try:
+            fields = self.history.fields(name)
+        except KeyError:
+            raise tornado.web.HTTPError(404, f"No history of series '{name}'")
+
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        if max_points is not None and self.history.count(name, start, stop) > max_points:
+            # The overview is only about max_points rows, so it is written at once
+            overview = self.history.overview(name, start, stop, max_points, method)
+            if overview is None:
+                raise tornado.web.HTTPError(404, f"No history of series '{name}'")
+            self.write(
+                {
+                    "series": name,
+                    "fields": overview.fields,
+                    "resolution": overview.resolution,
+                    "decimation": overview.decimation,
+                    "points": overview.rows,
+                }
+            )
+            return
+
+        self.write(
+            f'{{"series": {json.dumps(name)}, "fields": {json.dumps(fields)}, "resolution": null, '
+            '"decimation": null, "points": ['
+        )
+        separator = ""
+        while True:
+            rows, start = self.history.rows(name, start, stop, HISTORY_CHUNK_SIZE)
+            if rows:
+                self.write(separator + json.dumps(rows)[1:-1])
+                separator = ","
+            if start is None:
+                break
+            await self.flush()
+        self.write("]}")
 
 
 class TornadoWSServer(tornado.websocket.WebSocketHandler, ABC):
-    """The server which handles websocket connections."""
+    """
+    The server which handles websocket connections. Clients may limit how many updates per second they are sent
+    with the max_rate query argument (e.g. /websocket?max_rate=10), in which case only the latest update is sent
+    once the interval has passed. Clients may also subscribe to only some of the telemetry series and status
+    sections with the series and status query arguments (see the subscriptions module), and choose how updates are
+    encoded with the encoding query argument (see the encoding module). Clients which reconnect may give the
+    sequence number of the last update they received with the last_seq query argument, to be sent only what they
+    missed (see the resume module).
+
+    Each client has at most one update being written to it at a time. Since every update is a full snapshot, updates
+    arriving in the meantime replace the one waiting to be sent, so a slow client only holds back its own updates
+    and buffers at most two. Clients whose write has not finished for too long are disconnected.
+    """
 
     clients: set[TornadoWSServer] = set()
-    last_msg_send: str = ""
+    last_update: Optional[dict[str, Any]] = None
+    replay_log: ReplayLog = ReplayLog()
+    relay: Optional[RelayServer] = None
+    history: Optional[HistoryStore] = None  # Series are decimated from it for clients which ask for it
+    metrics: MetricsRegistry = MetricsRegistry("websocket")
     global ws_commands_queue
 
+    def initialize(self) -> None:
+        self.min_interval: float = 0.0  # Seconds between updates, if the client chose a maximum rate
+        self.last_send_time: float = 0.0
+        self.pending_message: Optional[tuple[Frame, int]] = None  # Latest update waiting to be sent, and its size
+        self.flush_handle: Optional[object] = None
+        self.subscription: Subscription = Subscription()
+        self.encoding: Encoding = Encoding.JSON
+
+        # The update being written to the client
+        self.write_start_time: Optional[float] = None
+        self.buffered_bytes: int = 0
+
+    def get_compression_options(self) -> Optional[dict[str, Any]]:
+        """Enables permessage-deflate for clients which chose the deflate encoding, if they offer the extension."""
+        return {} if self.get_query_argument("encoding", None) == Encoding.DEFLATE else None
+
     def open(self) -> None:
+        encoding = self.get_query_argument("encoding", Encoding.JSON)
+        try:
+            self.encoding = Encoding(encoding)
+        except ValueError:
+            logger.warning(f"Ignoring unknown encoding '{encoding}'")
+
+        max_rate = self.get_query_argument("max_rate", None)
+        if max_rate is not None:
+            try:
+                self.min_interval = 1 / float(max_rate)
+            except (ValueError, ZeroDivisionError):
+                logger.warning(f"Ignoring invalid maximum update rate '{max_rate}'")
+            if self.min_interval < 0:
+                self.min_interval = 0.0
+
+        points, decimation = self.get_query_argument("points", None), self.get_query_argument("decimation", None)
+        span = self.get_query_argument("span", None)
+        try:
+            self.subscription = Subscription.from_query(
+                self.get_query_argument("series", None),
+                self.get_query_argument("status", None),
+                None if points is None else max(1, int(points)),
+                DecimationMethod(decimation or DecimationMethod.MIN_MAX),
+                None if span is None else max(1, int(span)),
+            )
+        except ValueError:
+            logger.warning(f"Ignoring invalid decimation to '{points}' points over '{span}' by '{decimation}'")
+            self.subscription = Subscription.from_query(
+                self.get_query_argument("series", None), self.get_query_argument("status", None)
+            )
+
         TornadoWSServer.clients.add(self)
-        self.send_message(self.last_msg_send)
+        TornadoWSServer.metrics.set("websocket_clients", len(TornadoWSServer.clients))
+        first_update = self.resumed_update() or self.last_update
+        if first_update is not None:
+            message = self.subscription.serialize(first_update, self.encoding, self.history)
+            self.send(message, frame_size(message))
         logger.info("Client connected")
 
+    def resumed_update(self) -> Optional[dict[str, Any]]:
+        """Returns what the client missed since the update it last received, if it is reconnecting and not too late."""
+        last_seq = self.get_query_argument("last_seq", None)
+        if last_seq is None:
+            return None
+        try:
+            resumed = self.replay_log.missed(int(last_seq))
+        except ValueError:
+            logger.warning(f"Ignoring invalid last sequence number '{last_seq}'")
+            return None
+
+        TornadoWSServer.metrics.inc("websocket_resumes_total", result="snapshot" if resumed is None else "resumed")
+        return resumed
+
     def on_close(self) -> None:
-        TornadoWSServer.clients.remove(self)
+        TornadoWSServer.clients.discard(self)
+        TornadoWSServer.metrics.set("websocket_clients", len(TornadoWSServer.clients))
+        if self.flush_handle is not None:
+            tornado.ioloop.IOLoop.current().remove_timeout(self.flush_handle)
+            self.flush_handle = None
+        self.pending_message = None
         logger.info("Client disconnected")
 
     @staticmethod
@@ -106,11 +423,99 @@ class TornadoWSServer(tornado.websocket.WebSocketHandler, ABC):
         """Authenticates clients from any host origin (_ parameter)."""
         return True
 
-    @classmethod
-    def send_message(cls, message: str | None) -> None:
-        if message is None or message == "null":
+    def send(self, message: Frame, size: int) -> None:
+        """
+        Queues the update to be sent to this client, replacing any update still waiting. It is written once the
+        previous update has been written and the interval of the maximum rate has passed.
+        """
+        if self.write_start_time is not None and time.monotonic() - self.write_start_time > MAX_CLIENT_LAG:
+            logger.warning(f"Disconnecting client {self.request.remote_ip}, which is too far behind")
+            TornadoWSServer.metrics.inc("websocket_slow_disconnects_total")
+            self.disconnect()
+            return
+
+        if self.pending_message is not None:
+            TornadoWSServer.metrics.inc("websocket_updates_coalesced_total")
+        self.pending_message = message, size
+        self.flush_update()
+
+    def flush_update(self) -> None:
+        """Writes the update waiting to be sent, if the client is ready for it."""
+        if self.pending_message is None or self.write_start_time is not None or self.flush_handle is not None:
             return
 
-        cls.last_msg_send = message
-        for client in cls.clients:
-            _ = client.write_message(message)
+        wait = self.last_send_time + self.min_interval - time.monotonic()
+        if wait > 0:
+            self.flush_handle = tornado.ioloop.IOLoop.current().call_later(wait, self.on_interval)
+            return
+
+        message, size = self.pending_message
+        self.pending_message = None
+        self.write_update(message, size)
+
+    def on_interval(self) -> None:
+        self.flush_handle = None
+        self.flush_update()
+
+    def write_update(self, message: Frame, size: int) -> None:
+        """Writes an update of the given size in bytes to this client."""
+        try:
+            future = self.write_message(message, binary=isinstance(message, bytes))
+        except tornado.websocket.WebSocketClosedError:
+            return
+
+        self.last_send_time = self.write_start_time = time.monotonic()
+        self.buffered_bytes = size
+        TornadoWSServer.metrics.inc("websocket_messages_sent_total")
+        TornadoWSServer.metrics.inc("websocket_bytes_sent_total", size)
+        future.add_done_callback(self.on_written)
+
+    def on_written(self, future: Future[None]) -> None:
+        """Sends the next update once the last one has been written."""
+        self.write_start_time = None
+        self.buffered_bytes = 0
+        if not future.cancelled() and future.exception() is None:
+            self.flush_update()
+
+    def disconnect(self) -> None:
+        """Closes the connection to the client, which is left out of all further updates."""
+        TornadoWSServer.clients.discard(self)
+        TornadoWSServer.metrics.set("websocket_clients", len(TornadoWSServer.clients))
+        self.pending_message = None
+        self.close(SLOW_CLIENT_CLOSE_CODE, "Too far behind")
+
+    @classmethod
+    def send_update(
+        cls,
+        json_data: dict[str, Any],
+        messages: Optional[dict[tuple[Subscription, Encoding], tuple[Frame, int]]] = None,
+    ) -> None:
+        """
+        Sends the telemetry update to every client, encoding it once for each distinct subscription and encoding.
+
+        Arguments:
+            messages: Messages already encoded for some subscriptions and encodings, with their sizes in bytes.
+        """
+        cls.last_update = cls.replay_log.append(json_data)
+        messages = {} if messages is None else messages
+        if cls.relay is not None:
+            # The relay workers are sent the same JSON text as the clients subscribed to everything
+            key = Subscription(), Encoding.JSON
+            if key not in messages:
+                text = key[0].serialize(json_data)
+                messages[key] = (text, frame_size(text))
+            cls.relay.publish(messages[key][0])  # type: ignore
+
+        for client in list(cls.clients):  # Slow clients are disconnected along the way
+            # Deflate clients share the JSON text, which is compressed for each connection by the extension
+            encoding = Encoding.JSON if client.encoding == Encoding.DEFLATE else client.encoding
+            key = client.subscription, encoding
+            message = messages.get(key)
+            if message is None:
+                serialized = client.subscription.serialize(json_data, encoding, cls.history)
+                message = messages[key] = (serialized, frame_size(serialized))
+            client.send(*message)
+
+        buffered = [client.buffered_bytes for client in cls.clients]
+        cls.metrics.set("websocket_buffered_bytes", sum(buffered))
+        cls.metrics.set("websocket_max_client_buffered_bytes", max(buffered, default=0))
@@ -0,0 +1,162 @@
+# A fake serial connection to an RN2483 radio for testing the serial code without hardware
+# Time is simulated: every command takes a fixed time for the radio to process, and packets only get received if the
+# radio is listening when they arrive over the air.
+
+# Imports
+from bisect import insort
+from collections import deque
+from serial import SerialException
+
+# Constants
+COMMAND_TIME: float = 0.005  # Time for a command to be sent over UART and processed by the radio, in seconds
+RESET_TIME: float = 0.1  # Time for the radio to reboot after a reset, in seconds
+TEST_PAYLOAD: str = "564133494E490000000C010100000000"
+
+
+class FakeRN2483Serial:
+    """A fake serial connection to an RN2483 radio, which receives packets at a fixed interval after a start time."""
+
+    def __init__(
+        self,
+        packet_interval: float = 0.1,
+        packets: int = 0,
+        start_time: float = 0.1,
+        payload: str = TEST_PAYLOAD,
+        command_time: float = COMMAND_TIME,
+        latency: float = 0.0,
+        timeout: float = 1.0,
+        disconnect_time: float | None = None,
+    ) -> None:
+        self.timeout: float = timeout
+        self.command_time: float = command_time
+        self.latency: float = latency  # Time for data to cross the USB to serial adapter in each direction
+        self.disconnect_time: float | None = disconnect_time  # Time at which the device gets unplugged
+        self.closed: bool = False
+        self.payload: str = payload
+
+        self.clock: float = 0.0  # Simulated time
+        self.busy_until: float = 0.0  # The radio processes one command at a time
+        self.listening_since: float | None = None
+        self.packet_times: deque[float] = deque(start_time + packet_interval * i for i in range(packets))
+        self.replies: list[tuple[float, bytes]] = []  # Sorted by time
+
+        self.commands: list[str] = []
+        self.packets_lost: int = 0
+        self.settings: dict[str, str] = {}
+        self.partial_command: bytes = b""
+        self.output: bytearray = bytearray()  # Bytes output by the radio which haven't been read yet
+
+    @property
+    def done(self) -> bool:
+        """True once every packet has either been delivered or lost."""
+        return not self.packet_times
+
+    def check_connected(self) -> None:
+        if self.disconnect_time is not None and self.clock >= self.disconnect_time:
+            raise SerialException("device reports readiness to read but returned no data (device disconnected?)")
+
+    def close(self) -> None:
+        self.closed = True
+
+    def flush(self) -> None:
+        pass
+
+    def write(self, data: bytes) -> int:
+        self.check_connected()
+        self.partial_command += data
+        while b"\r\n" in self.partial_command:
+            command, self.partial_command = self.partial_command.split(b"\r\n", 1)
+            self.execute(command.decode("utf-8"))
+        return len(data)
+
+    def execute(self, command: str) -> None:
+        """Simulates the radio processing a command, scheduling its reply."""
+        self.commands.append(command)
+        done_time = max(self.clock + self.latency, self.busy_until) + self.command_time
+        if command == "sys reset":
+            done_time += RESET_TIME
+        self.busy_until = done_time
+
+        words = command.split(" ")
+        match words:
+            case ["radio", "rx", _]:
+                self.listening_since = done_time
+                reply = "ok"
+            case ["radio", "rxstop"]:
+                self.receive_until(done_time)
+                self.listening_since = None
+                reply = "ok"
+            case ["radio", "get", "snr"]:
+                reply = "7"
+            case ["radio", "get", "rssi"]:
+                reply = "-60"
+            case ["radio", "get", setting]:
+                reply = self.settings.get(setting, "0")
+            case ["radio", "set", setting, value]:
+                self.settings[setting] = value
+                reply = "ok"
+            case ["sys", "reset"]:
+                self.settings.clear()
+                reply = "RN2483 1.0.5 Oct 31 2018 15:06:52"
+            case _:
+                reply = "ok"
+        insort(self.replies, (done_time + self.latency, f"{reply}\r\n".encode("utf-8")), key=lambda r: r[0])
+
+    def receive_until(self, time: float) -> None:
+        """Receives the packets which arrive up until the given time, queueing them in order with the replies."""
+        while self.packet_times and self.packet_times[0] <= time:
+            packet_time = self.packet_times.popleft()
+            if self.listening_since is None or self.listening_since > packet_time:
+                self.packets_lost += 1
+                continue
+            self.listening_since = None
+            insort(self.replies, (packet_time, self.rx_line()), key=lambda r: r[0])
+
+    def rx_line(self) -> bytes:
+        return f"radio_rx  {self.payload}\r\n".encode("utf-8")
+
+    def next_event(self) -> bytes:
+        """Returns the next line output by the radio within the read timeout, advancing the simulated clock."""
+        deadline = self.clock + self.timeout
+
+        while True:
+            reply_time = self.replies[0][0] if self.replies else float("inf")
+            packet_time = self.packet_times[0] if self.packet_times else float("inf")
+
+            if min(reply_time, packet_time) > deadline:
+                self.clock = deadline
+                return b""
+
+            if reply_time <= packet_time:
+                time, line = self.replies.pop(0)
+                self.clock = max(self.clock, time)
+                return line
+
+            _ = self.packet_times.popleft()
+            if self.listening_since is None or self.listening_since > packet_time:
+                self.packets_lost += 1  # Nobody was listening
+                continue
+
+            self.listening_since = None
+            self.clock = max(self.clock, packet_time)
+            return self.rx_line()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.output)
+
+    def read(self, size: int = 1) -> bytes:
+        self.check_connected()
+        if not self.output:
+            self.output += self.next_event()
+        data = bytes(self.output[:size])
+        del self.output[:size]
+        return data
+
+    def readline(self) -> bytes:
+        if not self.output:
+            return self.next_event()
+        end = self.output.find(b"\n") + 1 or len(self.output)
+        line = bytes(self.output[:end])
+        del self.output[:end]
+        return line
@@ -40,3 +40,9 @@ def test_temperature_data_block(temperature_data_content: bytes) -> None:
 
     assert tdb.mission_time == 0
     assert tdb.temperature == 22000
+
+
+def test_data_block_encoding(pressure_data_content: bytes, temperature_data_content: bytes) -> None:
+    """Test that data blocks are encoded back to the bytes they were parsed from."""
+    assert PressureDB.from_bytes(pressure_data_content).to_bytes() == pressure_data_content
+    assert TemperatureDB.from_bytes(temperature_data_content).to_bytes() == temperature_data_content
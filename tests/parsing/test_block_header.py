@@ -131,3 +131,9 @@ def test_parsing_header1_invalid_destination(header1_invalid_destination: str):
         InvalidHeaderFieldValueError, match="Invalid BlockHeader field: 5 is not a valid value for DeviceAddress"
     ):
         _ = BlockHeader.from_hex(header1_invalid_destination)
+
+
+def test_header_encoding(header1: str, header2: str, header3: str):
+    """Ensure that block headers are encoded back to the hex they were parsed from."""
+    for header in (header1, header2, header3):
+        assert BlockHeader.from_hex(header).to_hex() == header.upper()
@@ -71,3 +71,9 @@ def test_linguini_header_invalid_src_addr(linguini_header_invalid_src_addr: str)
         InvalidHeaderFieldValueError, match="Invalid PacketHeader field: 2 is not a valid value for DeviceAddress"
     ):
         _ = PacketHeader.from_hex(linguini_header_invalid_src_addr)
+
+
+def test_header_encoding(linguini_header: str, zeta_header: str, devil_header: str) -> None:
+    """Test that packet headers are encoded back to the hex they were parsed from."""
+    for header in (linguini_header, zeta_header, devil_header):
+        assert PacketHeader.from_hex(header).to_hex() == header.upper()
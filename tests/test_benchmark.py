@@ -0,0 +1,32 @@
+# Tests for the websocket load test
+import pytest
+import tornado.testing
+
+import modules.websocket.benchmark as benchmark
+from modules.websocket.benchmark import run_benchmark, synthetic_update
+
+
+def test_synthetic_update() -> None:
+    """Synthetic updates hold the last few samples of every series of the telemetry output."""
+    update = synthetic_update(30, buffer_size=20)
+    assert update["telemetry"]["last_mission_time"] == 3000
+    assert update["telemetry"]["altitude"]["mission_time"] == list(range(1100, 3100, 100))
+    assert len(update["telemetry"]["gnss"]["latitude"]) == 20
+    assert synthetic_update(0, buffer_size=20)["telemetry"]["altitude"]["mission_time"] == [0]
+
+
+def test_benchmark_report(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Every step of the benchmark measures the updates which reached its clients."""
+    monkeypatch.setattr(benchmark, "DRAIN_TIME", 0.2)
+    sock, port = tornado.testing.bind_unused_port()
+    sock.close()
+
+    report = run_benchmark([1, 3], rate=50, duration=0.5, port=port)
+    assert report["parameters"]["rate"] == 50
+    assert [step["clients"] for step in report["steps"]] == [1, 3]
+    for step in report["steps"]:
+        assert step["updates_sent"] > 0
+        assert step["messages_received"] > 0
+        assert 0 < step["delivery_ratio"] <= 1
+        assert 0 < step["latency_p50_ms"] <= step["latency_p99_ms"] <= step["latency_max_ms"]
+        assert step["server_rss_bytes"] > 0
@@ -0,0 +1,160 @@
+# Tests for capturing the raw output of the RN2483 radio and re-injecting it
+from pathlib import Path
+from queue import Queue
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+import modules.serial.serial_manager as serial_manager
+from modules.misc.config import CaptureParameters, QueueParameters, QueuePolicy
+from modules.misc.latency import TimestampedPayload
+from modules.misc.queues import BoundedQueue
+from modules.serial.capture import (
+    CAPTURE_MAGIC,
+    CaptureFormatError,
+    CaptureWriter,
+    capture_replay_process,
+    read_capture,
+    replay_lines,
+)
+from modules.serial.rn2483_framer import LineKind, RadioLine, RN2483Framer
+from modules.serial.serial_manager import SerialManager
+from tests.fake_rn2483 import TEST_PAYLOAD
+
+RAW_OUTPUT: bytes = f"ok\r\nradio_rx  {TEST_PAYLOAD}\r\nradio_err\r\n-7\r\nradio_rx  {TEST_PAYLOAD}\r\n".encode()
+
+
+@pytest.fixture
+def capture_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Writes captures to a temporary directory."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path.joinpath("captures")
+
+
+def capture(raw: bytes, parameters: CaptureParameters) -> CaptureWriter:
+    """Captures the raw radio output through the framer tap, fed one byte at a time."""
+    writer = CaptureWriter(parameters)
+    framer = RN2483Framer(tap=writer.write)
+    for i in range(len(raw)):
+        framer.feed(raw[i : i + 1])
+        while framer.pop_line() is not None:
+            pass
+    writer.close()
+    return writer
+
+
+def test_tap_sees_raw_lines() -> None:
+    """The tap is given every line without its line ending, in order and with increasing read times."""
+    tapped: list[tuple[int, bytes]] = []
+    framer = RN2483Framer(tap=lambda time_ns, line: tapped.append((time_ns, line)))
+    framer.feed(RAW_OUTPUT)
+    while framer.pop_line() is not None:
+        pass
+
+    assert [line for _, line in tapped] == RAW_OUTPUT.split(b"\r\n")[:-1]
+    assert all(time_ns > 0 for time_ns, _ in tapped)
+
+
+def test_capture_round_trip(capture_dir: Path) -> None:
+    """Re-injecting a capture produces the same lines the framer classified live."""
+    writer = capture(RAW_OUTPUT, CaptureParameters(enabled=True))
+    assert writer.lines_written == 5
+    assert writer.filepath is not None and writer.filepath.parent == capture_dir
+
+    records = list(read_capture(writer.filepath))
+    assert [line for _, line in records] == RAW_OUTPUT.split(b"\r\n")[:-1]
+    assert [time_ns for time_ns, _ in records] == sorted(time_ns for time_ns, _ in records)
+
+    assert list(replay_lines(iter(records), speed=0)) == [
+        RadioLine(LineKind.OK, b"ok"),
+        RadioLine(LineKind.RX, TEST_PAYLOAD.encode()),
+        RadioLine(LineKind.ERR),
+        RadioLine(LineKind.NUMERIC, b"-7"),
+        RadioLine(LineKind.RX, TEST_PAYLOAD.encode()),
+    ]
+
+
+def test_capture_rotation(capture_dir: Path) -> None:
+    """Full capture files are rotated, and only the newest are kept."""
+    line = f"radio_rx  {TEST_PAYLOAD}\r\n".encode()
+    writer = capture(line * 100, CaptureParameters(enabled=True, max_file_size=len(line) * 10, max_files=3))
+
+    captures = sorted(capture_dir.iterdir())
+    assert len(captures) == 3
+    assert captures[-1] == writer.filepath
+    assert sum(len(list(read_capture(path))) for path in captures) < 100
+
+
+def test_replay_timing() -> None:
+    """Lines are replayed at the original timing divided by the speed."""
+    records = [(5_000_000_000, b"ok"), (5_500_000_000, b"ok"), (7_000_000_000, b"ok")]
+    delays: list[float] = []
+    lines = list(replay_lines(iter(records), speed=2, sleep=delays.append))
+
+    assert len(lines) == 3
+    assert len(delays) == 2
+    assert delays[0] == pytest.approx(0.25, abs=0.01)
+    assert delays[1] == pytest.approx(1.0, abs=0.01)
+
+
+def test_read_truncated_and_invalid(tmp_path: Path) -> None:
+    """A record cut short at the end of a capture is ignored, and other files are rejected."""
+    writer = capture(RAW_OUTPUT, CaptureParameters(enabled=True, directory=str(tmp_path)))
+    assert writer.filepath is not None
+    data = writer.filepath.read_bytes()
+    assert data.startswith(CAPTURE_MAGIC)
+    _ = writer.filepath.write_bytes(data[:-3])
+    assert len(list(read_capture(writer.filepath))) == 4
+
+    not_capture = tmp_path.joinpath("mission.cap")
+    _ = not_capture.write_bytes(b"not a capture")
+    with pytest.raises(CaptureFormatError):
+        _ = list(read_capture(not_capture))
+
+
+def test_replay_process(capture_dir: Path) -> None:
+    """Replaying a capture puts its received packets on the payload queue, like the radio process."""
+    writer = capture(RAW_OUTPUT, CaptureParameters(enabled=True))
+    serial_status: Queue[str] = Queue()
+    payloads: Queue[TimestampedPayload] = Queue()
+    capture_replay_process(serial_status, payloads, str(writer.filepath), speed=0)
+
+    assert [payloads.get_nowait().data for _ in range(payloads.qsize())] == [TEST_PAYLOAD, TEST_PAYLOAD]
+    assert serial_status.get_nowait() == f"rn2483_port {writer.filepath}"
+    assert serial_status.get_nowait() == f"rn2483_connected {writer.filepath} True"
+
+
+def test_reconnect_finished_replay(capture_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A capture replay which has finished by itself can be connected again without disconnecting it first."""
+    monkeypatch.setattr(serial_manager, "signal", lambda *_: None)  # The test process keeps its own SIGTERM handler
+    writer = capture(RAW_OUTPUT, CaptureParameters(enabled=True))
+    queues: list[Queue[Any]] = [Queue() for _ in range(6)]
+    manager = SerialManager(*queues, SimpleNamespace(approved_callsigns={}))  # type: ignore
+
+    replays = []
+    for _ in range(2):
+        manager.parse_rn2483_radio_ws(["connect", "capture", str(writer.filepath), "0"])
+        replay = manager.rn2483_radios[str(writer.filepath)]
+        assert replay not in replays
+        replays.append(replay)
+        replay.join(timeout=10)
+        assert replay.exitcode == 0
+
+    manager.parse_rn2483_radio_ws(["disconnect", str(writer.filepath)])
+    assert manager.rn2483_radios == {}
+    assert queues[0].empty()  # Nothing is reported for a replay which had already finished
+
+
+def test_replay_stalled_telemetry(capture_dir: Path) -> None:
+    """A replay whose payloads telemetry does not take still finishes, leaving the spilled payloads on disk."""
+    writer = capture(RAW_OUTPUT, CaptureParameters(enabled=True))
+    serial_status: Queue[str] = Queue()
+    payloads: BoundedQueue[TimestampedPayload] = BoundedQueue("payloads", QueueParameters(1, QueuePolicy.SPILL))
+    capture_replay_process(serial_status, payloads, str(writer.filepath), speed=0)
+    payloads.close()
+
+    assert payloads.spilled.value == 1
+    assert [serial_status.get_nowait() for _ in range(serial_status.qsize())][-1] == (
+        f"rn2483_connected {writer.filepath} False"
+    )
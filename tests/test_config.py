@@ -5,7 +5,17 @@ __author__ = "Matteo Golin"
 import pytest
 import json
 import os
-from modules.misc.config import CodingRates, Config, RadioParameters, load_config
+from modules.misc.config import (
+    DEFAULT_QUEUES,
+    CaptureParameters,
+    CodingRates,
+    Config,
+    QueueParameters,
+    QueuePolicy,
+    RadioParameters,
+    RelayParameters,
+    load_config,
+)
 
 
 # Fixtures
@@ -290,3 +300,79 @@ def test_load_config(config: dict[str, dict[str, str | int | bool]]):
 
     # Teardown
     os.remove("./test_config.json")
+
+
+# Test queue parameters
+def test_queue_params_default():
+    """Tests that queues are unbounded and blocking by default."""
+    params = QueueParameters()
+    assert params.max_size == 0
+    assert params.policy == QueuePolicy.BLOCK
+
+
+def test_queue_params_json():
+    """Tests that the QueueParameters object's from_json method reads the size and policy."""
+    params = QueueParameters.from_json({"max_size": 10, "policy": "drop_oldest"})
+    assert params.max_size == 10
+    assert params.policy == QueuePolicy.DROP_OLDEST
+
+
+def test_queue_params_invalid_arguments():
+    """Tests that a negative queue size or unknown policy raises a ValueError."""
+
+    with pytest.raises(ValueError):
+        _ = QueueParameters(max_size=-1)
+
+    with pytest.raises(ValueError):
+        _ = QueueParameters.from_json({"policy": "explode"})
+
+
+def test_config_queue_parameters_fallback(callsigns: dict[str, str]):
+    """Tests that queues not given in the config use the default parameters, and unknown queues are unbounded."""
+    config = Config.from_json(
+        {"approved_callsigns": callsigns, "queues": {"telemetry_json_output": {"max_size": 2, "policy": "block"}}}
+    )
+    assert config.queue_parameters("telemetry_json_output") == QueueParameters(2, QueuePolicy.BLOCK)
+    assert config.queue_parameters("rn2483_radio_payloads") == DEFAULT_QUEUES["rn2483_radio_payloads"]
+    assert config.queue_parameters("unknown") == QueueParameters()
+
+
+def test_capture_params_json(callsigns: dict[str, str]):
+    """Tests that capture parameters are read from the config, and capturing is off by default."""
+    assert Config(approved_callsigns=callsigns).capture == CaptureParameters()
+    assert not CaptureParameters().enabled
+
+    config = Config.from_json({"approved_callsigns": callsigns, "capture": {"enabled": True, "max_files": 3}})
+    assert config.capture.enabled
+    assert config.capture.max_files == 3
+    assert config.capture.directory == "captures"
+
+
+def test_capture_params_invalid_arguments():
+    """Tests that non-positive capture file sizes and counts raise a ValueError."""
+
+    with pytest.raises(ValueError):
+        _ = CaptureParameters(max_file_size=0)
+
+    with pytest.raises(ValueError):
+        _ = CaptureParameters(max_files=0)
+
+
+def test_relay_params_json(callsigns: dict[str, str]):
+    """Tests that relay parameters are read from the config, and relaying is off by default."""
+    assert Config(approved_callsigns=callsigns).relay == RelayParameters()
+    assert RelayParameters().workers == 0
+
+    config = Config.from_json({"approved_callsigns": callsigns, "relay": {"workers": 4}})
+    assert config.relay.workers == 4
+    assert config.relay.port == 33846
+
+
+def test_relay_params_invalid_arguments():
+    """Tests that negative worker counts and out of range ports raise a ValueError."""
+
+    with pytest.raises(ValueError):
+        _ = RelayParameters(workers=-1)
+
+    with pytest.raises(ValueError):
+        _ = RelayParameters(port=70_000)
@@ -0,0 +1,58 @@
+# Tests for the decimation of the telemetry series
+import math
+
+import pytest
+
+from modules.telemetry.decimation import DecimationMethod, SeriesDecimator, decimate, lttb, min_max
+
+
+def wave(samples: int) -> list[list[float]]:
+    """Returns rows of a sine wave with a single spike, as a peak decimation must not lose."""
+    rows = [[t, math.sin(t / 50), math.cos(t / 50)] for t in range(samples)]
+    rows[samples // 3][1] = 100.0
+    return rows
+
+
+def test_min_max_keeps_peaks() -> None:
+    """The lowest and highest samples of every field are kept, in time order, within the number of points."""
+    rows = wave(10_000)
+    selected = min_max(rows, 200)
+    assert len(selected) <= 200
+    assert [row[0] for row in selected] == sorted({row[0] for row in selected})
+    assert max(row[1] for row in selected) == 100.0
+    assert min(row[2] for row in selected) == min(row[2] for row in rows)
+
+
+def test_lttb_keeps_ends() -> None:
+    """LTTB picks exactly the number of points asked for, always keeping the first and last samples."""
+    rows = wave(10_000)
+    selected = lttb(rows, 100)
+    assert len(selected) == 100
+    assert selected[0] is rows[0]
+    assert selected[-1] is rows[-1]
+    assert max(row[1] for row in selected) == 100.0
+
+
+@pytest.mark.parametrize("method", list(DecimationMethod))
+def test_short_series_unchanged(method: DecimationMethod) -> None:
+    rows = wave(50)
+    assert decimate(rows, 100, method) == rows
+
+
+@pytest.mark.parametrize("method", list(DecimationMethod))
+def test_decimator_views(method: DecimationMethod) -> None:
+    """Views of a growing series stay within their points and span the whole series, with bounded memory."""
+    decimator = SeriesDecimator(buckets=64)
+    rows = wave(20_000)
+    for i, row in enumerate(rows, start=1):
+        decimator.add(row)
+        if i % 997 == 0 or i == len(rows):
+            view = decimator.view(50, method)
+            assert len(view) <= 50
+            assert view[0][0] == 0
+            assert view[-1][0] == i - 1
+
+    assert len(decimator.buckets) <= 64
+    assert len(decimator.closed_rows) <= 64 * 4
+    if method == DecimationMethod.MIN_MAX:
+        assert max(row[1] for row in decimator.view(50, method)) == 100.0
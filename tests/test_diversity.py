@@ -0,0 +1,102 @@
+# Tests for merging the packets received by several RN2483 radios
+import random
+
+import modules.telemetry.json_packets as jsp
+from modules.serial.serial_rn2483_emulator import FlightEmulator
+from modules.telemetry.diversity import PacketDeduplicator, packet_key
+from modules.telemetry.v1.block import PacketHeader
+
+
+def test_packet_key() -> None:
+    """Packets are identified by call sign and packet number, read straight from the header."""
+    flight = FlightEmulator("VA3INI", packet_rate=10)
+    packets = [flight.next_packet() for _ in range(3)]
+
+    keys = [packet_key(packet) for packet in packets]
+    assert [key[1] for key in keys if key is not None] == [
+        PacketHeader.from_hex(packet).packet_num for packet in packets
+    ]
+    assert all(key is not None and key[0].startswith(b"VA3INI") for key in keys)
+    assert packet_key(FlightEmulator("VE3XYZ", packet_rate=10).next_packet()) != keys[0]
+
+    assert packet_key("ABCD") is None
+    assert packet_key("not hexadecimal" * 4) is None
+
+
+def test_deduplicator_window() -> None:
+    """Copies are recognized from other radios while the packet is recent, and never from the same radio."""
+    deduplicator = PacketDeduplicator(window=2.0, max_packets=3)
+    assert not deduplicator.is_duplicate((b"VA3INI", 1), "A", now=0.0)
+    assert deduplicator.is_duplicate((b"VA3INI", 1), "B", now=0.1)
+    assert not deduplicator.is_duplicate((b"VA3INI", 1), "A", now=0.2)
+    assert not deduplicator.is_duplicate((b"VE3XYZ", 1), "B", now=0.3)
+
+    assert not deduplicator.is_duplicate((b"VA3INI", 2), "A", now=0.4)
+    assert not deduplicator.is_duplicate((b"VA3INI", 2), "B", now=3.0)  # Forgotten after the window
+    for packet_num in range(3, 6):
+        assert not deduplicator.is_duplicate((b"VA3INI", packet_num), "A", now=3.1)
+    assert not deduplicator.is_duplicate((b"VA3INI", 3), "B", now=3.2)  # Forgotten beyond the most packets
+
+
+def test_single_receiver_restarts() -> None:
+    """With one radio, a flight computer starting its packet numbers over is never mistaken for copies."""
+    deduplicator = PacketDeduplicator()
+    for _ in range(2):
+        flight = FlightEmulator("VA3INI", packet_rate=10)
+        for _ in range(100):
+            key = packet_key(flight.next_packet())
+            assert key is not None
+            assert not deduplicator.is_duplicate(key, "/dev/ttyUSB0")
+
+
+def test_restart_forgets_old_packets() -> None:
+    """When the packet numbers of a radio go back, the packets from before the restart are forgotten."""
+    deduplicator = PacketDeduplicator()
+    for packet_num in range(100):
+        for receiver, delay in (("A", 0.0), ("B", 0.01)):
+            _ = deduplicator.is_duplicate((b"VA3INI", packet_num), receiver, now=packet_num / 100 + delay)
+
+    # Both radios hear the packets after the restart, in either order, and each is delivered once
+    delivered = []
+    for packet_num in range(10):
+        now = 1.0 + packet_num / 100
+        for receiver, arrival in (("A", now), ("B", now + 0.01)) if packet_num % 2 else (("B", now), ("A", now + 0.01)):
+            if not deduplicator.is_duplicate((b"VA3INI", packet_num), receiver, now=arrival):
+                delivered.append(packet_num)
+    assert delivered == list(range(10))
+
+
+def test_merge_fills_gaps() -> None:
+    """Packets lost by one radio are filled in from the other, and each packet is delivered once."""
+    flight = FlightEmulator("VA3INI", packet_rate=10)
+    packets = [flight.next_packet() for _ in range(200)]
+    rng = random.Random(1)
+
+    # Each radio loses a different 20% of the packets, and the second one delivers its copies a little later
+    heard = {port: [packet for packet in packets if rng.random() > 0.2] for port in ("/dev/ttyUSB0", "/dev/ttyUSB1")}
+    arrivals = [(i, "/dev/ttyUSB0", packet) for i, packet in enumerate(heard["/dev/ttyUSB0"])]
+    arrivals += [(i + 3, "/dev/ttyUSB1", packet) for i, packet in enumerate(heard["/dev/ttyUSB1"])]
+    arrivals.sort(key=lambda arrival: arrival[0])
+
+    deduplicator = PacketDeduplicator()
+    radio = jsp.RN2483RadioData()
+    for port in heard:
+        _ = radio.receiver(port)  # Radios are added when they connect, before receiving
+    merged: list[str] = []
+    for _, port, packet in arrivals:
+        key = packet_key(packet)
+        assert key is not None
+        duplicate = deduplicator.is_duplicate(key, port)
+        radio.record_packet(port, duplicate)
+        if not duplicate:
+            merged.append(packet)
+
+    either = set(heard["/dev/ttyUSB0"]) | set(heard["/dev/ttyUSB1"])
+    assert len(merged) == len(either) == radio.packets
+    assert set(merged) == either
+    assert radio.duplicates == len(heard["/dev/ttyUSB0"]) + len(heard["/dev/ttyUSB1"]) - len(either)
+
+    receivers = dict(radio)["receivers"]
+    for port, receiver in receivers.items():
+        assert receiver["packets"] == len(heard[port])
+        assert receiver["missed"] == len(either) - len(heard[port])
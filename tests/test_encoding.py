@@ -0,0 +1,98 @@
+# Tests for the encodings of the updates sent to the websocket clients
+import json
+import random
+from array import array
+from typing import Any
+
+import pytest
+
+from modules.websocket.encoding import ARRAY_TYPE_CODES, Encoding, decode_binary, encode, encode_binary
+
+UPDATE: dict[str, Any] = {
+    "org": "CU InSpace",
+    "status": {"mission": {"name": "", "state": 0}, "replay": {"mission_list": [{"name": "a", "length": 3}]}},
+    "telemetry": {
+        "altitude": {
+            "mission_time": list(range(10_000, 10_100)),
+            "metres": [i * 12.25 for i in range(100)],
+            "feet": [i * 40.25 for i in range(100)],
+        },
+        "gnss": {"mission_time": [], "fix": [True, False]},
+    },
+}
+
+
+def test_binary_round_trip() -> None:
+    """Binary frames decode back to the same update, with numeric lists sent as typed arrays."""
+    frame = encode_binary(UPDATE)
+    assert decode_binary(frame) == UPDATE
+
+    header_length = int.from_bytes(frame[4:8], "little")
+    header = json.loads(frame[8 : 8 + header_length])
+    assert header["telemetry"]["altitude"]["mission_time"] == {"$array": 0}
+    assert header["telemetry"]["gnss"] == UPDATE["telemetry"]["gnss"]  # Not numeric arrays
+    assert header["status"] == UPDATE["status"]
+    assert [descriptor[0] for descriptor in header["$arrays"]] == ["i4", "f8", "f8"]
+
+
+def test_binary_arrays_aligned() -> None:
+    """Arrays start on an 8 byte boundary, so they can be viewed as typed arrays without copying."""
+    for name in ("", "x", "xy", "xyz"):
+        # An odd number of 4 byte integers comes before the 8 byte floats
+        update = {"org": name, "telemetry": {"gnss": {"mission_time": [1, 2, 3], "latitude": [45.3876543] * 3}}}
+        frame = encode_binary(update)
+        header = json.loads(frame[8 : 8 + int.from_bytes(frame[4:8], "little")])
+        for type_name, offset, length in header["$arrays"]:
+            assert offset % 8 == 0
+            values = array(ARRAY_TYPE_CODES[type_name])
+            values.frombytes(frame[offset : offset + length * values.itemsize])
+            assert len(values) == length
+        assert decode_binary(frame) == update
+
+
+def test_binary_lossless() -> None:
+    """Numbers which no 32 bit float can represent exactly decode to the same values."""
+    rng = random.Random(0)
+    gnss = {
+        "mission_time": [rng.randrange(2**31) for _ in range(100)],
+        "latitude": [45.3876543 + rng.uniform(-0.01, 0.01) for _ in range(100)],
+        "longitude": [-75.6987654 + rng.uniform(-0.01, 0.01) for _ in range(100)],
+        "altitude": [1234.567, 0.1, -1e-9, 1e300, 3],
+    }
+    decoded = decode_binary(encode_binary({"telemetry": {"gnss": gnss}}))["telemetry"]["gnss"]
+    assert decoded == gnss
+    assert decoded["latitude"][0] == gnss["latitude"][0]
+
+
+def test_binary_smaller_than_json() -> None:
+    """Full precision sensor readings are smaller as typed arrays than as JSON text."""
+    rng = random.Random(0)
+    update = {
+        "telemetry": {
+            "gnss": {
+                "mission_time": list(range(100_000, 101_000)),
+                "latitude": [45.3876543 + rng.uniform(-0.01, 0.01) for _ in range(1000)],
+                "longitude": [-75.6987654 + rng.uniform(-0.01, 0.01) for _ in range(1000)],
+            }
+        }
+    }
+    assert len(encode_binary(update)) < len(json.dumps(update)) * 0.6
+
+
+def test_large_integers_stay_json() -> None:
+    """Integers which do not fit in 32 bits are left in the JSON header rather than converted to floats."""
+    update = {"telemetry": {"x": {"mission_time": [2**40, 1]}}}
+    frame = encode_binary(update)
+    assert decode_binary(frame) == update
+    assert b"1099511627776" in frame
+
+
+def test_invalid_frame() -> None:
+    with pytest.raises(ValueError):
+        _ = decode_binary(b"JSON" + bytes(8))
+
+
+@pytest.mark.parametrize("encoding", [Encoding.JSON, Encoding.DEFLATE])
+def test_text_encodings(encoding: Encoding) -> None:
+    """JSON and deflate clients are sent JSON text, which the websocket extension compresses for deflate."""
+    assert json.loads(encode(UPDATE, encoding)) == UPDATE
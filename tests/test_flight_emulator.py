@@ -0,0 +1,77 @@
+# Tests for the emulated flight used as the test serial port
+import time
+
+import pytest
+
+from modules.misc.config import Config
+from modules.serial.serial_rn2483_emulator import FlightEmulator, FlightPhase, FlightProfile
+from modules.telemetry.telemetry_utils import parse_rn2483_transmission
+
+
+@pytest.fixture
+def config() -> Config:
+    return Config(approved_callsigns={"VA3INI": "Matteo Golin"})
+
+
+def test_packets_parse(config: Config) -> None:
+    """Emulated packets are valid v1 packets with a block for each sensor."""
+    emulator = FlightEmulator(packet_rate=10)
+    for packet_num in range(50):
+        transmission = parse_rn2483_transmission(emulator.next_packet(), config)
+        assert transmission is not None
+        assert transmission.packet_header.callsign == "VA3INI"
+        assert transmission.packet_header.packet_num == packet_num
+        assert [block.block_name for block in transmission.blocks] == [
+            "altitude",
+            "temperature",
+            "pressure",
+            "humidity",
+        ]
+        assert transmission.blocks[0].block_contents["mission_time"] == packet_num * 100
+
+
+def test_deterministic() -> None:
+    """The same seed produces the same flight."""
+    first = FlightEmulator(seed=5)
+    second = FlightEmulator(seed=5)
+    other = FlightEmulator(seed=6)
+
+    packets = [first.next_packet() for _ in range(100)]
+    assert packets == [second.next_packet() for _ in range(100)]
+    assert packets != [other.next_packet() for _ in range(100)]
+
+
+def test_flight_phases() -> None:
+    """The flight goes through each phase in order, reaching apogee before landing back on the ground."""
+    profile = FlightProfile()
+    times = [i / 10 for i in range(int(profile.landing_time * 10) + 20)]
+    phases = [profile.phase(t) for t in times]
+
+    assert list(dict.fromkeys(phases)) == list(FlightPhase)
+    assert max(profile.altitude(t) for t in times) == pytest.approx(profile.apogee_altitude, rel=1e-3)
+    assert profile.altitude(times[-1]) == 0
+
+
+def test_altitude_follows_profile(config: Config) -> None:
+    """Encoded altitudes follow the flight profile, within the sensor noise."""
+    emulator = FlightEmulator(packet_rate=1)
+    for _ in range(60):
+        t = emulator.packet_num
+        transmission = parse_rn2483_transmission(emulator.next_packet(), config)
+        assert transmission is not None
+        altitude = transmission.blocks[0].block_contents["altitude"]["metres"]  # type: ignore
+        assert altitude == pytest.approx(emulator.profile.altitude(t), abs=5)
+
+
+def test_invalid_packet_rate() -> None:
+    with pytest.raises(ValueError):
+        _ = FlightEmulator(packet_rate=0)
+
+
+def test_high_rate() -> None:
+    """Packets can be generated at thousands of packets per second."""
+    emulator = FlightEmulator(packet_rate=5000)
+    start = time.perf_counter()
+    for _ in range(5000):
+        _ = emulator.next_packet()
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,131 @@
+# Tests for the history of the telemetry series and the API serving it
+import asyncio
+import json
+from typing import Any, Optional
+
+import pytest
+import tornado.httpclient
+import tornado.httpserver
+import tornado.testing
+import tornado.web
+
+import modules.websocket.websocket as websocket
+from modules.telemetry.history import HistoryStore
+from modules.websocket.websocket import SeriesHandler
+
+
+def telemetry(times: list[int], last_mission_time: int | None = None) -> dict[str, Any]:
+    """Returns telemetry output holding the given samples of the altitude series."""
+    return {
+        "last_mission_time": times[-1] if last_mission_time is None else last_mission_time,
+        "altitude": {"mission_time": times, "metres": [t / 10 for t in times], "feet": [t / 3 for t in times]},
+        "gnss": {"mission_time": [], "latitude": [], "longitude": []},
+    }
+
+
+def feed(history: HistoryStore, samples: int, buffer_size: int = 20) -> None:
+    """Records output updates as the telemetry process sends them, each with the last few samples."""
+    for i in range(1, samples + 1):
+        history.record(telemetry(list(range(max(0, i - buffer_size), i))))
+
+
+def test_history_keeps_every_sample() -> None:
+    """Samples beyond the telemetry buffer are kept, each only once."""
+    history = HistoryStore()
+    feed(history, 500)
+
+    rows, following = history.rows("altitude")
+    assert following is None
+    assert [row[0] for row in rows] == list(range(500))
+    assert rows[100] == [100, 10.0, 100 / 3]
+    assert history.fields("altitude") == ["mission_time", "metres", "feet"]
+    assert history.count("gnss") == 0
+
+
+def test_history_ranges() -> None:
+    """Ranges are inclusive of both ends, and are read in pieces by continuing from the returned mission time."""
+    history = HistoryStore()
+    feed(history, 100)
+    assert history.count("altitude", 10, 19) == 10
+    assert history.count("altitude", 200) == 0
+
+    rows, following = history.rows("altitude", 10, 49, limit=15)
+    assert [row[0] for row in rows] == list(range(10, 25))
+    assert following == 25
+
+    rows, following = history.rows("altitude", 90, 99, limit=4)
+    assert [row[0] for row in rows] == [90, 91, 92, 93]
+    rows, following = history.rows("altitude", following, 99, limit=4)
+    assert [row[0] for row in rows] == [94, 95, 96, 97]
+    assert history.rows("altitude", following, 99, limit=4) == ([[98, 9.8, 98 / 3], [99, 9.9, 33.0]], None)
+
+
+def test_history_bounded() -> None:
+    """Only the most recent samples up to the maximum are kept."""
+    history = HistoryStore(max_samples=160)
+    feed(history, 1000)
+    assert 160 <= history.count("altitude") <= 170
+    assert history.rows("altitude")[0][-1][0] == 999
+
+
+def test_history_restarts_with_mission() -> None:
+    """The history starts over when the mission time goes back for a new mission."""
+    history = HistoryStore()
+    feed(history, 50)
+    history.record(telemetry([0, 1], last_mission_time=1))
+    assert [row[0] for row in history.rows("altitude")[0]] == [0, 1]
+
+
+@pytest.mark.parametrize(
+    "query, times, decimation",
+    [
+        ("", list(range(5000)), None),
+        ("?from=100&to=199", list(range(100, 200)), None),
+        ("?from=100&to=199&max_points=100", list(range(100, 200)), None),
+        ("?max_points=100", sorted([*range(0, 5000, 200), *range(199, 5000, 200)]), "minmax"),
+        ("?from=1000&to=1999&max_points=10&decimation=lttb", None, "lttb"),
+    ],
+)
+def test_series_api(
+    monkeypatch: pytest.MonkeyPatch, query: str, times: Optional[list[int]], decimation: Optional[str]
+) -> None:
+    """History ranges are served as JSON, streamed in chunks, or decimated when they have too many samples."""
+    monkeypatch.setattr(websocket, "HISTORY_CHUNK_SIZE", 64)
+    history = HistoryStore()
+    feed(history, 5000)
+
+    async def run() -> tuple[dict[str, Any], int]:
+        sock, port = tornado.testing.bind_unused_port()
+        app = tornado.web.Application([(r"/api/series/([^/]+)", SeriesHandler, {"history": history})])
+        server = tornado.httpserver.HTTPServer(app)
+        server.add_sockets([sock])
+
+        chunks: list[bytes] = []
+        client = tornado.httpclient.AsyncHTTPClient()
+        response = await client.fetch(
+            f"http://localhost:{port}/api/series/altitude{query}", streaming_callback=chunks.append
+        )
+        assert response.code == 200
+
+        with pytest.raises(tornado.httpclient.HTTPClientError) as missing:
+            _ = await client.fetch(f"http://localhost:{port}/api/series/unknown")
+        assert missing.value.code == 404
+        with pytest.raises(tornado.httpclient.HTTPClientError) as invalid:
+            _ = await client.fetch(f"http://localhost:{port}/api/series/altitude?from=soon")
+        assert invalid.value.code == 400
+
+        server.stop()
+        return json.loads(b"".join(chunks)), len(chunks)
+
+    body, chunks = asyncio.run(run())
+    assert body["series"] == "altitude"
+    assert body["fields"] == ["mission_time", "metres", "feet"]
+    assert body["decimation"] == decimation
+    assert body["resolution"] is None
+    if decimation == "lttb":
+        assert len(body["points"]) == 10
+        assert [body["points"][0][0], body["points"][-1][0]] == [1000, 1999]
+        return
+    assert [point[0] for point in body["points"]] == times
+    if decimation is None:
+        assert chunks >= len(times) // 64
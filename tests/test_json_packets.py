@@ -19,6 +19,10 @@ def test_rn2483_radio_data_defaults() -> None:
 
     assert radio_data.connected is False
     assert radio_data.connected_port == ""
+    assert radio_data.rssi == 0
+    assert radio_data.reconnects == 0
+    assert radio_data.downtime == 0.0
+    assert len(radio_data.snr_history) == 0
 
 
 def test_mission_data_defaults() -> None:
@@ -57,9 +61,67 @@ def test_rn2483_radio_data_serialization() -> None:
         "connected_port": "20",
         "connected": True,
         "snr": 0,
+        "rssi": 0,
+        "snr_stats": {"min": 0, "mean": 0.0, "max": 0},
+        "rssi_stats": {"min": 0, "mean": 0.0, "max": 0},
+        "reconnects": 0,
+        "downtime": 0.0,
+        "packets": 0,
+        "duplicates": 0,
+        "receivers": {},
     }
 
 
+def test_rn2483_radio_signal_history() -> None:
+    """Test that link quality samples are kept as a rolling history with statistics."""
+
+    rn2483_radio_data = jsp.RN2483RadioData()
+    for snr in [5, -3, 7]:
+        rn2483_radio_data.record_signal("snr", snr)
+    for rssi in range(jsp.SIGNAL_HISTORY_LENGTH + 10):
+        rn2483_radio_data.record_signal("rssi", -rssi)
+
+    radio = dict(rn2483_radio_data)
+    assert radio["snr"] == 7
+    assert radio["snr_stats"] == {"min": -3, "mean": 3.0, "max": 7}
+    assert radio["rssi"] == -(jsp.SIGNAL_HISTORY_LENGTH + 9)
+    assert radio["rssi_stats"]["max"] == -10  # Oldest samples were dropped
+    assert len(rn2483_radio_data.rssi_history) == jsp.SIGNAL_HISTORY_LENGTH
+
+
+def test_rn2483_radio_receivers() -> None:
+    """Test that each radio keeps its own statistics, which are merged into those of all radios."""
+
+    rn2483_radio_data = jsp.RN2483RadioData()
+    rn2483_radio_data.receiver("/dev/ttyUSB0").connected = True
+    rn2483_radio_data.receiver("/dev/ttyUSB1").reconnects = 2
+    rn2483_radio_data.merge_receivers()
+    assert rn2483_radio_data.connected
+    assert rn2483_radio_data.reconnects == 2
+
+    # The second radio misses a packet, which the first fills in, and delivers the others late
+    rn2483_radio_data.record_packet("/dev/ttyUSB0", duplicate=False)
+    rn2483_radio_data.record_packet("/dev/ttyUSB0", duplicate=False)
+    rn2483_radio_data.record_packet("/dev/ttyUSB1", duplicate=True)
+    rn2483_radio_data.record_signal("snr", 9, "/dev/ttyUSB0")
+    rn2483_radio_data.record_signal("snr", -4, "/dev/ttyUSB1")
+
+    radio = dict(rn2483_radio_data)
+    assert radio["packets"] == 2
+    assert radio["duplicates"] == 1
+    assert radio["snr"] == -4
+    assert radio["receivers"]["/dev/ttyUSB0"]["snr"] == 9
+    assert radio["receivers"]["/dev/ttyUSB0"]["missed"] == 0
+    assert radio["receivers"]["/dev/ttyUSB1"]["snr"] == -4
+    assert radio["receivers"]["/dev/ttyUSB1"]["packets"] == 1
+    assert radio["receivers"]["/dev/ttyUSB1"]["missed"] == 1
+
+    # Radios removed from the mission no longer count
+    rn2483_radio_data.remove_receiver("/dev/ttyUSB1")
+    assert rn2483_radio_data.reconnects == 0
+    assert list(rn2483_radio_data.receivers) == ["/dev/ttyUSB0"]
+
+
 def test_mission_data_serialization() -> None:
     """Test that the serialization of mission data is correct."""
 
@@ -126,6 +188,14 @@ def test_status_data_serialization() -> None:
             "connected": True,
             "connected_port": "20",
             "snr": 5,
+            "rssi": 0,
+            "snr_stats": {"min": 0, "mean": 0.0, "max": 0},
+            "rssi_stats": {"min": 0, "mean": 0.0, "max": 0},
+            "reconnects": 0,
+            "downtime": 0.0,
+            "packets": 0,
+            "duplicates": 0,
+            "receivers": {},
         },
         "replay": {
             "state": jsp.ReplayState.PAUSED.value,
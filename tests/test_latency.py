@@ -0,0 +1,81 @@
+# Tests the latency instrumentation module
+
+# Imports
+from modules.misc.latency import BUCKET_BOUNDS_NS, LatencyHistogram, LatencyTracker, Stage, TimestampedPayload
+
+
+# Histogram tests
+def test_empty_histogram() -> None:
+    """Test that an empty histogram reports zero for all of its statistics."""
+    histogram = LatencyHistogram()
+
+    assert histogram.count == 0
+    assert histogram.mean_ns == 0.0
+    assert histogram.percentile(50) == 0
+
+
+def test_histogram_statistics() -> None:
+    """Test that the histogram keeps track of the count, minimum, maximum and mean latencies."""
+    histogram = LatencyHistogram()
+    for latency in [1_000, 3_000, 5_000]:
+        histogram.record(latency)
+
+    assert histogram.count == 3
+    assert histogram.min_ns == 1_000
+    assert histogram.max_ns == 5_000
+    assert histogram.mean_ns == 3_000
+
+
+def test_histogram_percentile_is_bucket_bound() -> None:
+    """Test that percentiles are estimated as the upper bound of the bucket they fall in."""
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.record(1_500)
+    histogram.record(1_000_000)
+
+    assert histogram.percentile(50) == 2_000
+    assert histogram.percentile(100) == 1_000_000
+
+
+def test_histogram_overflow_bucket() -> None:
+    """Test that latencies beyond the largest bucket bound are still counted."""
+    histogram = LatencyHistogram()
+    histogram.record(BUCKET_BOUNDS_NS[-1] * 4)
+
+    assert histogram.buckets[-1] == 1
+    assert histogram.percentile(99) == BUCKET_BOUNDS_NS[-1] * 4
+
+
+# Tracker tests
+def test_payload_received_stamps_serial_read() -> None:
+    """Test that a newly received payload carries its serial read timestamp."""
+    payload = TimestampedPayload.received("ABCD")
+
+    assert payload.data == "ABCD"
+    assert Stage.SERIAL_READ.value in payload.timestamps
+
+
+def test_tracker_records_stage_deltas() -> None:
+    """Test that each stage records the time elapsed since the previous stamped stage."""
+    tracker = LatencyTracker()
+    tracker.record(
+        {
+            Stage.SERIAL_READ.value: 0,
+            Stage.DEQUEUE.value: 1_000,
+            Stage.PARSE.value: 3_000,
+            Stage.PUBLISH.value: 6_000,
+        }
+    )
+
+    assert tracker.histograms[Stage.DEQUEUE.value].max_ns == 1_000
+    assert tracker.histograms[Stage.PARSE.value].max_ns == 2_000
+    assert tracker.histograms[Stage.TELEMETRY_UPDATE.value].count == 0  # Skipped stages record nothing
+    assert tracker.histograms[Stage.PUBLISH.value].max_ns == 3_000
+    assert tracker.histograms["total"].max_ns == 6_000
+
+
+def test_tracker_serialization() -> None:
+    """Test that the tracker serializes to a dictionary of histograms keyed by stage."""
+    tracker = LatencyTracker()
+
+    assert list(dict(tracker).keys()) == [stage.value for stage in list(Stage)[1:]] + ["total"]
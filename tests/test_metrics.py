@@ -0,0 +1,97 @@
+# Tests the pipeline metrics module
+
+# Imports
+import queue
+from modules.misc.config import load_config
+from modules.misc.latency import LatencyTracker, Stage
+from modules.misc.metrics import MetricsCollector, MetricsRegistry, MetricsSnapshot, format_labels
+from modules.telemetry.telemetry_utils import parse_rn2483_transmission
+
+config = load_config("config.json")
+
+
+# Registry tests
+def test_counter_increments_per_label_set() -> None:
+    """Test that counters are kept separately for each distinct set of labels."""
+    registry = MetricsRegistry("test")
+    registry.inc("blocks_parsed_total", subtype="altitude")
+    registry.inc("blocks_parsed_total", subtype="altitude")
+    registry.inc("blocks_parsed_total", subtype="pressure")
+
+    assert registry.values["blocks_parsed_total"] == {(("subtype", "altitude"),): 2, (("subtype", "pressure"),): 1}
+
+
+def test_gauge_set_overwrites() -> None:
+    """Test that setting a gauge replaces its previous value."""
+    registry = MetricsRegistry("test")
+    registry.set("websocket_clients", 3)
+    registry.set("websocket_clients", 1)
+
+    assert registry.values["websocket_clients"] == {(): 1}
+
+
+def test_snapshot_includes_process_usage() -> None:
+    """Test that snapshots are tagged with the process name and include its CPU time."""
+    process, values = MetricsRegistry("telemetry").snapshot()
+
+    assert process == "telemetry"
+    assert "process_cpu_seconds_total" in values
+
+
+# Rendering tests
+def test_label_values_are_escaped() -> None:
+    """Test that quotes, backslashes and new lines in label values are escaped."""
+    assert format_labels((("error", 'a"b\\c\nd'),)) == '{error="a\\"b\\\\c\\nd"}'
+
+
+def test_collector_renders_latest_snapshot_per_process() -> None:
+    """Test that only the latest snapshot of each process is rendered, labelled with the process name."""
+    stats_queue: queue.Queue[MetricsSnapshot] = queue.Queue()
+    registry = MetricsRegistry("telemetry")
+    registry.inc("packets_received_total", 5)
+    registry.publish(stats_queue)
+    registry.inc("packets_received_total", 2)
+    registry.publish(stats_queue)
+
+    collector = MetricsCollector(stats_queue)
+    collector.collect()
+    output = collector.render()
+
+    assert "# TYPE ground_station_packets_received_total counter" in output
+    assert 'ground_station_packets_received_total{process="telemetry"} 7' in output
+    assert "ground_station_websocket_clients" not in output  # Metrics without samples are omitted
+
+
+def test_latency_rendered_as_histogram() -> None:
+    """Test that latency histograms are rendered with cumulative buckets, a sum and a count."""
+    tracker = LatencyTracker()
+    tracker.record({Stage.SERIAL_READ.value: 0, Stage.DEQUEUE.value: 1_500})
+
+    output = MetricsCollector(queue.Queue()).render(tracker)
+
+    assert 'ground_station_stage_latency_seconds_bucket{stage="dequeue",le="1e-06"} 0' in output
+    assert 'ground_station_stage_latency_seconds_bucket{stage="dequeue",le="2e-06"} 1' in output
+    assert 'ground_station_stage_latency_seconds_bucket{stage="dequeue",le="+Inf"} 1' in output
+    assert 'ground_station_stage_latency_seconds_count{stage="dequeue"} 1' in output
+
+
+# Parsing metrics tests
+def test_parsing_counts_blocks_by_subtype() -> None:
+    """Test that parsing a transmission counts its blocks by subtype."""
+    registry = MetricsRegistry("test")
+    data = "564133494e490000000c010100000000020002000000000026610000020003000000000002c6000002000100000000007c010000"
+    _ = parse_rn2483_transmission(data, config, registry)
+
+    assert registry.values["blocks_parsed_total"] == {
+        (("subtype", "temperature"),): 1,
+        (("subtype", "pressure"),): 1,
+        (("subtype", "altitude"),): 1,
+    }
+
+
+def test_parsing_counts_errors_by_type() -> None:
+    """Test that a transmission with an unsupported encoding version is counted as a parse error."""
+    registry = MetricsRegistry("test")
+    _ = parse_rn2483_transmission("564133494e490000000c000137000000", config, registry)
+
+    assert registry.values["parse_errors_total"] == {(("error", "UnsupportedEncodingVersionError"),): 1}
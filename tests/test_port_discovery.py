@@ -0,0 +1,116 @@
+# Tests for discovering serial ports
+from pathlib import Path
+from queue import Queue
+from types import SimpleNamespace
+
+import pytest
+
+import modules.serial.port_discovery as port_discovery
+from modules.serial.port_discovery import PortInfo, SerialPortScanner, linux_ports, stable_path
+
+
+@pytest.fixture
+def sysfs(tmp_path: Path) -> tuple[Path, Path, Path]:
+    """A fake sysfs tty class directory, udev by-id directory and dev directory with two USB serial ports."""
+    sys_class_tty = tmp_path.joinpath("sys/class/tty")
+    serial_by_id = tmp_path.joinpath("dev/serial/by-id")
+    dev_dir = tmp_path.joinpath("dev")
+    usb_device = tmp_path.joinpath("sys/devices/usb1/1-1")
+    serial_by_id.mkdir(parents=True)
+
+    usb_device.joinpath("1-1:1.0/ttyUSB0").mkdir(parents=True)
+    _ = usb_device.joinpath("product").write_text("CP2102 USB to UART Bridge Controller\n")
+    for name, device in [("ttyUSB0", usb_device.joinpath("1-1:1.0/ttyUSB0")), ("ttyACM0", None), ("ttyS0", None)]:
+        tty = sys_class_tty.joinpath(name)
+        tty.mkdir(parents=True)
+        if device is not None:
+            tty.joinpath("device").symlink_to(device)
+        else:
+            tty.joinpath("device").mkdir()
+        _ = dev_dir.joinpath(name).write_text("")
+
+    serial_by_id.joinpath("usb-Silicon_Labs_CP2102-if00-port0").symlink_to(dev_dir.joinpath("ttyUSB0"))
+    return sys_class_tty, serial_by_id, dev_dir
+
+
+def test_linux_ports(sysfs: tuple[Path, Path, Path]) -> None:
+    """USB serial ports are found with their metadata, and other ttys are ignored."""
+    sys_class_tty, serial_by_id, dev_dir = sysfs
+    ports = linux_ports(sys_class_tty, serial_by_id, dev_dir)
+
+    assert ports == [
+        PortInfo(str(dev_dir.joinpath("ttyACM0"))),
+        PortInfo(
+            str(dev_dir.joinpath("ttyUSB0")),
+            str(serial_by_id.joinpath("usb-Silicon_Labs_CP2102-if00-port0")),
+            "CP2102 USB to UART Bridge Controller",
+        ),
+    ]
+
+
+def test_linux_ports_missing_directories(tmp_path: Path) -> None:
+    assert linux_ports(tmp_path.joinpath("tty"), tmp_path.joinpath("by-id"), tmp_path) == []
+
+
+def test_listed_ports(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ports listed by the operating system are found without being opened, leaving out the macOS call-out nodes."""
+    listed = [
+        SimpleNamespace(device="/dev/tty.usbserial-2", description="FT232R USB UART"),
+        SimpleNamespace(device="/dev/cu.usbserial-2", description="FT232R USB UART"),
+        SimpleNamespace(device="/dev/tty.Bluetooth-Incoming-Port", description="n/a"),
+    ]
+    monkeypatch.setattr(port_discovery.serial.tools.list_ports, "comports", lambda: listed)
+    monkeypatch.setattr(port_discovery.sys, "platform", "darwin")
+
+    assert port_discovery.discover_ports() == [
+        PortInfo("/dev/tty.Bluetooth-Incoming-Port"),
+        PortInfo("/dev/tty.usbserial-2", description="FT232R USB UART"),
+    ]
+
+
+def test_scanner_publishes_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The serial ports are only published when they change."""
+    found: list[PortInfo] = []
+    monkeypatch.setattr(port_discovery, "discover_ports", lambda: list(found))
+    serial_status: Queue[str] = Queue()
+    scanner = SerialPortScanner(serial_status)
+
+    assert not scanner.scan()
+    assert serial_status.empty()
+
+    found.append(PortInfo("/dev/ttyUSB0", "/dev/serial/by-id/usb-radio"))
+    assert scanner.scan()
+    assert serial_status.get_nowait() == "serial_ports ['/dev/ttyUSB0', 'test']"
+
+    assert not scanner.scan()
+    assert serial_status.empty()
+
+
+def test_scanner_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The background thread publishes the ports at start up, and rescans promptly when asked to."""
+    found: list[PortInfo] = []
+    monkeypatch.setattr(port_discovery, "discover_ports", lambda: list(found))
+    serial_status: Queue[str] = Queue()
+    scanner = SerialPortScanner(serial_status, interval=60)
+
+    scanner.start()
+    try:
+        assert serial_status.get(timeout=1) == "serial_ports ['test']"
+
+        found.append(PortInfo("/dev/ttyACM0"))
+        scanner.request_scan()
+        assert serial_status.get(timeout=1) == "serial_ports ['test']"  # Cached ports are published straight away
+        assert serial_status.get(timeout=1) == "serial_ports ['/dev/ttyACM0', 'test']"
+    finally:
+        scanner.stop()
+
+
+def test_stable_path(sysfs: tuple[Path, Path, Path]) -> None:
+    """Devices are reopened through their by-id link when they have one."""
+    _, serial_by_id, dev_dir = sysfs
+
+    assert stable_path(str(dev_dir.joinpath("ttyUSB0")), serial_by_id) == str(
+        serial_by_id.joinpath("usb-Silicon_Labs_CP2102-if00-port0")
+    )
+    assert stable_path(str(dev_dir.joinpath("ttyACM0")), serial_by_id) == str(dev_dir.joinpath("ttyACM0"))
+    assert stable_path("COM3", dev_dir.joinpath("missing")) == "COM3"
@@ -0,0 +1,62 @@
+# Tests the runtime profiling module
+
+# Imports
+import pstats
+from pathlib import Path
+import pytest
+from modules.misc.profiling import RuntimeProfiler
+
+
+def busy_work() -> int:
+    """A function for the profiler to find in its results."""
+    return sum(i * i for i in range(1000))
+
+
+def test_profiler_off_by_default(tmp_path: Path) -> None:
+    """Test that no profiler exists until profiling is started."""
+    profiler = RuntimeProfiler("test", tmp_path)
+
+    assert not profiler.running
+    assert profiler.profile is None
+
+
+def test_stop_writes_pstats(tmp_path: Path) -> None:
+    """Test that stopping the profiler writes a pstats file containing the profiled functions."""
+    profiler = RuntimeProfiler("test", tmp_path)
+    profiler.start()
+    _ = busy_work()
+    filepath = profiler.stop()
+
+    assert filepath is not None
+    assert filepath.parent == tmp_path
+    assert filepath.name.startswith("test-")
+    assert not profiler.running
+
+    stats = pstats.Stats(str(filepath))
+    assert any(function[2] == "busy_work" for function in stats.stats)  # type: ignore
+
+
+def test_dump_keeps_profiling(tmp_path: Path) -> None:
+    """Test that dumping the profile writes a file while profiling continues."""
+    profiler = RuntimeProfiler("test", tmp_path)
+    profiler.start()
+    first = profiler.dump()
+    second = profiler.stop()
+
+    assert first is not None and second is not None
+    assert first != second
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_stop_without_start(tmp_path: Path) -> None:
+    """Test that stopping a profiler which never started does nothing."""
+    profiler = RuntimeProfiler("test", tmp_path)
+
+    assert profiler.stop() is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_default_directory_is_working_directory(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Profiles go under the working directory of the process when the profiler is created."""
+    monkeypatch.chdir(tmp_path)
+    assert RuntimeProfiler("test").profiles_dir == tmp_path.joinpath("profiles")
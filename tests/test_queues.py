@@ -0,0 +1,174 @@
+# Tests the bounded inter-process queues
+
+# Imports
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+import pytest
+from modules.misc.config import QueueParameters, QueuePolicy
+from modules.misc.queues import BoundedQueue
+
+GET_TIMEOUT: float = 1.0
+
+
+# Helper functions
+def drain(queue: BoundedQueue[int]) -> list[int]:
+    """Returns all items on the queue, waiting for any still being flushed to it."""
+    items: list[int] = []
+    while queue.qsize() > 0:
+        items.append(queue.get(timeout=GET_TIMEOUT))
+    return items
+
+
+SPILL_QUEUES: list[BoundedQueue[int]] = []  # Created by the test being run, and closed after it
+
+
+def spill_queue(max_size: int) -> BoundedQueue[int]:
+    """Returns a queue spilling to disk, whose flushing thread is stopped after the test."""
+    queue: BoundedQueue[int] = BoundedQueue("test", QueueParameters(max_size, QueuePolicy.SPILL))
+    SPILL_QUEUES.append(queue)
+    return queue
+
+
+@pytest.fixture(autouse=True)
+def working_directory(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Keeps spill files out of the repository, and stops the threads flushing them once the test is done."""
+    monkeypatch.chdir(tmp_path)
+    yield
+    while SPILL_QUEUES:
+        SPILL_QUEUES.pop().close()
+
+
+def test_unbounded_queue() -> None:
+    """Test that a queue with a max size of zero accepts items without overflowing."""
+    queue: BoundedQueue[int] = BoundedQueue("test")
+    for i in range(100):
+        queue.put(i)
+
+    assert drain(queue) == list(range(100))
+    assert queue.overflows.value == 0
+
+
+def test_drop_oldest_keeps_newest() -> None:
+    """Test that the drop oldest policy discards the oldest items to make room for new ones."""
+    queue: BoundedQueue[int] = BoundedQueue("test", QueueParameters(3, QueuePolicy.DROP_OLDEST))
+    for i in range(10):
+        queue.put(i)
+
+    assert drain(queue) == [7, 8, 9]
+    assert queue.overflows.value == 7
+    assert queue.dropped.value == 7
+
+
+def test_block_waits_for_consumer() -> None:
+    """Test that the block policy waits for the consumer to make room instead of discarding anything."""
+    queue: BoundedQueue[int] = BoundedQueue("test", QueueParameters(1, QueuePolicy.BLOCK))
+    queue.put(0)
+
+    consumed: list[int] = []
+
+    def consumer() -> None:
+        time.sleep(0.1)
+        consumed.append(queue.get(timeout=GET_TIMEOUT))
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    queue.put(1)  # Blocks until the consumer gets the first item
+    thread.join()
+
+    assert consumed == [0]
+    assert queue.get(timeout=GET_TIMEOUT) == 1
+    assert queue.overflows.value == 1
+    assert queue.dropped.value == 0
+
+
+def test_spill_preserves_order() -> None:
+    """Test that items spilled to disk are put back on the queue in order once there is room."""
+    queue: BoundedQueue[int] = spill_queue(2)
+    for i in range(6):
+        queue.put(i)
+
+    assert queue.spilled.value == 4
+    assert queue.dropped.value == 0
+
+    received = drain(queue)
+    while queue.spilled.value > 0:
+        queue.flush_spill()
+        received.extend(drain(queue))
+
+    assert received == list(range(6))
+
+
+def test_spill_file_emptied() -> None:
+    """Test that the spill file is truncated once all of its items are back on the queue."""
+    queue: BoundedQueue[int] = spill_queue(1)
+    queue.put(0)
+    queue.put(1)
+
+    assert queue.spill_file is not None
+    assert queue.spill_file.filepath.stat().st_size > 0
+
+    _ = drain(queue)
+    queue.flush_spill()
+    _ = drain(queue)
+
+    assert queue.spilled.value == 0
+    assert queue.spill_file.filepath.stat().st_size == 0
+
+
+def test_new_items_wait_behind_spilled_items() -> None:
+    """Test that new items are spilled while older items are still waiting on disk."""
+    queue: BoundedQueue[int] = spill_queue(2)
+    for i in range(4):
+        queue.put(i)
+
+    assert queue.get(timeout=GET_TIMEOUT) == 0
+    queue.put(4)  # Spilled item 2 takes the free spot, so 4 waits on disk behind 3
+
+    assert queue.spilled.value == 2
+
+
+def test_spilled_items_flushed_without_new_puts() -> None:
+    """Test that spilled items reach the consumer even when the producer stops putting items."""
+    queue: BoundedQueue[int] = spill_queue(2)
+    for i in range(10):
+        queue.put(i)
+    assert queue.spilled.value == 8
+
+    received = [queue.get(timeout=GET_TIMEOUT) for _ in range(10)]
+    assert received == list(range(10))
+    assert queue.drain_spill(timeout=GET_TIMEOUT)  # The counter is updated just after the last item is put back
+    assert queue.spilled.value == 0
+
+
+def test_drain_spill_before_exit() -> None:
+    """Test that a producer can wait for its spilled items to be back on the queue before it exits."""
+    queue: BoundedQueue[int] = spill_queue(1)
+    for i in range(3):
+        queue.put(i)
+    assert not queue.drain_spill(timeout=0.1)  # Nothing is consumed, so the items stay on disk
+
+    consumed: list[int] = []
+    consumer = threading.Thread(target=lambda: consumed.extend(queue.get(timeout=GET_TIMEOUT) for _ in range(3)))
+    consumer.start()
+    assert queue.drain_spill(timeout=GET_TIMEOUT)
+    consumer.join()
+    assert consumed == [0, 1, 2]
+
+
+def test_empty_spill_file_removed() -> None:
+    """Test that spill files are removed once drained or when the queue is closed empty, but kept while in use."""
+    queue = spill_queue(1)
+    queue.put(0)
+    queue.put(1)
+    assert queue.spill_file is not None
+    filepath = queue.spill_file.filepath
+
+    queue.close()
+    assert filepath.exists()  # Still holds an item
+
+    assert queue.get(timeout=GET_TIMEOUT) == 0
+    assert queue.drain_spill(timeout=GET_TIMEOUT)
+    assert queue.spill_file is None
+    assert not filepath.exists()
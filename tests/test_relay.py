@@ -0,0 +1,103 @@
+# Tests for relaying the telemetry updates to worker processes serving spectators
+import asyncio
+import json
+import multiprocessing as mp
+from pathlib import Path
+from typing import Any
+
+import pytest
+import tornado.testing
+import tornado.websocket
+
+import modules.websocket.relay_worker as relay_worker
+from modules.websocket.relay import RELAY_SUPPORTED, RelayServer
+from modules.websocket.relay_worker import RelayWorker
+from modules.websocket.resume import ReplayLog
+from modules.websocket.subscriptions import Subscription
+from modules.websocket.websocket import TornadoWSServer
+
+READ_TIMEOUT: float = 5.0
+
+
+@pytest.mark.skipif(not RELAY_SUPPORTED, reason="Relaying needs Unix sockets and SO_REUSEPORT")
+def test_spectators_get_relayed_updates(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Updates sent by the primary server reach the spectators of the relay workers, with the same numbers."""
+    monkeypatch.setattr(relay_worker, "RELAY_RECONNECT_INTERVAL", 0.05)
+    relay_socket = str(tmp_path.joinpath("relay.sock"))
+    sock, port = tornado.testing.bind_unused_port()
+    sock.close()
+
+    # The workers are forked, so they must not inherit the last update of other tests
+    TornadoWSServer.last_update = None
+    workers = [mp.Process(target=RelayWorker(relay_socket, port, index, mp.Queue()).run) for index in range(2)]
+    for worker in workers:
+        worker.start()
+
+    async def run() -> list[list[dict[str, Any]]]:
+        TornadoWSServer.clients.clear()
+        TornadoWSServer.replay_log = ReplayLog()
+        relay = TornadoWSServer.relay = RelayServer(relay_socket)
+        relay.listen_unix()
+
+        async def connect(query: str) -> tornado.websocket.WebSocketClientConnection:
+            for _ in range(100):
+                try:
+                    return await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket{query}")
+                except OSError:
+                    await asyncio.sleep(0.05)
+            raise TimeoutError("Relay worker did not start")
+
+        for _ in range(100):
+            if len(relay.streams) == len(workers):
+                break
+            await asyncio.sleep(0.05)
+        assert len(relay.streams) == len(workers)
+
+        spectators = [await connect(""), await connect("?series=altitude")]
+        received: list[list[dict[str, Any]]] = [[] for _ in spectators]
+        for i in range(5):
+            TornadoWSServer.send_update({"update": i, "telemetry": {"altitude": [i], "gnss": [i]}})
+            for spectator, messages in zip(spectators, received):
+                message = await asyncio.wait_for(spectator.read_message(), READ_TIMEOUT)
+                messages.append(json.loads(message))  # type: ignore
+
+        for spectator in spectators:
+            spectator.close()
+        relay.stop()
+        return received
+
+    try:
+        everything, altitude = asyncio.run(run())
+    finally:
+        TornadoWSServer.relay = None
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+
+    assert everything == [{"update": i, "telemetry": {"altitude": [i], "gnss": [i]}, "seq": i + 1} for i in range(5)]
+    assert altitude == [{"update": i, "telemetry": {"altitude": [i]}, "seq": i + 1} for i in range(5)]
+
+
+def test_update_encoded_once_for_relay(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """The JSON text sent to the relay workers is the one sent to the clients subscribed to everything."""
+    serialized: list[str] = []
+    serialize = Subscription.serialize
+
+    def counting_serialize(self: Subscription, *args: Any, **kwargs: Any) -> Any:
+        serialized.append(serialize(self, *args, **kwargs))  # type: ignore
+        return serialized[-1]
+
+    monkeypatch.setattr(Subscription, "serialize", counting_serialize)
+    published: list[str] = []
+    relay = RelayServer(str(tmp_path.joinpath("relay.sock")))
+    monkeypatch.setattr(relay, "publish", published.append)
+    TornadoWSServer.clients.clear()
+    TornadoWSServer.replay_log = ReplayLog()
+    TornadoWSServer.relay = relay
+    try:
+        TornadoWSServer.send_update({"update": 1})
+    finally:
+        TornadoWSServer.relay = None
+
+    assert published == serialized
+    assert json.loads(published[0]) == {"update": 1, "seq": 1}
@@ -0,0 +1,82 @@
+# Tests for resuming the updates of websocket clients which reconnect
+from typing import Any
+
+from modules.websocket.resume import ReplayLog
+
+
+def update(time: int, buffer_size: int = 4) -> dict[str, Any]:
+    """Returns an update holding the last few samples of the altitude series, up to the given mission time."""
+    times = list(range(max(0, time - buffer_size + 1), time + 1))
+    return {
+        "org": "CU InSpace",
+        "status": {"mission": {"time": time}},
+        "telemetry": {
+            "last_mission_time": time,
+            "altitude": {"mission_time": times, "metres": [t * 2 for t in times]},
+            "gnss": {"mission_time": [], "latitude": []},
+        },
+    }
+
+
+def test_updates_numbered() -> None:
+    """Updates are numbered one after the other."""
+    log = ReplayLog()
+    assert [log.append(update(time))["seq"] for time in range(5)] == [1, 2, 3, 4, 5]
+
+
+def test_missed_samples() -> None:
+    """Resumed clients get every sample after their last one, even beyond the samples kept in each update."""
+    log = ReplayLog()
+    for time in range(20):
+        _ = log.append(update(time))
+
+    resumed = log.missed(5)  # The update with samples up to mission time 4
+    assert resumed is not None
+    assert resumed["telemetry"]["altitude"] == {
+        "mission_time": list(range(5, 20)),
+        "metres": [t * 2 for t in range(5, 20)],
+    }
+    assert resumed["telemetry"]["gnss"] == {"mission_time": [], "latitude": []}
+    assert resumed["telemetry"]["last_mission_time"] == 19
+    assert resumed["status"] == {"mission": {"time": 19}}
+    assert resumed["seq"] == 20
+    assert resumed["resumed_from"] == 5
+
+    up_to_date = log.missed(20)
+    assert up_to_date is not None
+    assert up_to_date["telemetry"]["altitude"]["mission_time"] == []
+
+
+def test_too_far_behind() -> None:
+    """Clients whose last update is no longer in the log, or was never sent, cannot be resumed."""
+    log = ReplayLog(size=8)
+    assert log.missed(0) is None
+    for time in range(20):
+        _ = log.append(update(time))
+
+    assert log.missed(12) is None
+    assert log.missed(13) is not None
+    assert log.missed(21) is None
+
+
+def test_mission_restarted() -> None:
+    """Clients cannot be resumed across the start of a new mission."""
+    log = ReplayLog()
+    for time in [*range(10), *range(3)]:
+        _ = log.append(update(time))
+
+    assert log.missed(5) is None
+    assert log.missed(11) is not None
+
+
+def test_relayed_numbers_kept() -> None:
+    """Updates numbered by the primary server keep their number, and a gap in the numbers starts the log over."""
+    log = ReplayLog()
+    for seq in (7, 8, 9):
+        _ = log.append({**update(seq), "seq": seq})
+    assert log.sequence == 9
+    assert log.missed(7) is not None
+
+    _ = log.append({**update(12), "seq": 12})
+    assert log.missed(9) is None
+    assert log.missed(12) is not None
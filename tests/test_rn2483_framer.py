@@ -0,0 +1,98 @@
+# Tests for framing the serial output of the RN2483 radio into lines
+import pytest
+
+from modules.serial.rn2483_framer import MAX_LINE_LENGTH, LineKind, RadioLine, RN2483Framer
+from tests.fake_rn2483 import TEST_PAYLOAD
+
+
+@pytest.fixture
+def framer() -> RN2483Framer:
+    return RN2483Framer()
+
+
+def pop_all(framer: RN2483Framer) -> list[RadioLine]:
+    lines: list[RadioLine] = []
+    while (line := framer.pop_line()) is not None:
+        lines.append(line)
+    return lines
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        (b"radio_rx  " + TEST_PAYLOAD.encode(), RadioLine(LineKind.RX, TEST_PAYLOAD.encode())),
+        (b"radio_rx  abcdef0123", RadioLine(LineKind.RX, b"abcdef0123")),
+        (b"radio_rx  ABCDEFGH", RadioLine(LineKind.INVALID, b"ABCDEFGH")),
+        (b"radio_rx  ABC", RadioLine(LineKind.INVALID, b"ABC")),
+        (b"radio_rx", RadioLine(LineKind.INVALID, b"")),
+        (b"radio_err", RadioLine(LineKind.ERR)),
+        (b"ok", RadioLine(LineKind.OK, b"ok")),
+        (b"busy", RadioLine(LineKind.BUSY, b"busy")),
+        (b"-12", RadioLine(LineKind.NUMERIC, b"-12")),
+        (b"4294967245", RadioLine(LineKind.NUMERIC, b"4294967245")),
+        (b"RN2483 1.0.5 Oct 31 2018 15:06:52", RadioLine(LineKind.OTHER, b"RN2483 1.0.5 Oct 31 2018 15:06:52")),
+        (b"invalid_param", RadioLine(LineKind.OTHER, b"invalid_param")),
+    ],
+)
+def test_classify(framer: RN2483Framer, raw: bytes, expected: RadioLine) -> None:
+    """Lines are classified by kind, with only the payload kept from received packets."""
+    framer.feed(raw + b"\r\n")
+    assert framer.pop_line() == expected
+
+
+def test_partial_line(framer: RN2483Framer) -> None:
+    """A line split across several reads is only emitted once it is complete."""
+    raw = f"radio_rx  {TEST_PAYLOAD}\r\n".encode()
+    for i in range(len(raw) - 1):
+        framer.feed(raw[i : i + 1])
+        assert framer.pop_line() is None
+
+    framer.feed(raw[-1:])
+    assert framer.pop_line() == RadioLine(LineKind.RX, TEST_PAYLOAD.encode())
+    assert framer.pop_line() is None
+
+
+def test_burst(framer: RN2483Framer) -> None:
+    """Several lines arriving in a single read are all emitted in order."""
+    framer.feed(b"ok\r\nradio_rx  AA\r\nok\r\nradio_rx  BB\r\nradio_err\r\nradio_rx  C")
+    assert pop_all(framer) == [
+        RadioLine(LineKind.OK, b"ok"),
+        RadioLine(LineKind.RX, b"AA"),
+        RadioLine(LineKind.OK, b"ok"),
+        RadioLine(LineKind.RX, b"BB"),
+        RadioLine(LineKind.ERR),
+    ]
+
+    framer.feed(b"C\r\n")
+    assert pop_all(framer) == [RadioLine(LineKind.RX, b"CC")]
+    assert len(framer.buffer) == 0  # Processed lines are discarded
+
+
+def test_overlong_line_discarded(framer: RN2483Framer) -> None:
+    """Garbage without a line ending does not grow the buffer without bound."""
+    framer.feed(b"x" * (MAX_LINE_LENGTH + 1))
+    assert framer.pop_line() is None
+    assert len(framer.buffer) == 0
+
+    framer.feed(b"ok\r\n")
+    assert framer.pop_line() == RadioLine(LineKind.OK, b"ok")
+
+
+def test_next_line_reads_serial() -> None:
+    """Lines are read from the serial port as bytes become available, and None is returned on a time out."""
+
+    class Serial:
+        def __init__(self, chunks: list[bytes]) -> None:
+            self.chunks = chunks
+
+        @property
+        def in_waiting(self) -> int:
+            return len(self.chunks[0]) if self.chunks else 0
+
+        def read(self, size: int = 1) -> bytes:
+            return self.chunks.pop(0) if self.chunks else b""
+
+    framer = RN2483Framer(Serial([b"radio_r", b"x  AB\r\nradio_rx  CD\r", b"\n"]))  # type: ignore
+    assert framer.next_line() == RadioLine(LineKind.RX, b"AB")
+    assert framer.next_line() == RadioLine(LineKind.RX, b"CD")
+    assert framer.next_line() is None
@@ -0,0 +1,252 @@
+# Tests for receiving packets with the RN2483 radio wrapper, using a simulated radio
+import pytest
+
+import modules.serial.rn2483_radio as rn2483_radio
+from modules.misc.config import RadioParameters
+from modules.serial.rn2483_radio import APPLIED_SETTINGS, RN2483Radio, radio_write, setting_values
+from tests.fake_rn2483 import FakeRN2483Serial, TEST_PAYLOAD
+
+PACKETS: int = 50
+PACKET_INTERVALS: list[float] = [0.1, 0.05, 0.02, 0.01, 0.0075]  # Seconds between packets, slowest first
+USB_LATENCY: float = 0.008  # Typical latency of a USB to serial adapter in each direction, in seconds
+
+
+@pytest.fixture(autouse=True)
+def clear_applied_settings():
+    APPLIED_SETTINGS.clear()
+    yield
+    APPLIED_SETTINGS.clear()
+
+
+def make_radio(monkeypatch: pytest.MonkeyPatch, serial: FakeRN2483Serial) -> RN2483Radio:
+    """Returns a radio wrapper connected to the fake serial port."""
+    monkeypatch.setattr(rn2483_radio, "Serial", lambda **_: serial)
+    return RN2483Radio("fake")
+
+
+def write_ok(radio: RN2483Radio, command: str) -> bool:
+    """Writes a command and checks the next line for 'ok', the way the radio wrapper used to."""
+    radio_write(radio.serial, command)
+    return "ok" in str(radio.serial.readline())
+
+
+def receive_rearming(radio: RN2483Radio) -> str | None:
+    """Receives the way the radio wrapper used to: reception is set up again and confirmed before every packet."""
+    if not write_ok(radio, "radio set wdt 0"):
+        return None
+    if not write_ok(radio, "mac pause"):
+        return None
+    radio_write(radio.serial, "radio rx 0")
+    _ = radio.serial.readline()
+
+    message = str(radio.serial.readline())[10:-5].strip()
+    try:
+        int(message, 16)
+        return message
+    except ValueError:
+        return None
+
+
+def received_packets(monkeypatch: pytest.MonkeyPatch, packet_interval: float, rearm: bool) -> int:
+    """Returns the number of packets received out of those sent at the given interval."""
+    monkeypatch.setattr(rn2483_radio, "SIGNAL_SAMPLE_INTERVAL", float("inf"))  # Only reception is measured
+    serial = FakeRN2483Serial(packet_interval, PACKETS)
+    radio = make_radio(monkeypatch, serial)
+
+    received = 0
+    while not serial.done:
+        message = receive_rearming(radio) if rearm else radio.receive()
+        if message is not None:
+            received += 1
+    return received
+
+
+def max_sustainable_rate(monkeypatch: pytest.MonkeyPatch, rearm: bool) -> float:
+    """Returns the highest packet rate (per second) tested at which no packets were lost."""
+    rate = 0.0
+    for interval in PACKET_INTERVALS:
+        if received_packets(monkeypatch, interval, rearm) < PACKETS:
+            break
+        rate = 1 / interval
+    return rate
+
+
+def test_receive_payload(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Payloads are returned without the reception indicator."""
+    serial = FakeRN2483Serial(0.1, 1)
+    radio = make_radio(monkeypatch, serial)
+
+    messages = [radio.receive() for _ in range(3)]
+    assert TEST_PAYLOAD in messages
+
+
+def test_receive_arms_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The watchdog and LoRaWAN stack are only set up once; each packet only needs the radio to listen again."""
+    serial = FakeRN2483Serial(0.1, 10)
+    radio = make_radio(monkeypatch, serial)
+
+    while not serial.done:
+        _ = radio.receive()
+
+    assert serial.commands.count("radio set wdt 0") == 1
+    assert serial.commands.count("mac pause") == 1
+    assert serial.commands.count("radio rx 0") == 11  # Once to start, then after each packet
+
+
+def test_setup_rearms(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Setting up the radio again resets it, so reception needs to be armed again."""
+    serial = FakeRN2483Serial(0.1, 1)
+    radio = make_radio(monkeypatch, serial)
+    _ = radio.receive()
+    assert radio.rx_armed
+
+    radio.setup(RadioParameters())
+    assert not radio.rx_armed
+    assert not radio.listening
+
+
+def test_signal_report_stops_reception(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The radio must stop listening before it can answer a signal report; reception then resumes."""
+    serial = FakeRN2483Serial(0.1, 0)
+    radio = make_radio(monkeypatch, serial)
+    _ = radio.receive()
+
+    assert radio.signal_report() == 7
+    assert serial.commands[-2:] == ["radio rxstop", "radio get snr"]
+    assert not radio.listening
+
+    _ = radio.receive()
+    assert serial.commands[-1] == "radio rx 0"
+    assert radio.listening
+
+
+def test_continuous_receive_sustains_higher_rate(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Re-arming reception costs three serial round trips per packet, during which packets are missed. Listening again
+    right away only costs one, with no wait for the reply.
+    """
+    rearming_rate = max_sustainable_rate(monkeypatch, rearm=True)
+    continuous_rate = max_sustainable_rate(monkeypatch, rearm=False)
+    print(f"Max sustainable packet rate: re-arming {rearming_rate:.0f}/s, continuous {continuous_rate:.0f}/s")
+
+    assert continuous_rate >= 2 * rearming_rate
+
+
+def test_signal_report_after_packet(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The reply to listening again after a packet is not mistaken for the reply to a signal report."""
+    serial = FakeRN2483Serial(0.1, 1)
+    radio = make_radio(monkeypatch, serial)
+    while radio.receive() is None:
+        pass
+
+    assert radio.signal_report() == 7
+
+
+def test_packet_during_command_kept(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A packet which arrives while waiting on a command reply is returned by the next receive."""
+    serial = FakeRN2483Serial(0.1, 1, start_time=2.0)
+    radio = make_radio(monkeypatch, serial)
+    _ = radio.receive()
+    serial.clock = 2.0  # Packet arrives before the command is processed
+
+    assert radio.signal_report() == 7
+    assert radio.receive() == TEST_PAYLOAD
+
+
+def setup_commands(serial: FakeRN2483Serial, radio: RN2483Radio, parameters: RadioParameters) -> list[str]:
+    """Returns the commands sent to the radio to set it up."""
+    sent = len(serial.commands)
+    radio.setup(parameters)
+    return serial.commands[sent:]
+
+
+def test_setup_only_sets_differing(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Settings are read back and only those which differ from the parameters are set, without a reset."""
+    serial = FakeRN2483Serial()
+    serial.settings = setting_values(RadioParameters())
+    serial.settings["pwr"] = "3"
+    radio = make_radio(monkeypatch, serial)
+
+    commands = setup_commands(serial, radio, RadioParameters())
+    assert "sys reset" not in commands
+    assert [command for command in commands if command.startswith("radio set")] == ["radio set pwr 15"]
+    assert serial.settings == setting_values(RadioParameters())
+
+
+def test_setup_uses_applied_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Settings which changed since they were last applied to the radio are set without being read back."""
+    serial = FakeRN2483Serial()
+    radio = make_radio(monkeypatch, serial)
+    _ = setup_commands(serial, radio, RadioParameters())
+
+    commands = setup_commands(serial, radio, RadioParameters(spread_factor=12))
+    assert "radio get sf" not in commands
+    assert "radio set sf sf12" in commands
+    assert len([command for command in commands if command.startswith("radio set")]) == 1
+    assert serial.settings["sf"] == "sf12"
+
+
+def test_setup_resets_unresponsive_radio(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A radio which doesn't reply to the read back is reset and fully configured."""
+    serial = FakeRN2483Serial()
+    radio = make_radio(monkeypatch, serial)
+    monkeypatch.setattr(radio, "read_settings", lambda _: None)
+
+    commands = setup_commands(serial, radio, RadioParameters())
+    assert "sys reset" in commands
+    assert len([command for command in commands if command.startswith("radio set")]) == len(dict(RadioParameters()))
+
+
+def test_setup_invalid_reply(monkeypatch: pytest.MonkeyPatch) -> None:
+    serial = FakeRN2483Serial()
+    radio = make_radio(monkeypatch, serial)
+    monkeypatch.setattr(serial, "execute", lambda command: serial.replies.append((serial.clock, b"invalid_param\r\n")))
+
+    with pytest.raises(rn2483_radio.SerialException):
+        radio.apply_settings({"pwr": "15"})
+
+
+def test_reconnect_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Setting up a radio which is already configured takes a fraction of the time of a reset and full configure."""
+    serial = FakeRN2483Serial(latency=USB_LATENCY)
+    radio = make_radio(monkeypatch, serial)
+
+    # The way the radio used to be set up: a reset, then a round trip for each setting
+    start = serial.clock
+    _ = radio.reset()
+    for keyword, value in setting_values(RadioParameters()).items():
+        assert write_ok(radio, f"radio set {keyword} {value}")
+    full_time = serial.clock - start
+
+    start = serial.clock
+    radio.setup(RadioParameters())
+    reconnect_time = serial.clock - start
+    print(f"Radio set up: full {full_time * 1000:.0f}ms, already configured {reconnect_time * 1000:.0f}ms")
+
+    assert reconnect_time < full_time / 2
+
+
+def test_signal_sampled_after_packet(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Link quality is requested right after a packet, before listening again, without waiting for the replies."""
+    monkeypatch.setattr(rn2483_radio, "SIGNAL_SAMPLE_INTERVAL", 0.0)
+    serial = FakeRN2483Serial(0.1, 2)
+    radio = make_radio(monkeypatch, serial)
+
+    while radio.receive() is None:
+        pass
+    assert serial.commands[-3:] == ["radio get snr", "radio get rssi", "radio rx 0"]
+    assert radio.listening
+
+    while radio.receive() is None:
+        pass
+    assert list(radio.signal_samples) == [("snr", 7), ("rssi", -60)]
+
+
+def test_signal_sample_interval(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Link quality is sampled at most once per interval."""
+    serial = FakeRN2483Serial(0.1, 5)
+    radio = make_radio(monkeypatch, serial)
+
+    while not serial.done:
+        _ = radio.receive()
+    assert serial.commands.count("radio get snr") == 1
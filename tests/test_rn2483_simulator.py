@@ -0,0 +1,113 @@
+# Tests for the pseudo-terminal RN2483 radio simulator, driving the real serial path
+import multiprocessing as mp
+import sys
+import time
+
+import pytest
+
+from modules.misc.config import RadioParameters
+from modules.serial.rn2483_radio import RN2483Radio
+from modules.serial.rn2483_simulator import RN2483Simulator, header_payload
+from modules.serial.serial_rn2483_radio import rn2483_radio_process
+from modules.telemetry.v1.block import PacketHeader
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Pseudo-terminals are only used on Linux")
+
+PACKET_RATE: float = 200.0
+
+
+def receive_for(radio: RN2483Radio, seconds: float) -> list[str]:
+    """Returns every payload received by the radio in the given time."""
+    messages: list[str] = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        message = radio.receive()
+        if message is not None:
+            messages.append(message)
+    return messages
+
+
+def test_header_payload() -> None:
+    """The default payload is a valid packet header."""
+    header = PacketHeader.from_hex(header_payload(42))
+    assert header.callsign == "VA3INI"
+    assert header.packet_num == 42
+    assert len(header) == 16
+
+
+def test_invalid_parameters() -> None:
+    with pytest.raises(ValueError):
+        _ = RN2483Simulator(packet_rate=0)
+    with pytest.raises(ValueError):
+        _ = RN2483Simulator(loss=1.5)
+
+
+def test_commands() -> None:
+    """The simulator replies to the commands used by the radio wrapper."""
+    with RN2483Simulator(snr=-3) as simulator:
+        radio = RN2483Radio(simulator.port)
+        assert radio.reset()
+        radio.configure(RadioParameters())
+        assert simulator.settings["sf"] == "sf9"
+        assert radio.start_rx()
+        assert radio.signal_report() == -3
+
+
+def test_receive() -> None:
+    """Packets are received in order while the radio is listening."""
+    with RN2483Simulator(packet_rate=PACKET_RATE, seed=1) as simulator:
+        radio = RN2483Radio(simulator.port)
+        radio.setup(RadioParameters())
+        messages = receive_for(radio, 0.5)
+
+    assert len(messages) >= 0.8 * PACKET_RATE * 0.5
+    packet_nums = [PacketHeader.from_hex(message).packet_num for message in messages]
+    assert packet_nums == sorted(packet_nums)
+    assert simulator.packets_received == len(messages)
+
+
+def test_loss() -> None:
+    with RN2483Simulator(packet_rate=PACKET_RATE, loss=1.0) as simulator:
+        radio = RN2483Radio(simulator.port)
+        radio.setup(RadioParameters())
+        assert receive_for(radio, 0.2) == []
+    assert simulator.packets_lost == simulator.packets_transmitted > 0
+
+
+def test_corruption() -> None:
+    """Corrupted payloads are not hexadecimal, so they are discarded by the radio wrapper."""
+    with RN2483Simulator(packet_rate=PACKET_RATE, corruption=1.0) as simulator:
+        radio = RN2483Radio(simulator.port)
+        radio.setup(RadioParameters())
+        assert receive_for(radio, 0.2) == []
+    assert simulator.packets_corrupted > 0
+
+
+def test_radio_process() -> None:
+    """The radio process puts payloads received from the simulated radio on the payload queue."""
+    serial_status: mp.Queue[str] = mp.Queue()
+    radio_signal_report: mp.Queue[str] = mp.Queue()
+    rn2483_radio_input: mp.Queue[str] = mp.Queue()
+    rn2483_radio_payloads: mp.Queue[str] = mp.Queue()
+
+    with RN2483Simulator(packet_rate=PACKET_RATE) as simulator:
+        process = mp.Process(
+            target=rn2483_radio_process,
+            args=(
+                serial_status,
+                radio_signal_report,
+                rn2483_radio_input,
+                rn2483_radio_payloads,
+                simulator.port,
+                RadioParameters(),
+            ),
+            daemon=True,
+        )
+        process.start()
+        payloads = [rn2483_radio_payloads.get(timeout=5) for _ in range(20)]
+        process.terminate()
+        process.join()
+
+    assert serial_status.get(timeout=1) == f"rn2483_port {simulator.port}"
+    assert serial_status.get(timeout=1) == f"rn2483_connected {simulator.port} True"
+    assert all(PacketHeader.from_hex(payload.data).callsign == "VA3INI" for payload in payloads)
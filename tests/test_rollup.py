@@ -0,0 +1,95 @@
+# Tests for the rollups of the telemetry series and the overviews read from them
+from typing import Any
+
+import pytest
+
+from modules.telemetry.history import HistoryStore
+from modules.telemetry.rollup import RollupTier, rollup_fields
+from modules.websocket.subscriptions import Subscription
+
+HOUR: int = 3_600_000
+
+
+def session(history: HistoryStore, duration: int, interval: int = 500, block: int = 200) -> None:
+    """Records a session of the altitude series with a sample every interval, in updates of a block of samples."""
+    times = list(range(0, duration, interval))
+    for i in range(0, len(times), block):
+        chunk = times[i : i + block]
+        history.record(
+            {"last_mission_time": chunk[-1], "altitude": {"mission_time": chunk, "metres": [t % 60_000 for t in chunk]}}
+        )
+
+
+def test_tier_buckets() -> None:
+    """Each bucket holds the count, lowest, highest and mean of the samples in its period, and groups merge."""
+    tier = RollupTier(1000, 1)
+    for time, value in [(0, 5), (400, 1), (999, 3), (1000, 10), (2500, 4), (2600, 6)]:
+        tier.add([time, value])
+
+    assert tier.rows(0, 3) == [[0, 3, 1, 5, 3.0], [1000, 1, 10, 10, 10.0], [2000, 2, 4, 6, 5.0]]
+    assert tier.rows(0, 3, group=2) == [[0, 4, 1, 10, 4.75], [2000, 2, 4, 6, 5.0]]
+    assert tier.range(1500, 2000) == (1, 3)
+    assert rollup_fields(["metres"]) == ["count", "metres_min", "metres_max", "metres_mean"]
+
+
+def test_tier_bounded() -> None:
+    """Only the most recent buckets up to the maximum are kept, and the tier then no longer covers the start."""
+    tier = RollupTier(10, 1, max_buckets=160)
+    for time in range(0, 100_000, 5):
+        tier.add([time, time])
+    assert 160 <= len(tier.start) <= 170
+    assert tier.start[-1] == 99_990
+    assert not tier.covers(None)
+    assert tier.covers(99_000)
+
+
+@pytest.mark.parametrize(
+    "start, points, resolution, rows",
+    [
+        (None, 240, 60_000, 240),  # Four hours, from the 1 min tier
+        (HOUR, 400, 30_000, 360),  # Three hours, from the 10 s tier merged by three
+        (4 * HOUR - 300_000, 100, 3000, 100),  # Five minutes, from the 1 s tier merged by three
+        (4 * HOUR - 20_000, 200, None, 40),  # The last 20 s, as samples
+    ],
+)
+def test_overview_tiers(start: int | None, points: int, resolution: int | None, rows: int) -> None:
+    """The tier matching the span and points is read, so overviews of hours are no larger than those of seconds."""
+    history = HistoryStore()
+    session(history, 4 * HOUR)
+    overview = history.overview("altitude", start, None, points)
+
+    assert overview is not None
+    assert overview.resolution == resolution
+    assert len(overview.rows) == rows
+    if resolution is None:
+        assert overview.fields == ["mission_time", "metres"]
+    else:
+        assert overview.fields == ["mission_time", "count", "metres_min", "metres_max", "metres_mean"]
+        assert overview.rows[0][2] == 0
+        assert max(row[3] for row in overview.rows) == 60_000 - 500
+        assert sum(row[1] for row in overview.rows) == history.count("altitude", start)
+
+
+def test_overview_passes_over_trimmed_samples() -> None:
+    """Ranges reaching back before the samples kept are read from the rollups."""
+    history = HistoryStore(max_samples=1000)
+    session(history, HOUR)
+    assert history.count("altitude") < 2000
+
+    overview = history.overview("altitude", None, None, 5000)
+    assert overview is not None
+    assert overview.resolution == 1000
+    assert overview.rows[0][0] == 0
+
+
+def test_span_subscription() -> None:
+    """Subscriptions with a span are sent an overview of the last span of each series."""
+    history = HistoryStore()
+    session(history, HOUR)
+    update: dict[str, Any] = {"telemetry": {"altitude": {"mission_time": [HOUR - 500], "metres": [59_500]}}}
+
+    selected = Subscription.from_query(None, None, points=60, span=HOUR).select(update, history)
+    altitude = selected["telemetry"]["altitude"]
+    assert len(altitude["mission_time"]) == 60
+    assert altitude["count"][0] == 120
+    assert altitude["metres_max"][-1] == 59_500
@@ -0,0 +1,93 @@
+# Tests for recovering the connection to the RN2483 radio when the serial link drops
+from queue import Queue
+
+import pytest
+from serial import SerialException
+
+import modules.serial.rn2483_radio as rn2483_radio
+import modules.serial.serial_rn2483_radio as serial_rn2483_radio
+from modules.misc.config import RadioParameters
+from modules.misc.latency import TimestampedPayload
+from modules.serial.rn2483_radio import APPLIED_SETTINGS
+from modules.serial.serial_rn2483_radio import connect_radio, rn2483_radio_process
+from tests.fake_rn2483 import FakeRN2483Serial, TEST_PAYLOAD
+
+
+class Done(Exception):
+    """Raised to stop the radio process once a test has seen enough."""
+
+
+class PayloadQueue(Queue[TimestampedPayload]):
+    """A payload queue which stops the radio process once enough payloads have been received."""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__()
+        self.limit: int = limit
+
+    def put(self, item: TimestampedPayload, block: bool = True, timeout: float | None = None) -> None:
+        super().put(item, block, timeout)
+        if self.qsize() >= self.limit:
+            raise Done
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Records the back off delays instead of sleeping."""
+    delays: list[float] = []
+    monkeypatch.setattr(serial_rn2483_radio.time, "sleep", delays.append)
+    APPLIED_SETTINGS.clear()
+    return delays
+
+
+def test_connect_backs_off(monkeypatch: pytest.MonkeyPatch, no_sleep: list[float]) -> None:
+    """Connecting is retried with exponentially longer delays, up to a maximum."""
+    attempts: list[str] = []
+
+    def open_serial(port: str, **_) -> FakeRN2483Serial:
+        attempts.append(port)
+        if len(attempts) < 7:
+            raise SerialException(f"could not open port {port}")
+        return FakeRN2483Serial()
+
+    monkeypatch.setattr(rn2483_radio, "Serial", open_serial)
+    serial_status: Queue[str] = Queue()
+    radio = connect_radio(serial_status, "/dev/ttyUSB0", RadioParameters(), initial_delay=0.1, max_delay=1.0)
+
+    assert radio.port == "/dev/ttyUSB0"
+    assert no_sleep == [0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+    assert serial_status.get_nowait() == "rn2483_connected /dev/ttyUSB0 False"
+
+
+def test_reconnect_keeps_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    When the serial link drops, the radio is reopened and reception continues. Telemetry is told about the
+    reconnection, but not about a new port, which would reset its state.
+    """
+    serials: list[FakeRN2483Serial] = []
+
+    def open_serial(port: str, **_) -> FakeRN2483Serial:
+        if len(serials) == 1 and serials[0].closed and not hasattr(open_serial, "failed"):
+            open_serial.failed = True  # type: ignore # The device takes a moment to come back
+            raise SerialException(f"could not open port {port}")
+
+        # The first connection drops after a few packets
+        serial = FakeRN2483Serial(0.05, 100, disconnect_time=0.5 if not serials else None)
+        serials.append(serial)
+        return serial
+
+    monkeypatch.setattr(rn2483_radio, "Serial", open_serial)
+    serial_status: Queue[str] = Queue()
+    payloads = PayloadQueue(limit=15)
+
+    with pytest.raises(Done):
+        rn2483_radio_process(serial_status, Queue(), Queue(), payloads, "/dev/ttyUSB0", RadioParameters())
+
+    assert len(serials) == 2
+    assert serials[0].closed
+    assert all(payloads.get_nowait().data == TEST_PAYLOAD for _ in range(15))
+
+    statuses = list(serial_status.queue)
+    assert statuses.count("rn2483_port /dev/ttyUSB0") == 1
+    assert statuses[-3:-1] == ["rn2483_connected /dev/ttyUSB0 True", "rn2483_reconnects /dev/ttyUSB0 1"]
+    assert statuses[-1].startswith("rn2483_downtime /dev/ttyUSB0 ")
+    assert statuses.index("rn2483_connected /dev/ttyUSB0 False") > statuses.index("rn2483_port /dev/ttyUSB0")
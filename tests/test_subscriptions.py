@@ -0,0 +1,60 @@
+# Tests for the per-client subscriptions to the telemetry output
+import json
+from typing import Any
+
+import pytest
+
+import modules.websocket.subscriptions as subscriptions
+from modules.websocket.subscriptions import Subscription
+
+UPDATE: dict[str, Any] = {
+    "org": "CU InSpace",
+    "rocket": "Juniper",
+    "version": "0.6.0-DEV",
+    "status": {
+        "mission": {"name": "", "state": 0},
+        "rn2483_radio": {"connected": True, "snr": 7},
+        "replay": {"mission_list": [{"name": f"mission {i}", "length": i} for i in range(50)]},
+    },
+    "telemetry": {
+        name: {"mission_time": list(range(100)), "value": [i / 3 for i in range(100)]}
+        for name in ("altitude", "gnss", "temperature", "pressure", "humidity")
+    },
+}
+
+
+def test_default_subscribes_to_everything() -> None:
+    """Clients without subscription arguments are sent the full telemetry output."""
+    assert Subscription.from_query(None, None).select(UPDATE) is UPDATE
+
+
+def test_subscribe_to_series_and_status() -> None:
+    """Only the subscribed series and status sections are sent, with the ground station details."""
+    subscription = Subscription.from_query("altitude, gnss,unknown", "mission")
+    selected = subscription.select(UPDATE)
+
+    assert selected["org"] == UPDATE["org"]
+    assert list(selected["telemetry"]) == ["altitude", "gnss"]
+    assert list(selected["status"]) == ["mission"]
+    assert UPDATE["status"]["replay"]  # The update itself is left alone
+
+    # Only two of the five series, and none of the mission list
+    assert len(subscription.serialize(UPDATE)) < len(json.dumps(UPDATE)) / 2
+
+
+def test_empty_subscription() -> None:
+    """An empty argument subscribes to none of the series or sections."""
+    selected = Subscription.from_query("", None).select(UPDATE)
+    assert selected["telemetry"] == {}
+    assert selected["status"] == UPDATE["status"]
+
+
+def test_subscriptions_are_hashable() -> None:
+    """Clients with the same subscription, in any order, share one serialized message."""
+    assert Subscription.from_query("gnss,altitude", None) == Subscription.from_query("altitude,gnss", None)
+    assert len({Subscription.from_query("gnss,altitude", ""), Subscription.from_query("altitude,gnss", "")}) == 1
+
+
+@pytest.mark.parametrize("argument, names", [(None, None), ("", frozenset()), ("a,,b ", frozenset({"a", "b"}))])
+def test_parse_names(argument: str | None, names: frozenset[str] | None) -> None:
+    assert subscriptions.parse_names(argument) == names
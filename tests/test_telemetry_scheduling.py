@@ -0,0 +1,121 @@
+# Tests the scheduling of payload processing in the telemetry loop
+
+# Imports
+import queue
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from modules.misc.latency import TimestampedPayload
+from modules.serial.serial_rn2483_emulator import FlightEmulator
+import modules.telemetry.telemetry as telemetry_module
+from modules.telemetry.telemetry import Telemetry, process_slice
+
+BACKLOG_SIZE: int = 10_000
+MAX_CONTROL_LATENCY_NS: int = 10_000_000  # 10 ms
+
+
+def busy_handler(_: int) -> None:
+    """Simulates the cost of parsing a payload and publishing the update (100 us)."""
+    end = time.perf_counter_ns() + 100_000
+    while time.perf_counter_ns() < end:
+        pass
+
+
+def make_backlog(size: int) -> queue.Queue[int]:
+    """Returns a queue filled with a backlog of payloads."""
+    backlog: queue.Queue[int] = queue.Queue()
+    for i in range(size):
+        backlog.put(i)
+    return backlog
+
+
+def test_slice_empty_queue() -> None:
+    """Test that a slice of an empty queue processes nothing."""
+    assert process_slice(queue.Queue(), busy_handler) == 0
+
+
+def test_slice_limited_by_item_count() -> None:
+    """Test that a slice stops after the maximum number of items."""
+    handled: list[int] = []
+    backlog = make_backlog(100)
+
+    assert process_slice(backlog, handled.append, max_items=10) == 10
+    assert handled == list(range(10))
+    assert backlog.qsize() == 90
+
+
+def test_slice_limited_by_time_budget() -> None:
+    """Test that a slice stops once its time budget has run out."""
+    backlog = make_backlog(1_000)
+    processed = process_slice(backlog, busy_handler, max_items=1_000, budget_ns=2_000_000)
+
+    assert 0 < processed < 100
+
+
+class StopLoop(Exception):
+    """Raised to leave the telemetry loop once the test has what it needs."""
+
+
+def test_control_latency_with_backlog(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """
+    Test that a replay pause command is handled by the telemetry loop in under 10 ms while it works through a backlog
+    of 10k radio payloads, each parsed and published as a full websocket update.
+    """
+    monkeypatch.chdir(tmp_path)  # Missions are recorded under the working directory
+    config = SimpleNamespace(
+        approved_callsigns={"VA3INI": "Test"}, telemetry_buffer_size=20, organization="CUInSpace", rocket_name="Test"
+    )
+    radio_payloads: queue.Queue[TimestampedPayload] = queue.Queue()
+    telemetry_json_output: queue.Queue[dict[str, Any]] = queue.Queue()
+    telemetry_ws_commands: queue.Queue[list[str]] = queue.Queue()
+
+    # The loop is only entered once everything is in place, and the test process keeps its own SIGTERM handler
+    with monkeypatch.context() as patch:
+        patch.setattr(Telemetry, "run", lambda self: None)
+        patch.setattr(telemetry_module, "signal", lambda *_: None)
+        telemetry = Telemetry(
+            queue.Queue(),
+            radio_payloads,
+            queue.Queue(),
+            queue.Queue(),
+            telemetry_json_output,
+            telemetry_ws_commands,
+            queue.Queue(),
+            config,  # type: ignore
+            "test",
+        )
+
+    flight = FlightEmulator("VA3INI", packet_rate=10)
+    for _ in range(BACKLOG_SIZE):
+        radio_payloads.put(TimestampedPayload.received(flight.next_packet()))
+
+    sent: list[int] = []
+    handled: list[tuple[int, int]] = []  # When the command was handled, and the payloads still waiting
+
+    def execute_command(command: Any, parameters: list[str]) -> None:
+        Telemetry.execute_command(telemetry, command, parameters)
+        handled.append((time.perf_counter_ns(), radio_payloads.qsize()))
+        raise StopLoop
+
+    def send_command() -> None:
+        time.sleep(0.1)  # Once the loop is busy with the backlog
+        sent.append(time.perf_counter_ns())
+        telemetry_ws_commands.put(["replay", "pause"])
+
+    monkeypatch.setattr(telemetry, "execute_command", execute_command)
+    sender = threading.Thread(target=send_command)
+    sender.start()
+    with pytest.raises(StopLoop):
+        telemetry.run()
+    sender.join()
+
+    (handled_time, waiting) = handled[0]
+    assert waiting > 0
+    assert handled_time - sent[0] < MAX_CONTROL_LATENCY_NS
+    assert telemetry_json_output.qsize() > 1  # Payloads were published while the command waited
+    assert telemetry.status.replay.speed == 0.0
@@ -148,3 +148,30 @@ def test_replay_speed_command() -> None:
 
     assert parsed_command == cmd.WebsocketCommand.REPLAY.value.SPEED
     assert parameters == ["2"]
+
+
+def test_start_profile_command() -> None:
+    """Tests the start profile command."""
+
+    parsed_command, parameters = command_parser("profile start")
+
+    assert parsed_command == cmd.WebsocketCommand.PROFILE.value.START
+    assert parameters == []
+
+
+def test_stop_profile_command() -> None:
+    """Tests the stop profile command."""
+
+    parsed_command, parameters = command_parser("profile stop")
+
+    assert parsed_command == cmd.WebsocketCommand.PROFILE.value.STOP
+    assert parameters == []
+
+
+def test_dump_profile_command() -> None:
+    """Tests the dump profile command."""
+
+    parsed_command, parameters = command_parser("profile dump")
+
+    assert parsed_command == cmd.WebsocketCommand.PROFILE.value.DUMP
+    assert parameters == []
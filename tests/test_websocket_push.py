@@ -0,0 +1,299 @@
+# Tests for pushing telemetry updates to the websocket clients
+import asyncio
+import json
+import queue
+import time
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+import pytest
+
+import tornado.httpserver
+import tornado.testing
+import tornado.web
+import tornado.websocket
+from tornado.ioloop import IOLoop
+
+from modules.misc.latency import LATENCY_KEY, LatencyTracker
+from modules.telemetry.history import HistoryStore
+from modules.websocket.subscriptions import Subscription
+import modules.websocket.websocket as websocket
+from modules.websocket.encoding import Encoding, Frame, decode_binary
+from modules.websocket.resume import ReplayLog
+from modules.websocket.websocket import TelemetryPublisher, TornadoWSServer
+
+
+READ_TIMEOUT: float = 5.0  # Longest a test waits for a message, so a deadlock fails rather than hanging
+PUBLISHERS: list[TelemetryPublisher] = []  # Started by the test being run, and stopped after it
+
+
+@pytest.fixture(autouse=True)
+def stop_publishers() -> Iterator[None]:
+    """Stops the reader threads of the publishers a test started, so they don't outlive it."""
+    yield
+    while PUBLISHERS:
+        publisher = PUBLISHERS.pop()
+        publisher.stop()
+        assert not publisher.thread.is_alive()
+
+
+async def read(client: tornado.websocket.WebSocketClientConnection) -> str | bytes | None:
+    """Reads the next message from a client, failing the test if none arrives in time."""
+    return await asyncio.wait_for(client.read_message(), READ_TIMEOUT)
+
+
+async def serve() -> tuple[int, queue.Queue[dict[str, Any]], LatencyTracker]:
+    """Starts a websocket server pushing the updates put on the returned queue, and returns its port."""
+    TornadoWSServer.clients.clear()
+    TornadoWSServer.last_update = None
+    TornadoWSServer.replay_log = ReplayLog()
+    TornadoWSServer.history = HistoryStore()
+
+    sock, port = tornado.testing.bind_unused_port()
+    server = tornado.httpserver.HTTPServer(tornado.web.Application([(r"/websocket", TornadoWSServer)]))
+    server.add_sockets([sock])
+
+    updates: queue.Queue[dict[str, Any]] = queue.Queue()
+    latency = LatencyTracker()
+    publisher = TelemetryPublisher(updates, latency, IOLoop.current(), TornadoWSServer.history)  # type: ignore
+    publisher.start()
+    PUBLISHERS.append(publisher)
+    return port, updates, latency
+
+
+def test_updates_pushed_immediately() -> None:
+    """Updates are written to the clients as soon as they are put on the queue, not on a poll interval."""
+
+    async def run() -> list[float]:
+        port, updates, latency = await serve()
+        client = await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket")
+
+        delays: list[float] = []
+        for i in range(20):
+            start = time.monotonic()
+            updates.put({"update": i, LATENCY_KEY: {"serial_read": time.monotonic_ns()}})
+            message = await read(client)
+            delays.append(time.monotonic() - start)
+            assert json.loads(message) == {"update": i, "seq": i + 1}  # type: ignore
+
+        client.close()
+        assert latency.histograms["websocket_write"].count == 20
+        return delays
+
+    delays = asyncio.run(run())
+    assert sorted(delays)[len(delays) // 2] < 0.01
+
+
+def test_client_max_rate() -> None:
+    """A client with a maximum rate is sent only the latest update once each interval has passed."""
+
+    async def run() -> tuple[list[int], list[int]]:
+        port, updates, _ = await serve()
+        fast = await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket")
+        slow = await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket?max_rate=10")
+
+        # 30 updates over 0.6 s
+        for i in range(30):
+            updates.put({"update": i})
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.15)
+
+        received: dict[str, list[int]] = {}
+        for name, client in (("fast", fast), ("slow", slow)):
+            received[name] = []
+            while True:
+                try:
+                    message = await asyncio.wait_for(client.read_message(), timeout=0.05)
+                except asyncio.TimeoutError:
+                    break
+                received[name].append(json.loads(message)["update"])  # type: ignore
+            client.close()
+        return received["fast"], received["slow"]
+
+    fast, slow = asyncio.run(run())
+    assert fast[-1] == slow[-1] == 29  # The latest update always gets through
+    assert len(fast) > 20
+    assert 5 <= len(slow) <= 9
+    assert slow == sorted(slow)
+
+
+def test_serialized_once_per_subscription(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Each update is serialized once for every distinct subscription, not once for every client."""
+    serialized: list[Subscription] = []
+    serialize = Subscription.serialize
+
+    def counting_serialize(
+        self: Subscription, json_data: dict[str, Any], encoding: Encoding = Encoding.JSON, history: Any = None
+    ) -> Frame:
+        serialized.append(self)
+        return serialize(self, json_data, encoding, history)
+
+    monkeypatch.setattr(Subscription, "serialize", counting_serialize)
+
+    async def run() -> dict[str, list[dict[str, Any]]]:
+        port, updates, _ = await serve()
+        queries = {"all": "", "altitude": "?series=altitude", "altitude again": "?series=altitude&max_rate=100"}
+        clients = {
+            name: await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket{query}")
+            for name, query in queries.items()
+        }
+
+        updates.put({"status": {"mission": {}}, "telemetry": {"altitude": [1], "gnss": [2]}})
+        received = {name: [json.loads(await read(client))] for name, client in clients.items()}  # type: ignore
+        for client in clients.values():
+            client.close()
+        return received
+
+    received = asyncio.run(run())
+    assert len(serialized) == 2
+    assert received["all"] == [{"status": {"mission": {}}, "telemetry": {"altitude": [1], "gnss": [2]}, "seq": 1}]
+    assert received["altitude"] == [{"status": {"mission": {}}, "telemetry": {"altitude": [1]}, "seq": 1}]
+    assert received["altitude again"] == received["altitude"]
+
+
+class SlowClient:
+    """Stands in for the connection of a client whose writes only finish when the test says so."""
+
+    def __init__(self) -> None:
+        self.client: TornadoWSServer = object.__new__(TornadoWSServer)
+        self.client.initialize()
+        self.client.request = SimpleNamespace(remote_ip="10.0.0.2")  # type: ignore
+        self.client.write_message = self.write_message  # type: ignore
+        self.client.close = self.close  # type: ignore
+        self.written: list[str] = []
+        self.writes: list[asyncio.Future[None]] = []
+        self.close_code: int | None = None
+
+    def write_message(self, message: Frame, binary: bool = False) -> asyncio.Future[None]:
+        self.written.append(message)
+        self.writes.append(asyncio.get_running_loop().create_future())
+        return self.writes[-1]
+
+    def close(self, code: int, reason: str) -> None:
+        self.close_code = code
+
+
+def test_slow_client_coalesced() -> None:
+    """Updates for a client which is still being written to are replaced by the latest one."""
+
+    async def run() -> SlowClient:
+        slow = SlowClient()
+        for i in range(10):
+            slow.client.send(f"update {i}", 8)
+        assert slow.written == ["update 0"]
+        assert slow.client.buffered_bytes == 8
+
+        slow.writes[0].set_result(None)
+        await asyncio.sleep(0)
+        return slow
+
+    slow = asyncio.run(run())
+    assert slow.written == ["update 0", "update 9"]
+    assert slow.client.pending_message is None
+    assert TornadoWSServer.metrics.values["websocket_updates_coalesced_total"][()] >= 8
+
+
+def test_slow_client_disconnected(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A client whose write has not finished for too long is disconnected, without holding up the others."""
+    monkeypatch.setattr(websocket, "MAX_CLIENT_LAG", 0.05)
+
+    async def run() -> tuple[SlowClient, SlowClient]:
+        TornadoWSServer.clients.clear()
+        slow, fast = SlowClient(), SlowClient()
+        TornadoWSServer.clients.update({slow.client, fast.client})
+
+        for i in range(5):
+            TornadoWSServer.send_update({"update": i})
+            fast.writes[-1].set_result(None)
+            await asyncio.sleep(0.02)
+        return slow, fast
+
+    slow, fast = asyncio.run(run())
+    assert slow.close_code == websocket.SLOW_CLIENT_CLOSE_CODE
+    assert slow.client not in TornadoWSServer.clients
+    assert len(slow.written) == 1
+    assert len(fast.written) == 5
+
+
+@pytest.mark.parametrize("query", ["?encoding=json", "?encoding=binary", "?encoding=deflate"])
+def test_client_encodings(query: str) -> None:
+    """Clients are sent updates in the encoding they chose, compressing deflate updates when negotiated."""
+
+    async def run() -> tuple[str | bytes, str]:
+        port, updates, _ = await serve()
+        client = await tornado.websocket.websocket_connect(
+            f"ws://localhost:{port}/websocket{query}", compression_options={}
+        )
+        updates.put({"telemetry": {"altitude": {"mission_time": [1, 2], "metres": [0.5, 1.5]}}})
+        message = await read(client)
+        extensions = client.headers.get("Sec-WebSocket-Extensions", "")
+        client.close()
+        assert message is not None
+        return message, extensions
+
+    message, extensions = asyncio.run(run())
+    expected = {"telemetry": {"altitude": {"mission_time": [1, 2], "metres": [0.5, 1.5]}}, "seq": 1}
+    if query.endswith("binary"):
+        assert isinstance(message, bytes)
+        assert decode_binary(message) == expected
+    else:
+        assert json.loads(message) == expected
+    assert ("permessage-deflate" in extensions) == query.endswith("deflate")
+
+
+def test_client_resumes() -> None:
+    """Reconnecting clients are sent only the samples they missed, or the latest update if they are too far behind."""
+
+    def update(mission_time: int) -> dict[str, Any]:
+        times = list(range(max(0, mission_time - 3), mission_time + 1))
+        return {
+            "status": {"time": mission_time},
+            "telemetry": {"last_mission_time": mission_time, "altitude": {"mission_time": times}},
+        }
+
+    async def run() -> dict[str, Any]:
+        port, updates, _ = await serve()
+        client = await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket")
+        for mission_time in range(10):
+            updates.put(update(mission_time))
+            _ = await read(client)
+        client.close()
+
+        received: dict[str, Any] = {}
+        for query in ("?last_seq=3", "?last_seq=10", "?last_seq=0", "?last_seq=later"):
+            client = await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket{query}")
+            received[query] = json.loads(await read(client))  # type: ignore
+            client.close()
+        return received
+
+    received = asyncio.run(run())
+    assert received["?last_seq=3"]["telemetry"]["altitude"]["mission_time"] == [3, 4, 5, 6, 7, 8, 9]
+    assert received["?last_seq=3"]["resumed_from"] == 3
+    assert received["?last_seq=3"]["status"] == {"time": 9}
+    assert received["?last_seq=10"]["telemetry"]["altitude"]["mission_time"] == []
+    for query in ("?last_seq=0", "?last_seq=later"):
+        assert received[query] == {**update(9), "seq": 10}
+
+
+def test_client_points() -> None:
+    """Clients asking for a number of points are sent each series of the whole flight decimated to that many."""
+
+    async def run() -> tuple[dict[str, Any], dict[str, Any]]:
+        port, updates, _ = await serve()
+        client = await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket?points=40&decimation=lttb")
+        plain = await tornado.websocket.websocket_connect(f"ws://localhost:{port}/websocket?points=none")
+        for mission_time in range(0, 1000, 10):
+            times = list(range(max(0, mission_time - 90), mission_time + 10))
+            updates.put({"telemetry": {"altitude": {"mission_time": times, "metres": [t / 10 for t in times]}}})
+            decimated, full = json.loads(await read(client)), json.loads(await read(plain))  # type: ignore
+        client.close()
+        plain.close()
+        return decimated, full
+
+    decimated, full = asyncio.run(run())
+    altitude = decimated["telemetry"]["altitude"]
+    assert len(altitude["mission_time"]) <= 40
+    assert altitude["mission_time"][0] == 0
+    assert altitude["mission_time"][-1] == 999
+    assert altitude["metres"][-1] == 99.9
+    assert full["telemetry"]["altitude"]["mission_time"] == list(range(900, 1000))